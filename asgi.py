@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+ASGI App
+Serves the config-driven mock engine under any ASGI server:
+
+    MOCK_CONFIG=config.json uvicorn asgi:create_app --factory --port 8000
+
+Simulated latency, time-to-first-byte and bandwidth are awaited on the
+event loop, and requests queued by max_concurrency wait on it too, so
+slow mocks cost no threads however many connections are open.
+
+Streaming endpoints are served as Server-Sent Events, or over the ASGI
+"websocket" scope; a task per active feed produces its events and each
+subscriber waits on its own bounded queue.
+
+ASGI has no way to reset a connection: "reset" and "hang" faults end the
+request without a response (after hang_ms for "hang"), which the server
+turns into a closed connection or a 500.
+"""
+
+import asyncio
+import os
+import time
+
+from config_cache import DatabaseCache
+from mock_server import (MockEngine, MockRequest, MockResponse, MockServerConfig, RequestLogger,
+                         WishlistManager)
+from pacing import PacingScheduler
+
+
+class ResponseAborted(Exception):
+    """Raised after a truncated body so the server closes the connection."""
+
+
+class MockASGIApp:
+    """ASGI application around a MockEngine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        # Feed -> task producing its events while it has subscribers
+        self._drivers = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'websocket':
+            await self._websocket(scope, receive, send)
+            return
+        if scope['type'] != 'http':
+            raise NotImplementedError(f"Unsupported ASGI scope: {scope['type']}")
+
+        request = self._request(scope, scope['method'])
+        engine = self.engine.for_request(request)
+
+        result = await self._receive_body(request, receive)
+        if result is False:
+            return
+        if result is None and (request.method, request.path) == ('POST', '/__batch'):
+            # Parallel batch items run on the engine's threads, off the event loop
+            result = await asyncio.to_thread(engine.route, request)
+        elif result is None:
+            result = engine.route(request)
+        if isinstance(result, MockResponse):
+            response = result
+        else:
+            response = engine.serve(request, result, await engine.admit_async(result))
+        engine.apply_cors(request, response)
+        try:
+            await self._send(request, response, receive, send)
+        finally:
+            engine.complete(request, response)
+
+    def _request(self, scope, method):
+        target = scope['path']
+        if scope.get('query_string'):
+            target += '?' + scope['query_string'].decode('latin-1')
+        headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+        return MockRequest(method, target, headers, stage_timer=self.engine.stage_timer)
+
+    async def _receive_body(self, request, receive):
+        """Receive the body if the engine uses it, discarding it otherwise.
+
+        Returns an error response, None to carry on, or False if the client
+        disconnected.
+        """
+        plan, body, size, more_body = None, [], 0, True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return False
+            data = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if not data:
+                continue
+            if plan is None:
+                plan = self.engine.body_plan(request)
+            keep, max_bytes = plan
+            if not keep:
+                continue
+            size += len(data)
+            if size > max_bytes:
+                # The server discards whatever is left unread
+                return self.engine.body_too_large(max_bytes)
+            body.append(data)
+        request.body = b''.join(body)
+        return None
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _send(self, request, response, receive, send):
+        """Send a response, simulating its latency, pacing and fault."""
+        fault = response.fault
+        delay_ms = response.delay_ms + response.ttfb_ms
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+        if request.timer is not None:
+            request.lap('latency')
+
+        if fault is not None and fault.type in ('reset', 'hang'):
+            if fault.type == 'hang':
+                await asyncio.sleep(fault.hang_ms / 1000.0)
+            return
+
+        headers = [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                   for name, value in response.headers]
+        if response.feed is not None:
+            await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+            # Logged once subscribed, as with the stdlib server
+            self.engine.complete(request, response)
+            response.logged = False
+            async for event in self._subscription(response.feed, 'sse', receive, 'http.disconnect'):
+                if event is None:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                await send({'type': 'http.response.body', 'body': event.sse, 'more_body': True})
+            return
+        if response.chunks is not None and (fault is not None or response.bandwidth_kbps):
+            # Damaged and paced bodies are sent from a known length
+            response.body, response.chunks = ''.join(response.chunks).encode(), None
+
+        if response.chunks is not None:
+            # No Content-Length: the server uses chunked encoding
+            await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+            await self._send_chunks(request, response, receive, send)
+            return
+
+        body = response.body
+        headers.append((b'content-length', str(len(body)).encode()))
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+        min_slice = PacingScheduler.MIN_SLICE
+        bytes_per_second = response.bandwidth_kbps * 1000 / 8 if response.bandwidth_kbps else None
+        if fault is not None and fault.type == 'truncate':
+            body = body[:int(len(body) * fault.fraction)]
+        elif fault is not None:
+            # slow_drip: a few bytes per tick rather than the usual minimum slice
+            bytes_per_second = fault.bytes_per_second
+            min_slice = fault.bytes_per_second * PacingScheduler.TICK
+        if bytes_per_second:
+            await self._send_paced(send, body, bytes_per_second, min_slice)
+        else:
+            await send({'type': 'http.response.body', 'body': body, 'more_body': fault is not None})
+        if request.timer is not None:
+            request.lap('write')
+        if fault is not None and fault.type == 'truncate':
+            raise ResponseAborted("Truncated response (simulated fault)")
+        if bytes_per_second:
+            await send({'type': 'http.response.body', 'body': b''})
+
+    async def _send_paced(self, send, body, bytes_per_second, min_slice):
+        """Send body in timed slices, TICK seconds of bandwidth (at least min_slice) each."""
+        step = max(int(bytes_per_second * PacingScheduler.TICK), int(min_slice), 1)
+        started = time.monotonic()
+        for offset in range(0, len(body), step):
+            # Sleep until the link would have carried everything before this slice
+            wait = started + offset / bytes_per_second - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await send({'type': 'http.response.body', 'body': body[offset:offset + step],
+                        'more_body': True})
+
+    async def _send_chunks(self, request, response, receive, send):
+        """Send an incremental body; blocking chunks (log tails) are pulled in a thread."""
+        chunks = iter(response.chunks)
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        watcher = asyncio.ensure_future(disconnected()) if response.blocking else None
+        try:
+            while True:
+                if response.blocking:
+                    # A tail can block until its next heartbeat; stop as soon as the client goes
+                    pull = asyncio.ensure_future(asyncio.to_thread(next, chunks, None))
+                    await asyncio.wait((pull, watcher), return_when=asyncio.FIRST_COMPLETED)
+                    if not pull.done():
+                        return
+                    text = pull.result()
+                else:
+                    text = next(chunks, None)
+                if text is None:
+                    break
+                if request.timer is not None:
+                    request.lap('serialize')
+                await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+                if request.timer is not None:
+                    request.lap('write')
+                # Let other requests run between chunks of a large body
+                await asyncio.sleep(0)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    async def _websocket(self, scope, receive, send):
+        """Accept a WebSocket subscriber to a streaming endpoint."""
+        if (await receive())['type'] != 'websocket.connect':
+            return
+        request = self._request(scope, 'GET')
+        engine = self.engine.for_request(request)
+        # The server has done the handshake; mark the request as one for the engine
+        request.headers.setdefault('upgrade', 'websocket')
+        request.headers.setdefault('sec-websocket-key', 'asgi')
+        result = engine.route(request)
+        if isinstance(result, MockResponse):
+            response = result
+        else:
+            response = engine.serve(request, result, await engine.admit_async(result))
+        try:
+            delay_ms = response.delay_ms + response.ttfb_ms
+            if delay_ms > 0:
+                await asyncio.sleep(delay_ms / 1000.0)
+            if response.feed is None:
+                # Refused before the handshake; the server answers 403
+                await send({'type': 'websocket.close', 'code': 1008})
+                return
+            await send({'type': 'websocket.accept'})
+        finally:
+            # Logged when the socket opens (or is refused), not when it closes
+            engine.complete(request, response)
+        async for event in self._subscription(response.feed, 'websocket', receive, 'websocket.disconnect'):
+            if event is None:
+                await send({'type': 'websocket.close', 'code': 1000})
+                break
+            await send({'type': 'websocket.send', 'text': event.text})
+
+    async def _subscription(self, feed, kind, receive, disconnect):
+        """Yield feed's events for one subscriber until the client leaves.
+
+        Yields None last if the feed ended (or dropped a slow subscriber) first.
+        """
+        subscriber = feed.subscribe(kind)
+        ready = asyncio.Event()
+        subscriber.wake = ready.set
+
+        async def disconnected():
+            while (await receive())['type'] != disconnect:
+                pass
+
+        watcher = asyncio.ensure_future(disconnected())
+        if feed not in self._drivers:
+            self._drivers[feed] = asyncio.ensure_future(self._drive(feed))
+        try:
+            while True:
+                while not subscriber.queue:
+                    ready.clear()
+                    waiter = asyncio.ensure_future(ready.wait())
+                    await asyncio.wait((waiter, watcher), return_when=asyncio.FIRST_COMPLETED)
+                    waiter.cancel()
+                    if watcher.done():
+                        return
+                event = subscriber.queue.popleft()
+                yield event
+                if event is None:
+                    return
+        finally:
+            watcher.cancel()
+            feed.unsubscribe(subscriber)
+
+    async def _drive(self, feed):
+        """Produce feed's events on the event loop while it has subscribers."""
+        try:
+            while feed.subscribers:
+                event, delay = feed.next_event()
+                for subscriber in feed.publish(event):
+                    # Too slow with slow_consumer "disconnect": end its stream
+                    feed.unsubscribe(subscriber)
+                    subscriber.queue.clear()
+                    subscriber.queue.append(None)
+                    subscriber.wake()
+                if event is None:
+                    return
+                await asyncio.sleep(delay)
+        finally:
+            del self._drivers[feed]
+
+
+def create_engine(config_path, cache_dir=None):
+    """Load a config and build a single-process engine for it."""
+    config = MockServerConfig(config_path, DatabaseCache(cache_dir) if cache_dir else None)
+    logger = RequestLogger(buffer_size=config.get('log_buffer', 10000))
+    return MockEngine(config, logger, WishlistManager())
+
+
+def create_app(config_path=None):
+    """Build the ASGI app for config_path ($MOCK_CONFIG, or config.json).
+
+    $MOCK_CONFIG_CACHE names a directory to cache parsed databases in.
+    """
+    return MockASGIApp(create_engine(config_path or os.environ.get('MOCK_CONFIG', 'config.json'),
+                                     os.environ.get('MOCK_CONFIG_CACHE')))
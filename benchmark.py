@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the mock server internals
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_server import MockServerConfig, WishlistManager
+from state_backends import create_backend
+
+
+def _write_config(tmp):
+    """Write an empty-database config for state benchmarks."""
+    config_path = os.path.join(tmp, 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump({"endpoints": []}, f)
+    return config_path
+
+
+def _state_ops(config, wishlist, worker, ops):
+    """Run add/delete pairs against the games and wishlist state."""
+    for i in range(ops):
+        title = f"bench-{worker}-{i}"
+        config.add_game({"title": title})
+        wishlist.add(title)
+    for i in range(ops):
+        title = f"bench-{worker}-{i}"
+        config.delete_game('title', title)
+        wishlist.remove(title)
+
+
+def bench_state(backend_name, ops=2000, processes=1):
+    """Measure mutations per second for a state backend.
+
+    Each process performs `ops` game adds, wishlist adds, game deletes and
+    wishlist removes (4 * ops mutations).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = create_backend(backend_name, os.path.join(tmp, 'state.db'))
+        config_path = _write_config(tmp)
+
+        def run(worker):
+            config, wishlist = MockServerConfig(config_path), WishlistManager()
+            if backend.journal('games') is not None:
+                config.attach_journal(backend.journal('games'))
+                wishlist.attach_journal(backend.journal('wishlist'))
+            _state_ops(config, wishlist, worker, ops)
+
+        start = time.perf_counter()
+        if processes == 1:
+            run(0)
+        else:
+            ctx = multiprocessing.get_context('fork')
+            workers = [ctx.Process(target=run, args=(i,)) for i in range(processes)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        elapsed = time.perf_counter() - start
+        backend.close()
+
+    return 4 * ops * processes / elapsed
+
+
+HTTP_ENDPOINTS = [
+    {"path": "/bench", "method": "GET", "response": {"ok": True, "items": list(range(20))}},
+    {"path": "/bench/latency", "method": "GET", "response": {"ok": True}, "latency_ms": 50}
+]
+
+
+def _server_command(server, config_path, port):
+    """Command line that runs the mock server on the given backend."""
+    if server == 'stdlib':
+        return [sys.executable, 'mock_server.py', '--config', config_path, '--port', str(port)]
+    return [sys.executable, '-m', 'uvicorn', 'asgi:create_app', '--factory',
+            '--port', str(port), '--log-level', 'warning', '--no-access-log']
+
+
+def _wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+async def _client(port, path, count, latencies):
+    """One keep-alive connection sending count requests in sequence."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    for _ in range(count):
+        start = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = 0
+        for line in head.split(b'\r\n'):
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':', 1)[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+def bench_http(server, path, connections=50, requests=2000, port=8765):
+    """Measure requests per second and latency percentiles against a live server.
+
+    Returns (requests/s, p50 ms, p99 ms).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, 'config.json')
+        with open(config_path, 'w') as f:
+            json.dump({"endpoints": HTTP_ENDPOINTS}, f)
+        env = dict(os.environ, MOCK_CONFIG=config_path)
+        process = subprocess.Popen(_server_command(server, config_path, port), env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_for_port(port)
+            latencies = []
+
+            async def run():
+                per_client = max(requests // connections, 1)
+                await asyncio.gather(*(_client(port, path, per_client, latencies)
+                                       for _ in range(connections)))
+
+            start = time.perf_counter()
+            asyncio.run(run())
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+
+    latencies.sort()
+    return (len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description='Mock server benchmarks')
+    subparsers = parser.add_subparsers(dest='bench', required=True)
+
+    state = subparsers.add_parser('state', help='State backend mutation throughput')
+    state.add_argument('--ops', type=int, default=2000, help='Add/delete pairs per process')
+    state.add_argument('--processes', type=int, default=4, help='Concurrent processes for shared backends')
+
+    http = subparsers.add_parser('http', help='Requests/s of the stdlib server vs. uvicorn + asgi.py')
+    http.add_argument('--connections', type=int, default=50, help='Concurrent keep-alive connections')
+    http.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and server')
+    http.add_argument('--port', type=int, default=8765, help='Port to run the servers on')
+    args = parser.parse_args()
+
+    if args.bench == 'state':
+        print(f"{'backend':<8} {'procs':>5} {'mutations/s':>12}")
+        for name in ('memory', 'shared', 'sqlite'):
+            for processes in sorted({1, args.processes}):
+                if name == 'memory' and processes > 1:
+                    continue
+                rate = bench_state(name, args.ops, processes)
+                print(f"{name:<8} {processes:>5} {rate:>12,.0f}")
+
+    elif args.bench == 'http':
+        servers = ['stdlib']
+        if importlib.util.find_spec('uvicorn') is not None:
+            servers.append('asgi')
+        else:
+            print("uvicorn is not installed; skipping the ASGI server")
+        print(f"{'server':<8} {'endpoint':<15} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for endpoint in HTTP_ENDPOINTS:
+            for server in servers:
+                rate, p50, p99 = bench_http(server, endpoint['path'], args.connections,
+                                            args.requests, args.port)
+                print(f"{server:<8} {endpoint['path']:<15} {rate:>9,.0f} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
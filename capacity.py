@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Capacity Limits
+Per-endpoint concurrency caps, bounded queues and token-bucket rate limits,
+so a mocked dependency saturates the way a real one does: requests queue,
+then get 503s, and callers that exceed the rate get 429s.
+
+Limits are enforced per process; with --workers each worker has its own.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token; return (ok, seconds until one is available)."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True, 0.0
+            return False, (1 - self.tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """At most `max_concurrency` requests run; up to `max_queue` more wait in FIFO order."""
+
+    def __init__(self, max_concurrency, max_queue=0, queue_timeout_ms=None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000 if queue_timeout_ms is not None else None
+        self.active = 0
+        self.waiters = deque()
+        self.lock = threading.Lock()
+
+    def enqueue(self, grant):
+        """Take a slot (True), queue grant() to be called with one (None), or refuse (False)."""
+        with self.lock:
+            if self.active < self.max_concurrency and not self.waiters:
+                self.active += 1
+                return True
+            if len(self.waiters) >= self.max_queue:
+                return False
+            self.waiters.append(grant)
+            return None
+
+    def try_acquire(self):
+        """Take a slot only if one is free now, without queueing."""
+        with self.lock:
+            if self.active < self.max_concurrency and not self.waiters:
+                self.active += 1
+                return True
+            return False
+
+    def cancel(self, grant):
+        """Withdraw a queued grant; False if the slot was already granted."""
+        with self.lock:
+            try:
+                self.waiters.remove(grant)
+                return True
+            except ValueError:
+                return False
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if allowed; return (ok, seconds waited)."""
+        # Each waiter has its own event, so release() wakes exactly one
+        event = threading.Event()
+        queued = self.enqueue(event.set)
+        if queued is not None:
+            return queued, 0.0
+
+        start = time.monotonic()
+        granted = event.wait(self.queue_timeout)
+        if not granted and not self.cancel(event.set):
+            # Granted just as we timed out; keep the slot
+            granted = True
+        return granted, time.monotonic() - start
+
+    async def acquire_async(self):
+        """Like acquire(), but waits on the running event loop instead of a thread."""
+        # Only async servers get here; asyncio is slow to import
+        import asyncio
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+
+        queued = self.enqueue(grant)
+        if queued is not None:
+            return queued, 0.0
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            granted = True
+        except asyncio.TimeoutError:
+            granted = not self.cancel(grant)
+        except asyncio.CancelledError:
+            # The slot may have been handed over already; nobody will release it
+            if not self.cancel(grant):
+                self.release()
+            raise
+        return granted, time.monotonic() - start
+
+    def release(self):
+        """Free a slot, handing it straight to the oldest waiter."""
+        with self.lock:
+            if self.waiters:
+                self.waiters.popleft()()
+            else:
+                self.active -= 1
+
+
+class EndpointLimits:
+    """The capacity settings of one endpoint."""
+
+    def __init__(self, endpoint):
+        rate_limit = endpoint.get('rate_limit')
+        if isinstance(rate_limit, dict):
+            self.bucket = TokenBucket(rate_limit['rate'], rate_limit.get('burst'))
+        elif rate_limit:
+            self.bucket = TokenBucket(rate_limit)
+        else:
+            self.bucket = None
+
+        max_concurrency = endpoint.get('max_concurrency')
+        if max_concurrency:
+            self.limiter = ConcurrencyLimiter(max_concurrency, endpoint.get('max_queue', 0),
+                                              endpoint.get('queue_timeout_ms'))
+        else:
+            self.limiter = None
+        self.retry_after = endpoint.get('retry_after_s', 1)
+
+    def _check_rate(self):
+        if self.bucket is not None:
+            ok, wait = self.bucket.try_acquire()
+            if not ok:
+                return 429, max(math.ceil(wait), 1), 0.0
+        return None
+
+    def admit(self):
+        """Decide whether a request may run.
+
+        Returns (status, retry_after_s, seconds queued). Status is None when
+        admitted, in which case release() must be called afterwards.
+        """
+        refused = self._check_rate()
+        if refused is not None:
+            return refused
+        if self.limiter is not None:
+            ok, waited = self.limiter.acquire()
+            if not ok:
+                return 503, self.retry_after, waited
+            return None, 0, waited
+        return None, 0, 0.0
+
+    async def admit_async(self):
+        """admit() for asyncio servers: queued requests do not hold a thread."""
+        refused = self._check_rate()
+        if refused is not None:
+            return refused
+        if self.limiter is not None:
+            ok, waited = await self.limiter.acquire_async()
+            if not ok:
+                return 503, self.retry_after, waited
+            return None, 0, waited
+        return None, 0, 0.0
+
+    def try_admit(self):
+        """admit() that never waits: no free slot is a 503 (for /__batch items)."""
+        refused = self._check_rate()
+        if refused is not None:
+            return refused
+        if self.limiter is not None and not self.limiter.try_acquire():
+            return 503, self.retry_after, 0.0
+        return None, 0, 0.0
+
+    def release(self):
+        if self.limiter is not None:
+            self.limiter.release()
+
+
+def create_limits(endpoint):
+    """Return EndpointLimits if the endpoint sets any capacity limit, else None."""
+    if endpoint.get('rate_limit') or endpoint.get('max_concurrency'):
+        return EndpointLimits(endpoint)
+    return None
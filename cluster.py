@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Cluster Controller
+Keeps a fleet of mock_server.py nodes on one config and shows them as one.
+
+    python cluster.py --port 9000 --config config.json \
+        --node http://localhost:8001 --node http://localhost:8002
+    python mock_server.py --port 8003 --controller http://localhost:9000
+
+Nodes are listed with --node (start them with --accept-config-push) or
+register themselves with --controller.
+The controller serves no mock traffic; it talks to each node's /__node,
+/__config and /__logs endpoints:
+
+    GET    /nodes            nodes, their config digest and whether it is current
+    POST   /nodes            register {"url": "http://host:port"}
+    DELETE /nodes?url=...    forget a node
+    POST   /push?wait=10     push --config (or the request body) and wait for convergence
+    GET    /metrics          request totals per node and for the whole cluster
+    GET    /logs             recent logs of every node, merged by time
+    GET    /logs/stream      every node's log as NDJSON (?follow=1 keeps tailing)
+
+A config version is the SHA-256 of the file content. Nodes already
+running it are skipped, and a push has converged once every node
+reports it.
+"""
+
+import argparse
+import hashlib
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def request_json(url, method='GET', body=None, timeout=5.0):
+    """Send a request and return (status, decoded JSON body or None).
+
+    Raises OSError if the node cannot be reached.
+    """
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    request = urllib.request.Request(url, data=body, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, payload = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, e.read()
+    try:
+        return status, json.loads(payload)
+    except ValueError:
+        return status, None
+
+
+def register_with(controller_url, node_url, attempts=10, interval=2.0):
+    """Register node_url with a controller, retrying while it is not up yet."""
+    body = json.dumps({"url": node_url}).encode()
+    for attempt in range(attempts):
+        try:
+            status, _ = request_json(controller_url.rstrip('/') + '/nodes', 'POST', body)
+            if status == 200:
+                print(f"[CLUSTER] Registered {node_url} with {controller_url}")
+                return True
+        except OSError:
+            pass
+        time.sleep(interval)
+    print(f"[CLUSTER] Could not register with {controller_url}")
+    return False
+
+
+class Node:
+    """One mock server and what it reported last."""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        # Last GET /__node body, or None while unreachable
+        self.status = None
+        self.error = None
+        self.last_seen = None
+
+    @property
+    def digest(self):
+        return self.status.get('config_digest') if self.status else None
+
+    def refresh(self, timeout):
+        """Fetch /__node; return whether the node answered."""
+        try:
+            code, body = request_json(self.url + '/__node', timeout=timeout)
+        except OSError as e:
+            self.status, self.error = None, str(e)
+            return False
+        if code != 200 or not isinstance(body, dict):
+            self.status, self.error = None, f"GET /__node returned {code}"
+            return False
+        self.status, self.error, self.last_seen = body, None, time.time()
+        return True
+
+    def describe(self, target_digest):
+        status = self.status or {}
+        return {"url": self.url, "reachable": self.status is not None, "error": self.error,
+                "config_digest": self.digest,
+                "current": target_digest is not None and self.digest == target_digest,
+                "records": status.get('records'), "database_version": status.get('database_version'),
+                "last_seen": self.last_seen}
+
+
+class Controller:
+    """Registered nodes, config pushes and aggregated metrics and logs."""
+
+    # Seconds a follow log stream may stay silent; nodes send heartbeats every 15
+    STREAM_TIMEOUT = 60
+
+    def __init__(self, config_path=None, timeout=5.0):
+        self.config_path = config_path
+        self.timeout = timeout
+        self.nodes = {}
+        self.lock = threading.Lock()
+        # Digest of the last config pushed; nodes running it are current
+        self.target_digest = None
+
+    def register(self, url):
+        node = Node(url)
+        with self.lock:
+            return self.nodes.setdefault(node.url, node).url
+
+    def unregister(self, url):
+        with self.lock:
+            return self.nodes.pop(url.rstrip('/'), None) is not None
+
+    def _each(self, function):
+        """Call function(node) for every node at once; return the results in order."""
+        with self.lock:
+            nodes = list(self.nodes.values())
+        if not nodes:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(nodes), 32)) as pool:
+            return list(zip(nodes, pool.map(function, nodes)))
+
+    def refresh(self):
+        self._each(lambda node: node.refresh(self.timeout))
+
+    def status(self):
+        """Every node's state, and whether all of them run the pushed config."""
+        self.refresh()
+        with self.lock:
+            nodes = list(self.nodes.values())
+        return {"config_digest": self.target_digest, "converged": self._converged(self.target_digest),
+                "nodes": [node.describe(self.target_digest) for node in nodes]}
+
+    def _converged(self, digest):
+        with self.lock:
+            nodes = list(self.nodes.values())
+        return digest is not None and all(node.digest == digest for node in nodes)
+
+    def push(self, content=None, wait_s=10.0):
+        """Push a config to the nodes not running it yet and wait until all of them are.
+
+        content defaults to the current --config file. Raises ValueError if
+        it is not valid JSON (or there is none).
+        """
+        if content is None:
+            if not self.config_path:
+                raise ValueError("Nothing to push: no request body and no --config")
+            with open(self.config_path, 'rb') as f:
+                content = f.read()
+        json.loads(content)
+        digest = hashlib.sha256(content).hexdigest()
+        self.target_digest = digest
+        self.refresh()
+
+        def send(node):
+            if node.status is None:
+                return 'unreachable'
+            if node.digest == digest:
+                return 'skipped'
+            try:
+                code, body = request_json(node.url + '/__config', 'PUT', content, self.timeout)
+            except OSError as e:
+                node.error = str(e)
+                return 'failed'
+            if code != 200:
+                node.error = (body or {}).get('error', f"PUT /__config returned {code}")
+                return 'failed'
+            return 'pushed'
+
+        outcomes = {"pushed": [], "skipped": [], "failed": [], "unreachable": []}
+        for node, outcome in self._each(send):
+            outcomes[outcome].append(node.url)
+
+        # Workers of a node pick the new file up on their next request
+        deadline = time.monotonic() + wait_s
+        while True:
+            self.refresh()
+            converged = self._converged(digest)
+            if converged or time.monotonic() >= deadline:
+                break
+            time.sleep(0.2)
+        report = self.status()
+        report.update(outcomes, converged=converged)
+        return report
+
+    def metrics(self):
+        """Request totals of every node and of the whole cluster."""
+        self.refresh()
+        per_node, requests, statuses, latency_total = {}, 0, {}, 0.0
+        with self.lock:
+            nodes = list(self.nodes.values())
+        for node in nodes:
+            if node.status is None:
+                continue
+            stats = node.status.get('requests', {})
+            per_node[node.url] = stats
+            requests += stats.get('requests', 0)
+            latency_total += stats.get('mean_latency_ms', 0) * stats.get('requests', 0)
+            for status, count in stats.get('statuses', {}).items():
+                statuses[status] = statuses.get(status, 0) + count
+        return {"nodes": len(nodes), "reachable": len(per_node),
+                "cluster": {"requests": requests, "statuses": dict(sorted(statuses.items())),
+                            "mean_latency_ms": round(latency_total / requests, 1) if requests else 0},
+                "per_node": per_node}
+
+    def logs(self):
+        """Recent log entries of every node, tagged with the node and ordered by time."""
+        def fetch(node):
+            try:
+                code, body = request_json(node.url + '/__logs', timeout=self.timeout)
+            except OSError:
+                return []
+            return body.get('logs', []) if code == 200 and isinstance(body, dict) else []
+
+        merged = [dict(entry, node=node.url) for node, entries in self._each(fetch) for entry in entries]
+        merged.sort(key=lambda entry: entry.get('timestamp', ''))
+        return merged
+
+    def tail(self, follow=False, heartbeat=15):
+        """Yield every node's /__logs/stream as NDJSON lines tagged with the node.
+
+        Lines are interleaved in arrival order. Unreachable nodes yield one
+        {"node": ..., "error": ...} line. Closing the generator stops the
+        readers after their next line.
+        """
+        with self.lock:
+            nodes = list(self.nodes.values())
+        lines, stop = queue.Queue(maxsize=10000), threading.Event()
+        timeout = self.STREAM_TIMEOUT if follow else self.timeout
+
+        def pump(node):
+            url = f"{node.url}/__logs/stream?since=0&follow={int(follow)}"
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    for line in response:
+                        if stop.is_set():
+                            return
+                        if line.strip():
+                            entry = json.loads(line)
+                            entry['node'] = node.url
+                            lines.put(json.dumps(entry))
+            except (OSError, ValueError) as e:
+                lines.put(json.dumps({"node": node.url, "error": str(e)}))
+            finally:
+                lines.put(None)
+
+        for node in nodes:
+            threading.Thread(target=pump, args=(node,), daemon=True).start()
+        remaining = len(nodes)
+        try:
+            while remaining:
+                try:
+                    line = lines.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield '\n'
+                    continue
+                if line is None:
+                    remaining -= 1
+                else:
+                    yield line + '\n'
+        finally:
+            stop.set()
+
+
+class ControllerHandler(BaseHTTPRequestHandler):
+    """The controller's HTTP API (see the module docstring)."""
+
+    protocol_version = 'HTTP/1.1'
+    controller = None
+
+    def _json(self, status, data):
+        body = json.dumps(data, indent=2).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == '/nodes':
+            self._json(200, self.controller.status())
+        elif url.path == '/metrics':
+            self._json(200, self.controller.metrics())
+        elif url.path == '/logs':
+            logs = self.controller.logs()
+            self._json(200, {"logs": logs, "count": len(logs)})
+        elif url.path == '/logs/stream':
+            follow = params.get('follow', ['0'])[0] not in ('0', 'false', '')
+            self._stream(self.controller.tail(follow))
+        else:
+            self._json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._body()
+        if url.path == '/nodes':
+            try:
+                node_url = json.loads(body)['url']
+            except (ValueError, KeyError, TypeError):
+                self._json(400, {"error": 'Body must be {"url": "http://host:port"}'})
+                return
+            self._json(200, {"registered": self.controller.register(node_url)})
+        elif url.path == '/push':
+            try:
+                wait_s = float(parse_qs(url.query).get('wait', ['10'])[0])
+                report = self.controller.push(body or None, wait_s)
+            except (OSError, ValueError) as e:
+                self._json(400, {"error": str(e)})
+                return
+            self._json(200 if report["converged"] else 504, report)
+        else:
+            self._json(404, {"error": "Not found"})
+
+    def do_DELETE(self):
+        url = urlparse(self.path)
+        node_url = parse_qs(url.query).get('url', [''])[0]
+        if url.path == '/nodes' and self.controller.unregister(node_url):
+            self._json(200, {"unregistered": node_url})
+        else:
+            self._json(404, {"error": "Unknown node"})
+
+    def _stream(self, lines):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for line in lines:
+                payload = line.encode()
+                self.wfile.write(b'%X\r\n%s\r\n' % (len(payload), payload))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            lines.close()
+
+    def log_message(self, format, *args):
+        print(f"[CLUSTER] {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock server cluster controller')
+    parser.add_argument('--port', type=int, default=9000, help='Controller port (default: 9000)')
+    parser.add_argument('--config', help='Config file that POST /push sends to the nodes')
+    parser.add_argument('--node', action='append', default=[], metavar='URL',
+                        help='Node to manage, e.g. http://localhost:8001 (repeatable)')
+    parser.add_argument('--timeout', type=float, default=5.0, help='Seconds to wait for a node')
+    args = parser.parse_args()
+
+    controller = Controller(args.config, args.timeout)
+    for url in args.node:
+        controller.register(url)
+    ControllerHandler.controller = controller
+    server = ThreadingHTTPServer(('', args.port), ControllerHandler)
+    print(f"Cluster controller on http://localhost:{args.port} ({len(args.node)} nodes)")
+    print(f"Push: POST http://localhost:{args.port}/push")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n Shutting down...")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
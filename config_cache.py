@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Config Cache
+Parsed database files, and the indexes built from them, keyed by the
+SHA-256 of the file content.
+
+In memory, every config loading byte-identical files shares one copy (see
+tenants.py). With a cache directory (--config-cache) the parsed records
+and indexes are also written to disk, so the next start, or a /__reload of
+an unchanged file, loads them with marshal instead of parsing the JSON and
+rebuilding every index:
+
+    python mock_server.py --config-cache .mock_cache
+
+Entries hold only plain data (no pickled classes) and are replaced
+atomically; a missing, stale or unreadable entry is just a miss.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import tempfile
+import threading
+import weakref
+
+# Bump when the layout of cached entries changes
+FORMAT_VERSION = 3
+
+
+class SharedDatabase:
+    """Records parsed from one database file content, shared read-only."""
+
+    __slots__ = ('digest', 'records', '_derived', '_saved', '_lock', '__weakref__')
+
+    def __init__(self, digest, records, derived=None):
+        self.digest = digest
+        self.records = records
+        self._derived = dict(derived or {})
+        # Derived keys already in the on-disk entry
+        self._saved = set(self._derived)
+        self._lock = threading.Lock()
+
+    def derived(self, key, build):
+        """Return what build() makes from the records (an index), building it once per key.
+
+        Values must be plain data (dicts, lists, tuples, scalars) so they can
+        be cached on disk.
+        """
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build()
+            return self._derived[key]
+
+
+class DatabaseCache:
+    """Parsed database files, keyed by the SHA-256 of their content.
+
+    Every config loading byte-identical files gets the same record dicts in
+    a list of its own, so adds and deletes stay per namespace. Records are
+    replaced on update, never changed in place, so sharing them is safe.
+    Indexes built from the records are shared the same way until a config
+    changes its copy. An entry lives as long as some config still holds it.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._entries = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f'{digest}.db.marshal')
+
+    def load(self, path):
+        """Return the SharedDatabase for path's current content."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            shared = self._entries.get(digest)
+            if shared is None:
+                shared = self._read(digest)
+                if shared is None:
+                    records = tuple(record for record in json.loads(data) if record is not None)
+                    shared = SharedDatabase(digest, records)
+                self._entries[digest] = shared
+            return shared
+
+    def _read(self, digest):
+        """Load a cached entry from disk, or None."""
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(digest), 'rb') as f:
+                # marshal.load() on the file object reads it in tiny pieces
+                version, records, derived = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        if version != FORMAT_VERSION:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return SharedDatabase(digest, records, derived)
+
+    def persist(self, shared):
+        """Write shared to disk if it has indexes the cached entry lacks."""
+        if not self.directory:
+            return
+        with shared._lock:
+            if shared._saved == set(shared._derived) and os.path.exists(self._path(shared.digest)):
+                return
+            derived = dict(shared._derived)
+            payload = marshal.dumps((FORMAT_VERSION, shared.records, derived))
+            shared._saved = set(derived)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp, self._path(shared.digest))
+        except OSError as e:
+            print(f"[CACHE] Could not write {self._path(shared.digest)}: {e}")
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {"files": len(entries), "records": sum(len(entry.records) for entry in entries),
+                "disk_hits": self.hits, "disk_misses": self.misses}
@@ -1,43 +1,141 @@
 #!/usr/bin/env python3
 """
 Export server logs to a file
+
+Reads GET /__logs/stream incrementally, so memory stays constant however
+many entries are exported. The output format follows the file name:
+
+    logs.json       {"logs": [...], "count": N}, like GET /__logs
+    logs.ndjson     one entry per line
+    *.gz            either of the above, gzip-compressed
+
+With --follow the export keeps tailing the server until interrupted, and
+--rotate starts a new numbered file every N entries.
 """
 
-import requests
+import argparse
+import gzip
 import json
+import os
 import sys
 from datetime import datetime
 
+import requests
+
+
+class LogWriter:
+    """Writes log entries as they arrive, optionally rotating files."""
+
+    def __init__(self, output_file, rotate=None):
+        self.output_file = output_file
+        self.rotate = rotate
+        self.compressed = output_file.endswith('.gz')
+        name = output_file[:-3] if self.compressed else output_file
+        self.ndjson = name.endswith('.ndjson')
+        self.stem, self.extension = os.path.splitext(name)
+        self.segment = 0
+        self.file = None
+        self.count = 0
+        self.total = 0
+        self.files = []
+
+    def _path(self):
+        if not self.rotate:
+            return self.output_file
+        suffix = '.gz' if self.compressed else ''
+        return f"{self.stem}.{self.segment:05d}{self.extension}{suffix}"
+
+    def _open(self):
+        path = self._path()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.compressed:
+            self.file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+        self.files.append(path)
+        if not self.ndjson:
+            self.file.write('{\n  "logs": [')
 
-def export_logs(port=8000, output_file=None):
+    def _close(self):
+        if not self.ndjson:
+            self.file.write(f'\n  ],\n  "count": {self.count}\n}}\n')
+        self.file.close()
+        self.file = None
+        self.count = 0
+
+    def write(self, entry):
+        """Append one log entry."""
+        if self.file is not None and self.rotate and self.count >= self.rotate:
+            self._close()
+            self.segment += 1
+        if self.file is None:
+            self._open()
+        if self.ndjson:
+            self.file.write(json.dumps(entry) + '\n')
+        else:
+            self.file.write((',' if self.count else '') + '\n    ' + json.dumps(entry))
+        self.count += 1
+        self.total += 1
+
+    def close(self):
+        """Finish the current file (creating an empty one if nothing was written)."""
+        if self.file is None and not self.files:
+            self._open()
+        if self.file is not None:
+            self._close()
+
+
+def export_logs(port=8000, output_file=None, follow=False, since=0, rotate=None):
     """Export logs from server to file."""
-    url = f"http://localhost:{port}/__logs"
-    
+    url = f"http://localhost:{port}/__logs/stream"
+
+    if output_file is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = f"logs/exported_logs_{timestamp}.json"
+
+    writer = LogWriter(output_file, rotate)
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        logs_data = response.json()
-        
-        if output_file is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f"logs/exported_logs_{timestamp}.json"
-        
-        with open(output_file, 'w') as f:
-            json.dump(logs_data, f, indent=2)
-        
-        print(f"✓ Exported {logs_data['count']} logs to {output_file}")
-        
+        # Read timeout well above the server's heartbeat, so a dead server is noticed
+        with requests.get(url, params={"since": since, "follow": int(follow)},
+                          stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if 'dropped' in entry:
+                    print(f"⚠ {entry['dropped']} entries left the server's buffer before export",
+                          file=sys.stderr)
+                    continue
+                writer.write(entry)
+
+    except KeyboardInterrupt:
+        pass
     except requests.exceptions.ConnectionError:
-        print(f"✗ Could not connect to server on port {port}")
-        sys.exit(1)
+        if not writer.files:
+            print(f"✗ Could not connect to server on port {port}")
+            sys.exit(1)
+        print("⚠ Connection lost; keeping what was exported", file=sys.stderr)
     except Exception as e:
+        if writer.files:
+            writer.close()
         print(f"✗ Error: {e}")
         sys.exit(1)
+    writer.close()
+
+    target = output_file if len(writer.files) <= 1 else f"{len(writer.files)} files ({writer.files[0]}, ...)"
+    print(f"✓ Exported {writer.total} logs to {target}")
 
 
 if __name__ == '__main__':
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
-    output = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    export_logs(port, output)
+    parser = argparse.ArgumentParser(description='Export mock server logs')
+    parser.add_argument('port', nargs='?', type=int, default=8000, help='Server port (default: 8000)')
+    parser.add_argument('output', nargs='?', help='Output file (.json, .ndjson, optionally .gz)')
+    parser.add_argument('--follow', action='store_true', help='Keep exporting new entries until interrupted')
+    parser.add_argument('--since', type=int, default=0, help='Only export entries after this seq')
+    parser.add_argument('--rotate', type=int, help='Start a new file every N entries')
+    args = parser.parse_args()
+
+    export_logs(args.port, args.output, args.follow, args.since, args.rotate)
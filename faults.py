@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Fault Injection
+Scheduled and correlated failure modes for endpoints.
+
+A fault rule is a dict with a "type" and when it fires:
+
+    {"type": "error", "status": 503, "rate": 0.2}
+    {"type": "error", "every_s": 60, "for_s": 10}        # burst outage
+    {"type": "error", "rate": 0.5, "ramp_s": 300}         # 0% -> 50% over 5 min
+    {"type": "reset", "rate": 0.05}                       # TCP reset, no response
+    {"type": "truncate", "rate": 0.1, "fraction": 0.5}    # close mid-body
+    {"type": "slow_drip", "bytes_per_second": 200}        # trickle the body
+    {"type": "hang", "hang_ms": 30000}                    # accept, never answer
+
+"rate" (default 1.0) is the probability per request. "every_s"/"for_s"
+restrict the rule to a window at the start of each period, shifted by
+"offset_s". "ramp_s" raises the rate linearly from "ramp_from" (default 0)
+over that many seconds. Times count from when the scenario was activated.
+"""
+
+import random
+import time
+import zlib
+
+FAULT_TYPES = ('error', 'reset', 'truncate', 'slow_drip', 'hang')
+
+
+class FaultRule:
+    """One compiled fault rule; deciding whether it fires is O(1)."""
+
+    DEFAULT_HANG_MS = 300000
+
+    def __init__(self, spec, seed=None):
+        self.spec = spec
+        self.type = spec.get('type', 'error')
+        if self.type not in FAULT_TYPES:
+            raise ValueError(f"Unknown fault type: {self.type}")
+        self.rate = float(spec.get('rate', 1.0))
+        self.every = float(spec['every_s']) if 'every_s' in spec else None
+        self.window = float(spec.get('for_s', 0))
+        self.offset = float(spec.get('offset_s', 0))
+        self.ramp = float(spec['ramp_s']) if spec.get('ramp_s') else None
+        self.ramp_from = float(spec.get('ramp_from', 0.0))
+        if self.every is not None and self.every <= 0:
+            raise ValueError("every_s must be positive")
+
+        self.status = int(spec.get('status', 500))
+        self.body = spec.get('body', {"error": spec.get('message', "Simulated failure")})
+        self.fraction = min(max(float(spec.get('fraction', 0.5)), 0.0), 1.0)
+        self.bytes_per_second = float(spec.get('bytes_per_second', 100))
+        if self.type == 'slow_drip' and self.bytes_per_second <= 0:
+            raise ValueError("bytes_per_second must be positive")
+        self.hang_ms = float(spec.get('hang_ms', self.DEFAULT_HANG_MS))
+        self.rng = random.Random(seed)
+
+    def probability(self, elapsed):
+        """Chance that the rule fires `elapsed` seconds into the scenario."""
+        if self.every is not None and (elapsed - self.offset) % self.every >= self.window:
+            return 0.0
+        if self.ramp is not None and elapsed < self.ramp:
+            return self.ramp_from + (self.rate - self.ramp_from) * max(elapsed, 0) / self.ramp
+        return self.rate
+
+    def fires(self, elapsed):
+        p = self.probability(elapsed)
+        return p >= 1 or (p > 0 and self.rng.random() < p)
+
+    def describe(self, elapsed):
+        return dict(self.spec, type=self.type, current_rate=round(self.probability(elapsed), 4))
+
+
+class FaultSchedule:
+    """Fault rules compiled per endpoint, with the time the scenario started."""
+
+    def __init__(self, rules, started, scenario=None):
+        # id(endpoint) -> (name, tuple of FaultRule)
+        self.rules = rules
+        self.started = started
+        self.scenario = scenario
+
+    def pick(self, endpoint, now=None):
+        """Return the first rule that fires for this request, or None."""
+        entry = self.rules.get(id(endpoint))
+        if entry is None:
+            return None
+        elapsed = (time.time() if now is None else now) - self.started
+        for rule in entry[1]:
+            if rule.fires(elapsed):
+                return rule
+        return None
+
+    def describe(self, now=None):
+        elapsed = (time.time() if now is None else now) - self.started
+        return {name: [rule.describe(elapsed) for rule in rules]
+                for name, rules in self.rules.values()}
+
+
+def endpoint_fault_specs(endpoint, scenario=None):
+    """Rules for one endpoint: the scenario's first, then its own faults and failure_rate."""
+    name = f"{endpoint.get('method', 'GET')} {endpoint.get('path')}"
+    specs = []
+    if scenario:
+        specs.extend(scenario.get(name, []))
+        specs.extend(scenario.get('*', []))
+    specs.extend(endpoint.get('faults', []))
+    if endpoint.get('failure_rate'):
+        specs.append({"type": "error", "status": 500, "rate": endpoint['failure_rate']})
+    return name, specs
+
+
+def compile_schedule(endpoints, scenario=None, started=None, seed=None, scenario_name=None):
+    """Compile every endpoint's rules once, so requests never walk the config.
+
+    Raises ValueError for invalid rules. With a seed, each rule draws from
+    its own reproducible sequence.
+    """
+    rules = {}
+    for endpoint in endpoints:
+        name, specs = endpoint_fault_specs(endpoint, scenario)
+        compiled = []
+        for i, spec in enumerate(specs):
+            rule_seed = None if seed is None else seed ^ zlib.crc32(f"{name}#{i}".encode('utf-8'))
+            try:
+                compiled.append(FaultRule(spec, rule_seed))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid fault for {name}: {e}")
+        if compiled:
+            rules[id(endpoint)] = (name, tuple(compiled))
+    return FaultSchedule(rules, time.time() if started is None else started, scenario_name)
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Push Feeds
+Config-driven event streams served over Server-Sent Events and WebSocket.
+
+An endpoint with a "stream" object is a feed instead of a JSON response:
+
+    "stream": {"event": {"price": "{{random_price}}"}, "interval_ms": 100}
+    "stream": {"replay": "recordings.json", "replay_path": "/api/prices", "speed": 2}
+
+Each event is rendered and encoded once, then the same bytes are queued for
+every subscriber. Queues are bounded ("queue_size" events): a subscriber
+that can't keep up loses its oldest events ("slow_consumer": "drop") or
+is disconnected ("disconnect"). A feed only produces events while it has
+subscribers, and a replay that reaches its end without "loop" ends the
+stream.
+"""
+
+import base64
+import hashlib
+import heapq
+import itertools
+import json
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+SLOW_CONSUMER_POLICIES = ('drop', 'disconnect')
+
+
+def websocket_accept(key):
+    """Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def encode_frame(opcode, payload=b''):
+    """One unmasked, unfragmented server-to-client WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class FrameParser:
+    """Decodes the masked frames a WebSocket client sends."""
+
+    # Clients only need to send control frames; refuse anything huge
+    MAX_FRAME = 64 * 1024
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes; return the complete (opcode, payload) frames."""
+        self.buffer += data
+        frames = []
+        while len(self.buffer) >= 2:
+            opcode, length = self.buffer[0] & 0x0F, self.buffer[1] & 0x7F
+            masked = self.buffer[1] & 0x80
+            offset = 2
+            if length == 126:
+                if len(self.buffer) < 4:
+                    break
+                length, offset = struct.unpack_from('!H', self.buffer, 2)[0], 4
+            elif length == 127:
+                if len(self.buffer) < 10:
+                    break
+                length, offset = struct.unpack_from('!Q', self.buffer, 2)[0], 10
+            if length > self.MAX_FRAME:
+                raise ValueError("WebSocket frame too large")
+            mask_end = offset + (4 if masked else 0)
+            if len(self.buffer) < mask_end + length:
+                break
+            payload = bytes(self.buffer[mask_end:mask_end + length])
+            if masked:
+                mask = self.buffer[offset:mask_end]
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+            del self.buffer[:mask_end + length]
+            frames.append((opcode, payload))
+        return frames
+
+
+class FeedEvent:
+    """One event, encoded at most once per protocol however many subscribers get it."""
+
+    __slots__ = ('id', 'name', 'text', '_sse', '_ws')
+
+    def __init__(self, event_id, name, data):
+        self.id = event_id
+        self.name = name
+        self.text = json.dumps(data)
+        self._sse = None
+        self._ws = None
+
+    @property
+    def sse(self):
+        if self._sse is None:
+            name = f"event: {self.name}\n" if self.name else ''
+            self._sse = f"id: {self.id}\n{name}data: {self.text}\n\n".encode()
+        return self._sse
+
+    @property
+    def ws(self):
+        if self._ws is None:
+            self._ws = encode_frame(OP_TEXT, self.text.encode())
+        return self._ws
+
+
+class Subscriber:
+    """One client's bounded queue of events waiting to be sent.
+
+    None in the queue marks the end of the stream. `wake`, if set, is
+    called whenever something is queued.
+    """
+
+    def __init__(self, feed, kind):
+        self.feed = feed
+        self.kind = kind
+        self.queue = deque()
+        self.dropped = 0
+        self.wake = None
+
+    def push(self, event):
+        """Queue event; False if the subscriber overflowed and must be disconnected."""
+        if event is not None and len(self.queue) >= self.feed.queue_size:
+            if self.feed.slow_consumer == 'disconnect':
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(event)
+        if self.wake is not None:
+            self.wake()
+        return True
+
+    def encode(self, item):
+        """Bytes to send for a queued event (or for raw bytes queued by a transport)."""
+        if isinstance(item, FeedEvent):
+            return item.ws if self.kind == 'websocket' else item.sse
+        return item
+
+
+def load_replay(path, replay_path=None, speed=1.0, interval=1.0):
+    """Read recorded events as a list of (seconds from start, event name, data).
+
+    Entries are recorder.py recordings ({"timestamp", "path", "response"})
+    or plain {"data", "event", "delay_ms"} objects; timestamps or delay_ms
+    set the spacing, otherwise events are `interval` apart.
+    """
+    with open(path, 'r') as f:
+        entries = json.load(f)
+    if replay_path is not None:
+        entries = [entry for entry in entries if entry.get('path') == replay_path]
+    events, offset, first = [], 0.0, None
+    for i, entry in enumerate(entries):
+        if 'delay_ms' in entry:
+            offset += entry['delay_ms'] / 1000 / speed
+        elif 'timestamp' in entry:
+            stamp = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00')).timestamp()
+            first = stamp if first is None else first
+            offset = (stamp - first) / speed
+        elif i:
+            offset += interval
+        data = entry['data'] if 'data' in entry else entry.get('response', entry)
+        events.append((offset, entry.get('event'), data))
+    return events
+
+
+class Feed:
+    """The event source of one streaming endpoint, and its subscribers."""
+
+    def __init__(self, spec, render=None):
+        self.template = spec.get('event')
+        self.event_name = spec.get('event_name')
+        self.interval = spec.get('interval_ms', 1000) / 1000
+        if self.interval <= 0:
+            raise ValueError("interval_ms must be positive")
+        self.loop = spec.get('loop', True)
+        self.queue_size = max(int(spec.get('queue_size', 256)), 1)
+        self.slow_consumer = spec.get('slow_consumer', 'drop')
+        if self.slow_consumer not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"slow_consumer must be one of {', '.join(SLOW_CONSUMER_POLICIES)}")
+        self.replay = None
+        if 'replay' in spec:
+            self.replay = load_replay(spec['replay'], spec.get('replay_path'),
+                                      float(spec.get('speed', 1.0)), self.interval)
+        elif self.template is None:
+            raise ValueError("stream needs an event template or a replay file")
+        self.render = render or (lambda template: template)
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+        self.position = 0
+
+    def subscribe(self, kind):
+        subscriber = Subscriber(self, kind)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def next_event(self):
+        """Produce the next event: (event, seconds until the one after).
+
+        Returns (None, None) when a replay without loop has finished.
+        """
+        if self.replay is None:
+            return FeedEvent(next(self.counter), self.event_name, self.render(self.template)), self.interval
+        if not self.replay or self.position >= len(self.replay):
+            if not self.loop or not self.replay:
+                return None, None
+            self.position = 0
+        offset, name, data = self.replay[self.position]
+        self.position += 1
+        if self.position < len(self.replay):
+            delay = self.replay[self.position][0] - offset
+        else:
+            # Pause before starting over, or end at once
+            delay = self.interval if self.loop else 0
+        return FeedEvent(next(self.counter), name or self.event_name, data), max(delay, 0)
+
+    def publish(self, event):
+        """Queue event (None ends the stream) for every subscriber.
+
+        Returns the subscribers that overflowed and must be disconnected.
+        """
+        with self.lock:
+            subscribers = list(self.subscribers)
+        return [subscriber for subscriber in subscribers if not subscriber.push(event)]
+
+
+class HubConnection(Subscriber):
+    """A subscriber whose socket is written by the FeedHub."""
+
+    def __init__(self, feed, kind, sock):
+        super().__init__(feed, kind)
+        self.sock = sock
+        self.pending = None
+        self.parser = FrameParser() if kind == 'websocket' else None
+        self.closing = False
+
+    def push(self, event):
+        # Nothing may follow a close frame
+        return True if self.closing else super().push(event)
+
+
+class FeedHub:
+    """Produces feed events and writes them to every subscribed socket from one thread.
+
+    Handler threads write the SSE headers or WebSocket handshake and hand
+    the socket over with subscribe(). Sockets are non-blocking; a full send
+    buffer leaves events in the connection's bounded queue until the
+    selector reports room. Create the hub in the process that uses it.
+    """
+
+    def __init__(self):
+        self.timers = []
+        self.counter = itertools.count()
+        self.active_feeds = set()
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.thread = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ)
+        self._incoming = []
+
+    def subscribe(self, feed, sock, kind):
+        """Take ownership of sock and send it feed's events ('sse' or 'websocket')."""
+        sock.setblocking(False)
+        connection = HubConnection(feed, kind, sock)
+        with self.lock:
+            self._incoming.append(connection)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='feeds', daemon=True)
+                self.thread.start()
+        self._wake()
+        return connection
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run(self):
+        while True:
+            timeout = max(self.timers[0][0] - time.monotonic(), 0) if self.timers else None
+            for key, events in self.selector.select(timeout):
+                if key.fileobj is self._wake_r:
+                    self._drain_wakeups()
+                    continue
+                connection = key.data
+                if events & selectors.EVENT_READ:
+                    self._read(connection)
+                if events & selectors.EVENT_WRITE and connection.sock.fileno() >= 0:
+                    self._flush(connection)
+
+            with self.lock:
+                incoming, self._incoming = self._incoming, []
+            for connection in incoming:
+                self._add(connection)
+
+            now = time.monotonic()
+            while self.timers and self.timers[0][0] <= now:
+                _, _, feed = heapq.heappop(self.timers)
+                self._tick(feed, now)
+
+    def _drain_wakeups(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _add(self, connection):
+        feed = connection.feed
+        with feed.lock:
+            feed.subscribers.add(connection)
+        self.selector.register(connection.sock, selectors.EVENT_READ, connection)
+        if feed not in self.active_feeds:
+            # First subscriber in this process starts the feed
+            self.active_feeds.add(feed)
+            heapq.heappush(self.timers, (time.monotonic(), next(self.counter), feed))
+
+    def _tick(self, feed, now):
+        if not feed.subscribers:
+            # Idle feeds stop producing until someone subscribes again
+            self.active_feeds.discard(feed)
+            return
+        event, delay = feed.next_event()
+        for connection in feed.publish(event):
+            self._close(connection)
+        with feed.lock:
+            connections = list(feed.subscribers)
+        for connection in connections:
+            self._flush(connection)
+        if event is None:
+            self.active_feeds.discard(feed)
+        else:
+            heapq.heappush(self.timers, (now + delay, next(self.counter), feed))
+
+    def _read(self, connection):
+        try:
+            data = connection.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(connection)
+            return
+        if connection.parser is None:
+            # SSE clients have nothing to say; ignore whatever they send
+            return
+        try:
+            frames = connection.parser.feed(data)
+        except ValueError:
+            self._close(connection)
+            return
+        for opcode, payload in frames:
+            if opcode == OP_PING:
+                connection.queue.appendleft(encode_frame(OP_PONG, payload))
+            elif opcode == OP_CLOSE:
+                # Echo the close and hang up once it is sent
+                connection.queue.clear()
+                connection.queue.append(encode_frame(OP_CLOSE, payload[:2]))
+                connection.closing = True
+        self._flush(connection)
+
+    def _flush(self, connection):
+        """Send queued bytes until done or the socket's buffer is full."""
+        sock = connection.sock
+        while True:
+            if connection.pending is None:
+                if not connection.queue:
+                    break
+                item = connection.queue.popleft()
+                if item is None:
+                    # End of stream
+                    if connection.kind == 'websocket':
+                        connection.queue.append(encode_frame(OP_CLOSE, struct.pack('!H', 1000)))
+                    connection.closing = True
+                    continue
+                connection.pending = memoryview(connection.encode(item))
+            try:
+                sent = sock.send(connection.pending)
+            except BlockingIOError:
+                self.selector.modify(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, connection)
+                return
+            except OSError:
+                self._close(connection)
+                return
+            connection.pending = connection.pending[sent:] if sent < len(connection.pending) else None
+
+        if connection.closing:
+            self._close(connection)
+        else:
+            self.selector.modify(sock, selectors.EVENT_READ, connection)
+
+    def _close(self, connection):
+        connection.feed.unsubscribe(connection)
+        try:
+            self.selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            connection.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        connection.sock.close()
@@ -1,10 +1,31 @@
 #!/usr/bin/env python3
 """
-Generate dummy endpoint configurations
+Generate dummy endpoint configurations and synthetic databases
 """
 
 import json
-import sys
+import random
+import argparse
+
+
+GENRES = [
+    "Action", "RPG", "Story", "Multiplayer", "Open World", "Simulation",
+    "FPS", "Survival", "Sandbox", "Strategy", "Horror", "TPS", "Puzzle",
+    "Stealth", "Platformer", "Metroidvania", "Fighting", "Roguelike",
+    "Real-Time Strategy", "Turn-Based Strategy", "Sports", "Racing",
+    "Card / Deck-Building", "Tower Defense"
+]
+
+RESOURCES = ["games", "users", "orders", "reviews", "studios", "bundles", "players", "events"]
+
+# Default number of distinct values per database field (title is always unique)
+DEFAULT_CARDINALITY = {
+    "discounts_and_events": 100,
+    "new_release": 2,
+    "highest_rated": 2,
+    "genres": len(GENRES),
+    "sales_leaderboard": 1000
+}
 
 
 def generate_dummy_config(num_endpoints=5):
@@ -14,7 +35,7 @@ def generate_dummy_config(num_endpoints=5):
         "cors": True,
         "endpoints": []
     }
-    
+
     for i in range(1, num_endpoints + 1):
         endpoint = {
             "path": f"/api/dummy{i}",
@@ -23,28 +44,194 @@ def generate_dummy_config(num_endpoints=5):
                 "id": i,
                 "message": f"Dummy endpoint {i}",
                 "timestamp": "{{timestamp}}",
-                "request_id": "{{uuid}}"
+                "request_id": "{{request_uuid}}"
             },
             "status": 200,
             "latency_ms": 50,
             "failure_rate": 0.0
         }
         config["endpoints"].append(endpoint)
-    
+
+    return config
+
+
+def _nested_body(rng, depth):
+    """Build a nested, template-heavy response body."""
+    body = {
+        "id": "{{uuid}}",
+        "generated_at": "{{timestamp}}",
+        "score": "{{random_int}}",
+        "price": "{{random_price}}"
+    }
+    if depth > 0:
+        body["items"] = [_nested_body(rng, depth - 1) for _ in range(rng.randint(1, 3))]
+        body["meta"] = {
+            "requested_by": "{{query.user}}",
+            "page": "{{query.page}}",
+            "trace": {"span": "{{uuid}}", "at": "{{timestamp}}"}
+        }
+    return body
+
+
+def _database_body(rng):
+    """Build a response body driven by one of the database directives."""
+    choice = rng.randrange(5)
+    if choice == 0:
+        return {"games": "{{database}}", "total": "{{database_count}}", "timestamp": "{{timestamp}}"}
+    if choice == 1:
+        field = rng.choice(["new_release", "highest_rated"])
+        return {"games": f"{{{{database_filter:{field}:true}}}}", "timestamp": "{{timestamp}}"}
+    if choice == 2:
+        return {"game": "{{database_find:title:{{query.title}}}}", "timestamp": "{{timestamp}}"}
+    if choice == 3:
+        return {"games": "{{database_filter_genre:{{query.genre}}}}", "genre": "{{query.genre}}"}
+    return {"games": f"{{{{database_filter_genre:{rng.choice(GENRES)}}}}}", "total": "{{database_count}}"}
+
+
+def iter_realistic_endpoints(num_endpoints, seed=None):
+    """Yield endpoints with mixed methods, id-bearing paths and nested bodies.
+
+    Routing is exact-match, so path parameters are emitted as concrete
+    segments (e.g. /api/orders/42/reviews) to produce a wide, deep route table.
+    """
+    rng = random.Random(seed)
+    for i in range(1, num_endpoints + 1):
+        resource = rng.choice(RESOURCES)
+        method = rng.choices(["GET", "POST", "DELETE"], weights=[70, 20, 10])[0]
+        path = f"/api/{resource}/{i}"
+        if rng.random() < 0.5:
+            path += f"/{rng.choice(RESOURCES)}"
+
+        if method == "GET" and rng.random() < 0.4:
+            response = _database_body(rng)
+        elif method == "POST":
+            response = {
+                "message": f"Created {resource}",
+                "id": "{{uuid}}",
+                "name": "{{query.name}}",
+                "created_at": "{{timestamp}}",
+                "details": _nested_body(rng, 1)
+            }
+        elif method == "DELETE":
+            response = {"message": f"Deleted {resource}", "id": "{{query.id}}", "deleted_at": "{{timestamp}}"}
+        else:
+            response = _nested_body(rng, rng.randint(1, 3))
+
+        yield {
+            "path": path,
+            "method": method,
+            "response": response,
+            "status": {"GET": 200, "POST": 201, "DELETE": 200}[method],
+            "latency_ms": rng.choice([0, 5, 10, 25, 50, 100]),
+            "failure_rate": rng.choice([0.0, 0.0, 0.0, 0.01, 0.05])
+        }
+
+
+def generate_realistic_config(num_endpoints=50, database_path=None, seed=None):
+    """Generate a config with realistic routing and rendering workloads."""
+    config = {
+        "port": 8000,
+        "cors": True,
+        "endpoints": list(iter_realistic_endpoints(num_endpoints, seed))
+    }
+    if database_path:
+        config["database"] = database_path
     return config
 
 
+def write_realistic_config(output_file, num_endpoints, database_path=None, seed=None):
+    """Stream a realistic config to disk one endpoint at a time."""
+    with open(output_file, 'w') as f:
+        f.write('{\n  "port": 8000,\n  "cors": true,\n')
+        if database_path:
+            f.write(f'  "database": {json.dumps(database_path)},\n')
+        f.write('  "endpoints": [')
+        for i, endpoint in enumerate(iter_realistic_endpoints(num_endpoints, seed)):
+            f.write(',\n    ' if i else '\n    ')
+            f.write(json.dumps(endpoint))
+        f.write('\n  ]\n}\n')
+
+
+def iter_game_records(num_records, cardinality=None, seed=None):
+    """Yield GAMES.JSON-shaped records with a bounded number of values per field."""
+    rng = random.Random(seed)
+    card = dict(DEFAULT_CARDINALITY)
+    card.update(cardinality or {})
+
+    # The first 100 are plain percentages; past that, events keep values distinct
+    discounts = [f"{(i * 7) % 100}%" if i < 100 else f"{(i * 7) % 100}% off #{i}"
+                 for i in range(max(1, card["discounts_and_events"]))]
+    genres = GENRES[:max(1, min(card["genres"], len(GENRES)))]
+    if card["genres"] > len(GENRES):
+        genres = genres + [f"Genre {i}" for i in range(len(GENRES), card["genres"])]
+    leaderboard = max(1, card["sales_leaderboard"])
+
+    for i in range(1, num_records + 1):
+        yield {
+            "title": f"Game {i:07d}",
+            "discounts_and_events": discounts[rng.randrange(len(discounts))],
+            "new_release": rng.randrange(max(1, card["new_release"])) == 1,
+            "highest_rated": rng.randrange(max(1, card["highest_rated"])) == 1,
+            "genres": rng.sample(genres, min(len(genres), rng.randint(1, 3))),
+            "sales_leaderboard": rng.randrange(leaderboard) + 1
+        }
+
+
+def write_database(output_file, num_records, cardinality=None, seed=None):
+    """Stream a synthetic database to disk, one record per line.
+
+    Memory use is independent of num_records; the output is a valid JSON array.
+    """
+    with open(output_file, 'w', buffering=1 << 20) as f:
+        f.write('[')
+        for i, record in enumerate(iter_game_records(num_records, cardinality, seed)):
+            f.write(',\n  ' if i else '\n  ')
+            f.write(json.dumps(record))
+        f.write('\n]\n')
+
+
+def _parse_cardinality(values):
+    """Parse repeated field=N options."""
+    cardinality = {}
+    for item in values or []:
+        field, _, count = item.partition('=')
+        if field not in DEFAULT_CARDINALITY or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid cardinality: {item}")
+        cardinality[field] = int(count)
+    return cardinality
+
+
 def main():
     """Main entry point."""
-    num = int(sys.argv[1]) if len(sys.argv) > 1 else 5
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "config/dummy_config.json"
-    
-    config = generate_dummy_config(num)
-    
-    with open(output_file, 'w') as f:
-        json.dump(config, f, indent=2)
-    
-    print(f"✓ Generated {num} dummy endpoints in {output_file}")
+    parser = argparse.ArgumentParser(description='Generate dummy configs and databases')
+    parser.add_argument('num', nargs='?', type=int, default=5, help='Number of endpoints')
+    parser.add_argument('output', nargs='?', default='config/dummy_config.json', help='Config output file')
+    parser.add_argument('--realistic', action='store_true',
+                        help='Mixed methods, nested template bodies and database directives')
+    parser.add_argument('--database', help='Also write a synthetic database to this file')
+    parser.add_argument('--records', type=int, default=1000, help='Number of database records')
+    parser.add_argument('--cardinality', action='append', metavar='FIELD=N',
+                        help='Distinct values for a database field (repeatable)')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible output')
+    args = parser.parse_args()
+
+    try:
+        cardinality = _parse_cardinality(args.cardinality)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if args.database:
+        write_database(args.database, args.records, cardinality, args.seed)
+        print(f"✓ Generated {args.records} database records in {args.database}")
+
+    if args.realistic:
+        write_realistic_config(args.output, args.num, args.database, args.seed)
+    else:
+        config = generate_dummy_config(args.num)
+        with open(args.output, 'w') as f:
+            json.dump(config, f, indent=2)
+
+    print(f"✓ Generated {args.num} dummy endpoints in {args.output}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Latency Distributions
+Samplers for an endpoint's simulated latency, and a tool that fits
+percentile tables from exported logs or recordings.
+
+An endpoint's "latency_ms" is either a fixed number of milliseconds or a
+distribution:
+
+    {"distribution": "uniform", "min_ms": 10, "max_ms": 50}
+    {"distribution": "normal", "mean_ms": 100, "stddev_ms": 20}
+    {"distribution": "lognormal", "median_ms": 80, "sigma": 0.6}
+    {"distribution": "pareto", "scale_ms": 20, "alpha": 2.5}
+    {"distribution": "empirical", "p50": 40, "p90": 120, "p99": 400}
+
+Every distribution also accepts "max_ms" (a cap) and "seed".
+"""
+
+import bisect
+import json
+import math
+import random
+import re
+import sys
+import threading
+import zlib
+
+
+class LatencySampler:
+    """Draws latencies from precomputed batches.
+
+    Sampling a whole batch at once keeps the per-request cost to an index
+    increment; the batch is refilled from the endpoint's own seeded RNG,
+    so runs are reproducible per endpoint.
+    """
+
+    BATCH_SIZE = 1024
+
+    def __init__(self, draw, seed=None, max_ms=None, batch_size=BATCH_SIZE):
+        self.draw = draw
+        self.rng = random.Random(seed)
+        self.max_ms = max_ms
+        self.batch_size = batch_size
+        self.batch = []
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        cap = self.max_ms if self.max_ms is not None else math.inf
+        self.batch = [min(max(value, 0.0), cap) for value in self.draw(self.rng, self.batch_size)]
+        self.position = 0
+
+    def sample(self):
+        """Return the next latency in milliseconds."""
+        with self.lock:
+            if self.position == len(self.batch):
+                self._refill()
+            value = self.batch[self.position]
+            self.position += 1
+            return value
+
+
+def _percentile_table(spec):
+    """Return sorted (probability, ms) knots for an empirical distribution."""
+    knots = []
+    for key, value in spec.items():
+        match = re.fullmatch(r'p(\d+(?:\.\d+)?)', key)
+        if match:
+            knots.append((float(match.group(1)) / 100, float(value)))
+    knots.sort()
+    if not knots:
+        raise ValueError("empirical latency needs percentiles such as p50, p90, p99")
+    if any(b[1] < a[1] for a, b in zip(knots, knots[1:])):
+        raise ValueError("percentiles must not decrease")
+
+    if knots[0][0] > 0:
+        knots.insert(0, (0.0, float(spec.get('min_ms', 0))))
+    if knots[-1][0] < 1:
+        # Continue the slope of the last two percentiles up to p100
+        (p1, v1), (p2, v2) = knots[-2], knots[-1]
+        slope = (v2 - v1) / (p2 - p1) if p2 > p1 else 0
+        knots.append((1.0, v2 + slope * (1 - p2)))
+    return knots
+
+
+def _empirical_draw(spec):
+    """Inverse-CDF sampling by linear interpolation between percentiles."""
+    knots = _percentile_table(spec)
+    probabilities = [p for p, _ in knots]
+    values = [v for _, v in knots]
+
+    def draw(rng, n):
+        samples = []
+        for u in (rng.random() for _ in range(n)):
+            i = max(bisect.bisect_right(probabilities, u), 1)
+            p1, p2 = probabilities[i - 1], probabilities[i]
+            v1, v2 = values[i - 1], values[i]
+            samples.append(v1 + (v2 - v1) * (u - p1) / (p2 - p1) if p2 > p1 else v2)
+        return samples
+    return draw
+
+
+def _distribution_draw(spec):
+    """Return draw(rng, n) for a distribution spec."""
+    kind = spec.get('distribution')
+    if kind == 'uniform':
+        low, high = float(spec['min_ms']), float(spec['max_ms'])
+        return lambda rng, n: [rng.uniform(low, high) for _ in range(n)]
+    if kind == 'normal':
+        mean, stddev = float(spec['mean_ms']), float(spec['stddev_ms'])
+        return lambda rng, n: [rng.gauss(mean, stddev) for _ in range(n)]
+    if kind == 'lognormal':
+        mu, sigma = math.log(float(spec['median_ms'])), float(spec['sigma'])
+        return lambda rng, n: [rng.lognormvariate(mu, sigma) for _ in range(n)]
+    if kind == 'pareto':
+        scale, alpha = float(spec['scale_ms']), float(spec['alpha'])
+        return lambda rng, n: [scale * rng.paretovariate(alpha) for _ in range(n)]
+    if kind == 'empirical':
+        return _empirical_draw(spec)
+    raise ValueError(f"Unknown latency distribution: {kind}")
+
+
+def create_sampler(spec, name='', default_seed=None):
+    """Create a sampler for a distribution spec.
+
+    Without an explicit "seed", a default seed is combined with the endpoint
+    name so every endpoint gets its own reproducible sequence.
+    """
+    try:
+        draw = _distribution_draw(spec)
+    except KeyError as e:
+        raise ValueError(f"{spec.get('distribution')} latency needs {e.args[0]}")
+    seed = spec.get('seed')
+    if seed is None and default_seed is not None:
+        seed = default_seed ^ zlib.crc32(name.encode('utf-8'))
+    max_ms = spec.get('max_ms')
+    return LatencySampler(draw, seed, float(max_ms) if max_ms is not None else None)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def fit_percentiles(latencies, percentiles=(50, 90, 99)):
+    """Fit an empirical distribution spec to observed latencies."""
+    values = sorted(latencies)
+    spec = {"distribution": "empirical"}
+    for pct in percentiles:
+        spec[f"p{pct:g}"] = round(percentile(values, pct), 1)
+    spec["max_ms"] = round(values[-1], 1)
+    return spec
+
+
+def iter_latency_entries(data):
+    """Yield (method, path, latency_ms) from a /__logs export or a recordings file."""
+    entries = data.get('logs', []) if isinstance(data, dict) else data
+    for entry in entries:
+        latency = entry.get('latency_ms')
+        if isinstance(latency, (int, float)):
+            yield entry.get('method', 'GET'), entry.get('path', ''), latency
+
+
+def load_entries(path):
+    """Read a logs export (.json or .ndjson, optionally .gz) or recordings file."""
+    import gzip
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        if path.removesuffix('.gz').endswith('.ndjson'):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def fit_file(path, min_samples=20, percentiles=(50, 90, 99)):
+    """Fit a spec per "METHOD path" in a logs export or recordings file."""
+    observed = {}
+    for method, endpoint, latency in iter_latency_entries(load_entries(path)):
+        observed.setdefault(f"{method} {endpoint}", []).append(latency)
+    return {name: fit_percentiles(values, percentiles)
+            for name, values in sorted(observed.items()) if len(values) >= min_samples}
+
+
+def main():
+    """Main entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Fit latency distributions from logs')
+    parser.add_argument('file', help='Exported logs (.json, .ndjson, .gz) or recordings file with latency_ms')
+    parser.add_argument('--min-samples', type=int, default=20, help='Skip endpoints with fewer samples')
+    parser.add_argument('--percentiles', default='50,90,99', help='Comma-separated percentiles to fit')
+    args = parser.parse_args()
+
+    percentiles = [float(p) for p in args.percentiles.split(',')]
+    fitted = fit_file(args.file, args.min_samples, percentiles)
+    if not fitted:
+        print(f"✗ No endpoint has {args.min_samples} latency samples", file=sys.stderr)
+        sys.exit(1)
+    json.dump(fitted, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
-from fastapi import FastAPI, Query
+"""
+FastAPI entry point
+Config-driven mocks (templates, latency, failures, logs) are served by the
+mock engine mounted at "/"; FastAPI routes added here take precedence.
+
+    python main.py --config config.json --port 8000
+    MOCK_CONFIG=config.json uvicorn main:app
+"""
+
+import argparse
+import os
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+from asgi import create_app
 
 # ---------------- CORS ----------------
 origins = [
@@ -10,72 +22,44 @@ origins = [
     "http://localhost:3000"
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# ---------------- Test Route ----------------
-@app.get("/test")
-def test():
-    return {"message": "Backend is working!"}
-
-# ---------------- Game Endpoints ----------------
-@app.get("/api/games")
-def get_games():
-    return [
-        {"title": "Minecraft", "genre": "Sandbox"},
-        {"title": "Valorant", "genre": "FPS"},
-        {"title": "The Witcher 3", "genre": "RPG"}
-    ]
-
-@app.get("/api/games/new-releases")
-def new_releases():
-    return [
-        {"title": "Cyberpunk 2077", "release_date": "2023-12-01"},
-        {"title": "Elden Ring", "release_date": "2023-11-15"}
-    ]
 
-@app.get("/api/games/highest-rated")
-def highest_rated():
-    return [
-        {"title": "The Witcher 3", "rating": 9.5},
-        {"title": "God of War", "rating": 9.4}
-    ]
+def build_app(mock_app):
+    """FastAPI app with mock_app (an asgi.MockASGIApp) mounted underneath."""
+    app = FastAPI()
 
-@app.get("/api/games/discounts")
-def discounts():
-    return [
-        {"title": "Among Us", "discount": "50%"},
-        {"title": "Stardew Valley", "discount": "30%"}
-    ]
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-@app.get("/api/games/search")
-def search_games(title: str = Query(...)):
-    return [{"title": title, "genre": "Demo"}]
+    # ---------------- Test Route ----------------
+    @app.get("/test")
+    def test():
+        return {"message": "Backend is working!"}
 
-@app.get("/api/games/genre")
-def get_genre(genre: str = Query(...)):
-    return [
-        {"title": f"Sample {genre} Game 1", "genre": genre},
-        {"title": f"Sample {genre} Game 2", "genre": genre}
-    ]
+    # ---------------- Mock Engine ----------------
+    # The middleware answers CORS for the engine's routes too; the engine
+    # allows no origins itself so its "*" never reaches other origins
+    mock_app.engine.cors_origins = []
+    app.mount("/", mock_app)
+    return app
 
-@app.post("/api/games/review")
-def post_review(title: str = Query(...), review: str = Query(...)):
-    return {"message": f"Review for {title} received!", "review": review}
 
-@app.get("/api/games/wishlist")
-def get_wishlist():
-    return [{"title": "Minecraft"}, {"title": "Valorant"}]
+if __name__ == '__main__':
+    import uvicorn
 
-@app.post("/api/games/wishlist")
-def add_wishlist(title: str = Query(...)):
-    return {"message": f"{title} added to wishlist!"}
+    parser = argparse.ArgumentParser(description='Local API Mock Server (ASGI)')
+    parser.add_argument('--config', default=os.environ.get('MOCK_CONFIG', 'config.json'),
+                        help='Configuration file path')
+    parser.add_argument('--port', type=int, help='Server port (overrides config)')
+    parser.add_argument('--host', default='0.0.0.0', help='Interface to listen on')
+    args = parser.parse_args()
 
-@app.delete("/api/games/wishlist")
-def remove_wishlist(title: str = Query(...)):
-    return {"message": f"{title} removed from wishlist!"}
+    mock_app = create_app(args.config)
+    port = args.port or mock_app.engine.config.get('port', 8000)
+    uvicorn.run(build_app(mock_app), host=args.host, port=port)
+else:
+    app = build_app(create_app())
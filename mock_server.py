@@ -4,107 +4,1491 @@ Local API Mock Server
 Configurable HTTP server for testing with latency and failure simulation.
 """
 
-import json
 import time
-import argparse
+# --startup-profile counts import time from here
+_IMPORTS_STARTED = time.perf_counter()
+import io
+import json
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
 from datetime import datetime, timezone
 import random
-import uuid
+import itertools
 import re
 import os
 import mimetypes
+import gc
+import copy
+import hashlib
+import tempfile
+import bisect
+import signal
+import socket
+import struct
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from state_backends import BACKENDS, CHANNELS, StateBackendError, create_backend
+from latency import create_sampler
+from capacity import create_limits
+from request_body import BodyTooLarge, read_body
+from config_cache import DatabaseCache
+# Opt-in features (faults, pacing, feeds, profiling, tenants, cluster) are
+# imported where they are first used, so servers without them don't pay
 
 
 
 
-class WishlistManager:
-    """Manages in-memory wishlist storage."""
+class ReplicatedState:
+    """Base for state that may be shared through a state backend journal.
+    
+    Subclasses keep a local copy of their state and implement `_apply` for
+    journal entries and `_reset_local` for a journal reset. Mutations run
+    inside `_mutation()` and call `_commit` before changing local state.
+    Without a journal (the in-process backend) nothing is replayed.
+    Callers must hold `self.lock`.
+    
+    Subclasses that implement `_capture` and `_reinstate` also get named
+    snapshots (see `snapshot`); taking and restoring one are journal
+    entries too, so every process keeps the same snapshots.
+    
+    They also get journal checkpoints: when the journal asks for one, the
+    next writer logs the whole state (live and snapshots, as encoded by
+    `_encode`) in a new epoch, and processes that fell behind, or attach
+    later, restore it instead of replaying the entries it replaced.
+    """
     
     def __init__(self):
-        self.wishlist = []
         self.lock = threading.Lock()
+        self.journal = None
+        self._journal_epoch = 0
+        self._journal_seq = 0
+        self._seen_changes = None
+        # name -> whatever _capture() returned
+        self.snapshots = {}
+    
+    def attach_journal(self, journal):
+        """Share mutations with other processes through a journal."""
+        with self.lock:
+            self.journal = journal
+            self._seen_changes = journal.changes()
+            self._journal_epoch, ops = journal.since(None, 0)
+            self._journal_seq = 0
+            if ops and ops[0][0] == 'checkpoint':
+                self._restore_checkpoint(ops[0][3])
+                ops, self._journal_seq = ops[1:], 1
+            for op in ops:
+                self._apply(op)
+            self._journal_seq += len(ops)
+    
+    def _refresh(self):
+        """Replay entries committed elsewhere (O(1) when already current)."""
+        if self.journal is not None and self.journal.changes() != self._seen_changes:
+            self._sync_locked()
+    
+    def _sync_locked(self):
+        """Replay journal entries this process has not applied yet."""
+        self._seen_changes = self.journal.changes()
+        epoch, ops = self.journal.since(self._journal_epoch, self._journal_seq)
+        if epoch != self._journal_epoch and ops and ops[0][0] == 'checkpoint':
+            # The log was compacted; a process that had applied all of it
+            # already has the checkpoint's state
+            _, from_epoch, from_seq, state = ops[0]
+            if (from_epoch, from_seq) != (self._journal_epoch, self._journal_seq):
+                self._restore_checkpoint(state)
+            self._journal_epoch, self._journal_seq = epoch, 1
+            ops = ops[1:]
+        elif epoch != self._journal_epoch:
+            # Someone reset the journal: rebuild, then replay the new epoch
+            self._reset_local()
+            self._journal_epoch = epoch
+            self._journal_seq = 0
+        for op in ops:
+            self._apply(op)
+        self._journal_seq += len(ops)
+    
+    @contextmanager
+    def _mutation(self):
+        """Exclude writers in other processes and bring local state up to date.
+        
+        Validation done inside the block sees every committed entry, so a
+        following `_commit` cannot conflict.
+        """
+        if self.journal is None:
+            yield
+            return
+        with self.journal.write_lock():
+            self._sync_locked()
+            if self.journal.needs_checkpoint():
+                self._write_checkpoint()
+            yield
+    
+    def _write_checkpoint(self):
+        """Compact the journal into one entry holding the current state (inside `_mutation`)."""
+        op = ['checkpoint', self._journal_epoch, self._journal_seq, self._checkpoint_state()]
+        ok, self._journal_epoch, self._journal_seq = self.journal.checkpoint(
+            self._journal_epoch, self._journal_seq, op)
+        if not ok:
+            raise StateBackendError("Journal changed during a checkpoint")
+    
+    def _checkpoint_state(self):
+        """The live state and snapshots as plain data; shared captures are written once."""
+        states, refs = [], {}
+        
+        def ref(captured):
+            key = self._capture_key(captured)
+            if key not in refs:
+                refs[key] = len(states)
+                states.append(self._encode(captured))
+            return refs[key]
+        
+        live = ref(self._capture())
+        return {"states": states, "live": live,
+                "snapshots": {name: ref(captured) for name, captured in self.snapshots.items()}}
+    
+    def _restore_checkpoint(self, state):
+        captures = [self._decode(encoded) for encoded in state["states"]]
+        self.snapshots = {name: captures[i] for name, i in state["snapshots"].items()}
+        self._reinstate(captures[state["live"]])
+    
+    def _capture_key(self, captured):
+        """Identifies captures sharing their data, so checkpoints write it once."""
+        return id(captured)
+    
+    def _encode(self, captured):
+        """A capture as JSON-serializable data, for checkpoints."""
+        return captured
+    
+    def _decode(self, encoded):
+        """A capture from `_encode`'s data."""
+        return encoded
+    
+    def _commit(self, op):
+        """Append a validated mutation to the journal (inside `_mutation`)."""
+        if self.journal is not None:
+            ok, epoch, self._journal_seq = self.journal.append(
+                self._journal_epoch, self._journal_seq, op)
+            if not ok:
+                raise StateBackendError("Journal changed during a mutation")
+    
+    def _reset_journal(self):
+        """Start a new journal epoch; other processes reset when they notice."""
+        if self.journal is not None:
+            self._seen_changes = self.journal.changes()
+            self._journal_epoch = self.journal.reset()
+            self._journal_seq = 0
+    
+    def snapshot(self, name):
+        """Remember the current state as name, replacing any earlier snapshot.
+        
+        O(1): the snapshot shares the state's containers, and whichever
+        side writes first copies them.
+        """
+        return self._snapshot_op(['snapshot', name])
+    
+    def restore(self, name):
+        """Go back to snapshot name in O(1); False if there is no such snapshot."""
+        return self._snapshot_op(['restore', name])
+    
+    def drop_snapshot(self, name):
+        """Forget snapshot name; False if there is no such snapshot."""
+        return self._snapshot_op(['snapshot_drop', name])
     
-    def get_all(self):
+    def snapshot_names(self):
+        with self.lock:
+            self._refresh()
+            return sorted(self.snapshots)
+    
+    def _snapshot_op(self, op):
+        with self.lock:
+            try:
+                with self._mutation():
+                    if op[0] != 'snapshot' and op[1] not in self.snapshots:
+                        return False
+                    self._commit(op)
+                    self._apply_snapshot_op(op)
+                    return True
+            except StateBackendError as e:
+                print(f"[STATE] {e}")
+                return False
+    
+    def _apply_snapshot_op(self, op):
+        """Apply a snapshot journal entry; False if op is not one."""
+        if op[0] == 'snapshot':
+            self.snapshots[op[1]] = self._capture()
+        elif op[0] == 'restore':
+            if op[1] in self.snapshots:
+                self._reinstate(self.snapshots[op[1]])
+        elif op[0] == 'snapshot_drop':
+            self.snapshots.pop(op[1], None)
+        else:
+            return False
+        return True
+    
+    def _apply(self, op):
+        raise NotImplementedError
+    
+    def _reset_local(self):
+        raise NotImplementedError
+    
+    def _capture(self):
+        """Return the state for a snapshot; mark it shared so writes copy it first."""
+        raise NotImplementedError
+    
+    def _reinstate(self, state):
+        """Make a captured state current again, still shared with its snapshot."""
+        raise NotImplementedError
+
+
+class WishlistManager(ReplicatedState):
+    """Manages in-memory wishlist storage.
+    
+    Items are kept per session (virtual user) in insertion-ordered dicts
+    keyed by title, so add, remove and lookups are O(1).
+    
+    Snapshots share the dicts: after taking or restoring one, the first
+    change copies the outer dict, and each session's items are copied the
+    first time that session changes.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.wishlists = {}
+        self._shared = False
+        # Sessions whose items were copied since the last capture
+        self._owned = set()
+        self.snapshots['initial'] = {}
+    
+    def fork(self):
+        """A wishlist starting from this one's items and snapshots, in O(1)."""
+        with self.lock:
+            self._refresh()
+            fork = WishlistManager()
+            fork.snapshots = dict(self.snapshots)
+            fork._reinstate(self._capture())
+            return fork
+    
+    def get_all(self, session=''):
         """Get all wishlist items."""
         with self.lock:
-            return list(self.wishlist)
+            self._refresh()
+            return list(self.wishlists.get(session, {}).values())
     
-    def add(self, title):
-        """Add a game to wishlist."""
+    def get_page(self, session='', offset=0, limit=None):
+        """Get a slice of wishlist items and the total count."""
         with self.lock:
-            # Check if already in wishlist
-            if any(item['title'] == title for item in self.wishlist):
-                return False, "Game already in wishlist"
-            
-            # Add new item
-            item = {
-                "title": title,
-                "added_at": datetime.now(timezone.utc).isoformat(),
-                "price": f"${random.randint(20, 80)}"
-            }
-            self.wishlist.append(item)
-            return True, "Added to wishlist"
+            self._refresh()
+            items = self.wishlists.get(session, {})
+            stop = None if limit is None else offset + limit
+            return list(itertools.islice(items.values(), offset, stop)), len(items)
+    
+    def add(self, title, session=''):
+        """Add a game to wishlist.
+        
+        Returns (success, message, items in the session's wishlist).
+        """
+        # Price and timestamp are picked once so every replica stores the same item
+        item = {
+            "title": title,
+            "added_at": datetime.now(timezone.utc).isoformat(),
+            "price": f"${random.randint(20, 80)}"
+        }
+        with self.lock:
+            try:
+                with self._mutation():
+                    items = self.wishlists.get(session, {})
+                    # Check if already in wishlist
+                    if title in items:
+                        return False, "Game already in wishlist", len(items)
+                    
+                    self._commit(['wishlist_add', session, item])
+                    self._add_local(session, item)
+                    return True, "Added to wishlist", len(self.wishlists[session])
+            except StateBackendError as e:
+                print(f"[STATE] {e}")
+                return False, str(e), len(self.wishlists.get(session, {}))
     
-    def remove(self, title):
-        """Remove a game from wishlist."""
+    def remove(self, title, session=''):
+        """Remove a game from wishlist.
+        
+        Returns (success, message, items in the session's wishlist).
+        """
         with self.lock:
-            # Find and remove the item
-            for i, item in enumerate(self.wishlist):
-                if item['title'] == title:
-                    self.wishlist.pop(i)
-                    return True, "Removed from wishlist"
-            return False, "Game not found in wishlist"
+            try:
+                with self._mutation():
+                    items = self.wishlists.get(session, {})
+                    if title not in items:
+                        return False, "Game not found in wishlist", len(items)
+                    
+                    self._commit(['wishlist_remove', session, title])
+                    self._remove_local(session, title)
+                    return True, "Removed from wishlist", len(self.wishlists.get(session, {}))
+            except StateBackendError as e:
+                print(f"[STATE] {e}")
+                return False, str(e), len(self.wishlists.get(session, {}))
     
-    def count(self):
+    def count(self, session=''):
         """Get total items in wishlist."""
         with self.lock:
-            return len(self.wishlist)
+            self._refresh()
+            return len(self.wishlists.get(session, {}))
+    
+    def _items(self, session):
+        """The session's items for changing, copied first if a snapshot shares them."""
+        if self._shared:
+            self.wishlists = dict(self.wishlists)
+            self._shared = False
+        items = self.wishlists.get(session)
+        if items is None:
+            items = self.wishlists[session] = {}
+            self._owned.add(session)
+        elif session not in self._owned:
+            items = self.wishlists[session] = dict(items)
+            self._owned.add(session)
+        return items
+    
+    def _add_local(self, session, item):
+        self._items(session)[item['title']] = item
+    
+    def _remove_local(self, session, title):
+        if session not in self.wishlists:
+            return
+        items = self._items(session)
+        if items.pop(title, None) is not None and not items:
+            # Drop empty partitions so idle sessions don't accumulate
+            del self.wishlists[session]
+    
+    def _apply(self, op):
+        if op[0] == 'wishlist_add':
+            self._add_local(op[1], op[2])
+        elif op[0] == 'wishlist_remove':
+            self._remove_local(op[1], op[2])
+        else:
+            self._apply_snapshot_op(op)
+    
+    def _reset_local(self):
+        self.wishlists = {}
+        self._shared = False
+        self._owned = set()
+        self.snapshots = {'initial': {}}
+    
+    def _capture(self):
+        self._shared = True
+        self._owned = set()
+        return self.wishlists
+    
+    def _reinstate(self, state):
+        self.wishlists = state
+        self._shared = True
+        self._owned = set()
+
+
+class FaultController(ReplicatedState):
+    """The active fault scenario, switchable at runtime.
+    
+    Switching is a journal entry, so every worker changes scenario (and
+    starts its burst and ramp clocks) at the same moment. Rules are compiled
+    into a FaultSchedule when the scenario or the config changes, so
+    picking a fault for a request is a dict lookup plus a few comparisons.
+    """
+    
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        # None follows the config's "fault_scenario"; otherwise
+        # {"name", "rules" (inline scenario or None), "started"}
+        self.selection = None
+        self.schedule = None
+        self._compiled_for = None
+    
+    def _scenario(self, config_data):
+        """Return (name, scenario rules, start time) for the current selection."""
+        if self.selection is None:
+            name = config_data.get('fault_scenario')
+            started = self.config.loaded_at
+        else:
+            name, started = self.selection['name'], self.selection['started']
+            if self.selection['rules'] is not None:
+                return name, self.selection['rules'], started
+        scenario = config_data.get('fault_scenarios', {}).get(name) if name else None
+        if name and scenario is None:
+            print(f"[FAULTS] Unknown scenario: {name}")
+        return name, scenario, started
+    
+    def _schedule_locked(self, always=False):
+        """The compiled FaultSchedule, or None if nothing can fail (unless always)."""
+        config_data = self.config.config
+        if self._compiled_for is not config_data or (always and self.schedule is None):
+            name, scenario, started = self._scenario(config_data)
+            endpoints = config_data.get('endpoints', [])
+            self.schedule = None
+            if always or scenario or any(endpoint.get('faults') or endpoint.get('failure_rate')
+                                         for endpoint in endpoints):
+                from faults import compile_schedule
+                try:
+                    self.schedule = compile_schedule(endpoints, scenario, started,
+                                                     config_data.get('fault_seed'), name)
+                except ValueError as e:
+                    print(f"[FAULTS] {e}")
+                    self.schedule = compile_schedule(endpoints, None, started)
+            self._compiled_for = config_data
+        return self.schedule
+    
+    def pick(self, endpoint):
+        """Return the FaultRule to apply to this request to endpoint, or None."""
+        with self.lock:
+            self._refresh()
+            schedule = self._schedule_locked()
+        return schedule.pick(endpoint) if schedule is not None else None
+    
+    def activate(self, name, rules=None):
+        """Switch to a named scenario, an inline one (rules), or none (name None).
+        
+        Returns (success, message).
+        """
+        config_data = self.config.config
+        if rules is None and name is not None and name not in config_data.get('fault_scenarios', {}):
+            return False, f"Unknown scenario: {name}"
+        selection = {"name": name, "rules": rules, "started": time.time()}
+        from faults import compile_schedule
+        try:
+            # Validate before anyone switches
+            compile_schedule(config_data.get('endpoints', []), rules or
+                             config_data.get('fault_scenarios', {}).get(name))
+        except (ValueError, AttributeError) as e:
+            return False, str(e)
+        with self.lock:
+            try:
+                with self._mutation():
+                    self._commit(['faults_activate', selection])
+                    self._select_local(selection)
+            except StateBackendError as e:
+                print(f"[STATE] {e}")
+                return False, str(e)
+        return True, f"Scenario {name or 'none'} active"
+    
+    def status(self):
+        """Describe the active scenario and each endpoint's rules right now."""
+        with self.lock:
+            self._refresh()
+            schedule = self._schedule_locked(always=True)
+        return {
+            "scenario": schedule.scenario,
+            "elapsed_s": round(time.time() - schedule.started, 3),
+            "scenarios": sorted(self.config.config.get('fault_scenarios', {})),
+            "endpoints": schedule.describe()
+        }
+    
+    def _select_local(self, selection):
+        self.selection = selection
+        self._compiled_for = None
+    
+    def _apply(self, op):
+        if op[0] == 'faults_activate':
+            self._select_local(op[1])
+    
+    def _reset_local(self):
+        self._select_local(None)
+    
+    def _capture(self):
+        return self.selection
+    
+    def _reinstate(self, state):
+        self._select_local(state)
+
+
+class DirectiveCache:
+    """LRU cache of database directive results with hit/miss counters.
+    
+    Keys include the database version, and MockServerConfig clears the
+    cache on every mutation, so entries are never stale.
+    """
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        value = compute()
+        if self.max_entries > 0:
+            with self.lock:
+                self.entries[key] = value
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+    
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self.entries), "max_entries": self.max_entries}
 
 
-class MockServerConfig:
-    """Manages server configuration with hot-reload support."""
+@contextmanager
+def _gc_paused():
+    """Pause the cyclic GC while building long-lived data.
     
-    def __init__(self, config_path):
+    Parsing a database allocates containers that all survive, so
+    collections triggered along the way find nothing and only cost time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _sort_key(value):
+    """Order values of mixed types: numbers, then strings, then the rest, then missing."""
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    if value is None:
+        return (3, '')
+    return (2, json.dumps(value, sort_keys=True))
+
+
+class DatabaseView:
+    """Positions of the records matching a filter, kept in page order.
+    
+    A record matches when its filter field equals the value or, for list
+    fields, contains it. Unsorted views hold ascending positions (insertion
+    order); sorted views hold (sort key, position) pairs, so a page is a
+    slice and the total is len().
+    
+    Writes only queue the change, in O(1). The next page request applies
+    the queue (refresh), or rebuilds the view once more than MAX_PENDING
+    changes have queued up, so bulk writes and unread views cost nothing.
+    """
+    
+    # Queued changes beyond which one rebuild is cheaper than applying them
+    MAX_PENDING = 1024
+    
+    def __init__(self, filter_field=None, filter_value=None, sort_field=None):
+        self.filter_field = filter_field
+        self.filter_value = filter_value
+        self.sort_field = sort_field
+        self.entries = []
+        # (added, entry) changes not applied yet; None when a rebuild is due
+        self.pending = []
+    
+    def matches(self, record):
+        if self.filter_field is None:
+            return True
+        value = record.get(self.filter_field)
+        return value == self.filter_value or (isinstance(value, list) and self.filter_value in value)
+    
+    def _entry(self, position, record):
+        if self.sort_field is None:
+            return position
+        return (_sort_key(record.get(self.sort_field)), position)
+    
+    def build(self, records):
+        self.entries = [self._entry(position, record) for position, record in enumerate(records)
+                        if record is not None and self.matches(record)]
+        if self.sort_field is not None:
+            self.entries.sort()
+        self.pending = []
+    
+    def _queue(self, added, position, record):
+        if self.pending is None or not self.matches(record):
+            return
+        if len(self.pending) >= self.MAX_PENDING:
+            self.pending = None
+        else:
+            self.pending.append((added, self._entry(position, record)))
+    
+    def add(self, position, record):
+        self._queue(True, position, record)
+    
+    def remove(self, position, record):
+        self._queue(False, position, record)
+    
+    def refresh(self, records):
+        """Bring the entries up to date with records before reading them."""
+        if self.pending is None:
+            self.build(records)
+            return
+        entries = self.entries
+        for added, entry in self.pending:
+            if added:
+                if not entries or entries[-1] < entry:
+                    # New records go last in unsorted views
+                    entries.append(entry)
+                else:
+                    bisect.insort(entries, entry)
+            else:
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+        self.pending = []
+    
+    def page(self, offset, limit, descending=False):
+        """Return the record positions of one page."""
+        if descending:
+            end = max(len(self.entries) - offset, 0)
+            entries = self.entries[max(end - limit, 0):end][::-1]
+        else:
+            entries = self.entries[offset:offset + limit]
+        if self.sort_field is None:
+            return entries
+        return [position for _, position in entries]
+    
+    def __len__(self):
+        return len(self.entries)
+
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _predicate_matches(value, op, operand):
+    """Evaluate one query predicate; list fields match if any element does."""
+    if isinstance(value, list):
+        return any(_predicate_matches(item, op, operand) for item in value)
+    if op == 'eq':
+        return value == operand
+    if op == 'in':
+        return value in operand
+    if op == 'prefix':
+        return isinstance(value, str) and value.startswith(operand)
+    if op == 'contains':
+        return isinstance(value, str) and operand.lower() in value.lower()
+    # Ranges compare numbers with numbers and strings with strings only
+    rank, key = _sort_key(value)
+    operand_rank, operand_key = _sort_key(operand)
+    if rank != operand_rank or rank > 1:
+        return False
+    if op == 'lt':
+        return key < operand_key
+    if op == 'le':
+        return key <= operand_key
+    if op == 'gt':
+        return key > operand_key
+    return key >= operand_key
+
+
+class ChunkedRecords:
+    """The record list, stored in fixed-size chunks for copy-on-write sharing.
+    
+    copy() is O(n / CHUNK): the copy shares every chunk, and after copying
+    each side copies a chunk the first time it writes to it, so the first
+    change after a snapshot or fork costs O(CHUNK) rather than O(n).
+    Supports what the config does with a list: len, indexing, slices,
+    iteration, item assignment and append.
+    """
+    
+    CHUNK = 1024
+    
+    __slots__ = ('chunks', 'length', '_owned')
+    
+    def __init__(self, records=()):
+        records = records if isinstance(records, list) else list(records)
+        size = self.CHUNK
+        self.chunks = [records[i:i + size] for i in range(0, len(records), size)]
+        self.length = len(records)
+        # Chunks this list may change in place
+        self._owned = set(range(len(self.chunks)))
+    
+    def __len__(self):
+        return self.length
+    
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self.length))]
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError("record position out of range")
+        return self.chunks[position // self.CHUNK][position % self.CHUNK]
+    
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.chunks)
+    
+    def _chunk(self, number):
+        """Chunk number, copied first if it may be shared."""
+        if number not in self._owned:
+            self.chunks[number] = list(self.chunks[number])
+            self._owned.add(number)
+        return self.chunks[number]
+    
+    def __setitem__(self, position, record):
+        if not 0 <= position < self.length:
+            raise IndexError("record position out of range")
+        self._chunk(position // self.CHUNK)[position % self.CHUNK] = record
+    
+    def append(self, record):
+        number = self.length // self.CHUNK
+        if number == len(self.chunks):
+            self.chunks.append([])
+            self._owned.add(number)
+        self._chunk(number).append(record)
+        self.length += 1
+    
+    def copy(self):
+        records = ChunkedRecords()
+        records.chunks = list(self.chunks)
+        records.length = self.length
+        self._owned = set()
+        return records
+
+
+def _shard_hash(key):
+    """Hash of an index key that is the same in every process.
+    
+    str hashes are salted per process, and sharded indexes are cached on
+    disk (see config_cache.py); numbers hash the same everywhere, and keys
+    that compare equal (1, 1.0, True) hash alike.
+    """
+    if isinstance(key, str):
+        return zlib.crc32(key.encode('utf-8', 'surrogatepass'))
+    if key is None:
+        return 0
+    return hash(key)
+
+
+class ShardedIndex:
+    """A dict split into shards by key, for copy-on-write sharing.
+    
+    Like ChunkedRecords, copy() shares every shard in O(shards) and each
+    side copies a shard the first time it changes it. The shards are plain
+    dicts, so they can be shared through the config cache as they are.
+    """
+    
+    # Keys per shard when the index is built
+    SHARD_SIZE = 1024
+    
+    __slots__ = ('shards', '_mask', '_owned')
+    
+    def __init__(self, shards=None, owned=True):
+        self.shards = shards if shards is not None else [{}]
+        self._mask = len(self.shards) - 1
+        self._owned = set(range(len(self.shards))) if owned else set()
+    
+    @classmethod
+    def build(cls, items, size):
+        """Index (key, value) pairs, about size of them; the first value of a key wins."""
+        count = 1
+        while count * cls.SHARD_SIZE < size:
+            count *= 2
+        shards, mask = [{} for _ in range(count)], count - 1
+        for key, value in items:
+            shards[_shard_hash(key) & mask].setdefault(key, value)
+        return cls(shards)
+    
+    def _shard(self, key):
+        return self.shards[_shard_hash(key) & self._mask]
+    
+    def _writable(self, key):
+        """The shard for key, copied first if it may be shared."""
+        number = _shard_hash(key) & self._mask
+        if number not in self._owned:
+            self.shards[number] = dict(self.shards[number])
+            self._owned.add(number)
+        return self.shards[number]
+    
+    def get(self, key, default=None):
+        return self._shard(key).get(key, default)
+    
+    def __contains__(self, key):
+        return key in self._shard(key)
+    
+    def __getitem__(self, key):
+        return self._shard(key)[key]
+    
+    def __setitem__(self, key, value):
+        self._writable(key)[key] = value
+    
+    def __delitem__(self, key):
+        del self._writable(key)[key]
+    
+    def setdefault(self, key, value):
+        shard = self._shard(key)
+        if key in shard:
+            return shard[key]
+        self._writable(key)[key] = value
+        return value
+    
+    def __len__(self):
+        return sum(map(len, self.shards))
+    
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.shards)
+    
+    def items(self):
+        return itertools.chain.from_iterable(shard.items() for shard in self.shards)
+    
+    def __eq__(self, other):
+        if not isinstance(other, ShardedIndex):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+    
+    def copy(self):
+        index = ShardedIndex(list(self.shards), owned=False)
+        self._owned = set()
+        return index
+
+
+class FieldIndex:
+    """Secondary index over one field, for the query planner.
+    
+    Keeps the set of positions per value for equality and membership, plus
+    (sort key, position) pairs in order for ranges and prefixes. List
+    fields index every element. Changes are O(1): they update the sets and
+    drop the ordered pairs, which the next range or prefix query rebuilds.
+    
+    Copies share the postings' shards and sets; after copying, each side
+    copies a shard, and a value's set, the first time it changes them.
+    """
+    
+    def __init__(self, field):
+        self.field = field
+        self.postings = ShardedIndex()
+        # None after a change, until the next range or prefix query
+        self.ordered = []
+        self._shared = False
+        # Values whose sets were copied since the index was last shared
+        self._owned = set()
+    
+    def _values(self, record):
+        value = record.get(self.field)
+        values = value if isinstance(value, list) else [value]
+        return list(dict.fromkeys(v for v in values if isinstance(v, _SCALARS)))
+    
+    def build(self, records):
+        postings = {}
+        field = self.field
+        for position, record in enumerate(records):
+            if record is None:
+                continue
+            value = record.get(field)
+            if isinstance(value, list):
+                for item in self._values(record):
+                    postings.setdefault(item, set()).add(position)
+            elif isinstance(value, _SCALARS):
+                postings.setdefault(value, set()).add(position)
+        self.postings = ShardedIndex.build(postings.items(), len(postings))
+        self.ordered = None
+        self._shared, self._owned = False, set()
+    
+    def _ordered(self):
+        """The (sort key, position) pairs, rebuilding them after changes."""
+        if self.ordered is None:
+            # Sort distinct values, then the positions of each
+            ordered = []
+            for value in sorted(self.postings, key=_sort_key):
+                key = _sort_key(value)
+                ordered.extend([(key, position) for position in sorted(self.postings[value])])
+            self.ordered = ordered
+        return self.ordered
+    
+    def state(self):
+        """The index as plain data, for sharing and caching."""
+        return self.postings.shards, self._ordered()
+    
+    @classmethod
+    def from_state(cls, field, state):
+        index = cls(field)
+        shards, index.ordered = state
+        index.postings = ShardedIndex(list(shards), owned=False)
+        index._shared = True
+        return index
+    
+    def copy(self):
+        index = FieldIndex(self.field)
+        index.postings = self.postings.copy()
+        index.ordered = self.ordered
+        index._shared = self._shared = True
+        self._owned = set()
+        return index
+    
+    def _posting(self, value):
+        """The set of positions for value, copied first if it may be shared."""
+        posting = self.postings.get(value)
+        if posting is None:
+            posting = self.postings[value] = set()
+            self._owned.add(value)
+        elif self._shared and value not in self._owned:
+            posting = self.postings[value] = set(posting)
+            self._owned.add(value)
+        return posting
+    
+    def add(self, position, record):
+        for value in self._values(record):
+            self._posting(value).add(position)
+        self.ordered = None
+    
+    def remove(self, position, record):
+        for value in self._values(record):
+            if value in self.postings:
+                posting = self._posting(value)
+                posting.discard(position)
+                if not posting:
+                    del self.postings[value]
+                    self._owned.discard(value)
+        self.ordered = None
+    
+    def _bounds(self, op, operand):
+        """Return the slice of self.ordered holding values that satisfy op."""
+        rank, key = _sort_key(operand)
+        if rank > 1 or (op == 'prefix' and rank != 1):
+            return None
+        ordered, inf = self._ordered(), float('inf')
+        start = bisect.bisect_left(ordered, ((rank,),))
+        end = bisect.bisect_left(ordered, ((rank + 1,),))
+        if op == 'lt':
+            return start, bisect.bisect_left(ordered, ((rank, key), -1))
+        if op == 'le':
+            return start, bisect.bisect_right(ordered, ((rank, key), inf))
+        if op == 'gt':
+            return bisect.bisect_right(ordered, ((rank, key), inf)), end
+        if op == 'ge':
+            return bisect.bisect_left(ordered, ((rank, key), -1)), end
+        # prefix: every string from key up to the next string after the prefix
+        low = bisect.bisect_left(ordered, ((1, key), -1))
+        if not key:
+            return low, end
+        upper = key[:-1] + chr(ord(key[-1]) + 1)
+        return low, bisect.bisect_left(ordered, ((1, upper), -1))
+    
+    def access(self, op, operand):
+        """Return (estimated rows, fetch positions) for op, or None if unindexable."""
+        if op == 'eq':
+            posting = self.postings.get(operand, []) if isinstance(operand, _SCALARS) else []
+            return len(posting), lambda: posting
+        if op == 'in':
+            postings = [self.postings.get(v, []) for v in operand if isinstance(v, _SCALARS)]
+            return sum(map(len, postings)), lambda: itertools.chain.from_iterable(postings)
+        if op == 'contains':
+            return None
+        bounds = self._bounds(op, operand)
+        if bounds is None:
+            return None
+        low, high = bounds
+        ordered = self.ordered
+        return max(high - low, 0), lambda: (position for _, position in ordered[low:high])
+
+
+class MockServerConfig(ReplicatedState):
+    """Manages server configuration with hot-reload support.
+    
+    Database records are indexed by primary key (config "primary_key",
+    default "title"). Deleted records leave a None tombstone so positions,
+    and therefore iteration order, stay stable; tombstones are compacted
+    once they make up half of the list.
+    
+    Snapshots (and forks) share the record list and indexes with the live
+    state; the first change afterwards copies them (see `_own_state`).
+    The state as loaded is always available as snapshot "initial".
+    """
+    
+    # Don't bother compacting small databases
+    COMPACT_MIN_TOMBSTONES = 1024
+    
+    # Sorted/filtered views kept up to date for paging; oldest is dropped first
+    MAX_VIEWS = 32
+    
+    # Intersect another posting list only if it is at most this many times
+    # larger than the current candidate set; otherwise check it per record
+    INTERSECT_RATIO = 4
+    
+    # Request bodies larger than this get 413 unless the config says otherwise
+    DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+    # Template directives that read request parameters, and so JSON body fields
+    PARAM_DIRECTIVES = re.compile(r'\{\{(?:query\.|database_page|database_query\}\})')
+    # Placeholders that differ on every request; endpoints using them get an
+    # ETag only if they set "etag": true (a weak one, see _build_etags)
+    VOLATILE_DIRECTIVES = re.compile(r'\{\{(?:timestamp|uuid|request_uuid|random_int|random_price)\}\}')
+    
+    def __init__(self, config_path, database_cache=None):
+        super().__init__()
         self.config_path = config_path
         self.config = {}
-        self.database = []
-        self.lock = threading.Lock()
+        # SHA-256 of the config file as last loaded (see install())
+        self.config_digest = None
+        self.database = ChunkedRecords()
+        # Shares parsed database files with other configs, and caches them on
+        # disk (see config_cache.py); their indexes too, until this config
+        # changes its records
+        self.database_cache = database_cache
+        self.database_source = None
+        self.indexes_shared = False
+        # The record list and indexes may be shared with snapshots or forks
+        self.state_shared = False
+        self.primary_key = 'title'
+        self.index = ShardedIndex()
+        self.tombstones = 0
+        self.views = {}
+        self.indexed_fields = set()
+        self.field_indexes = {}
+        # Bumped on every change to the records; part of directive cache keys
+        self.version = 0
+        self.directive_cache = DirectiveCache()
+        self.latency_samplers = {}
+        self.endpoint_limits = {}
+        self.body_endpoints = set()
+        # id(endpoint) -> whether its ETags are weak, for endpoints that get them
+        self.etag_endpoints = {}
+        # Hash of the loaded config and database files, plus a suffix for
+        # forks: distinguishes ETags of different contents and state views
+        self.etag_prefix = ''
+        self.database_digest = None
+        self.feeds = {}
+        # (path, method) -> endpoint; the first endpoint listed wins
+        self.routes = {}
+        # Seconds spent in each step of the last load (see --startup-profile)
+        self.load_timings = {}
+        self.loaded_at = time.time()
+        self.faults = FaultController(self)
         self.load()
     
     def load(self):
         """Load configuration from JSON file."""
+        with self.lock, _gc_paused():
+            self._reset_journal()
+            self._load_files()
+    
+    def _load_files(self):
+        """Read the config and database files."""
+        self.database = ChunkedRecords()
+        self.database_source = None
+        self.indexes_shared = False
+        self.state_shared = False
+        self.index = ShardedIndex()
+        self.tombstones = 0
+        self.views = {}
+        self.field_indexes = {}
+        self.routes = {}
+        self._changed()
+        self.loaded_at = time.time()
+        self.database_digest = None
+        timings, started = {}, time.perf_counter()
+        self.load_timings = timings
+        
+        def lap(step):
+            nonlocal started
+            now = time.perf_counter()
+            timings[step] = now - started
+            started = now
+        
+        self.config_digest = None
+        try:
+            with open(self.config_path, 'rb') as f:
+                content = f.read()
+            self.config_digest = hashlib.sha256(content).hexdigest()
+            self.config = json.loads(content)
+            print(f"[CONFIG] Loaded from {self.config_path}")
+            lap('config')
+            
+            for endpoint in self.config.get('endpoints', []):
+                self.routes.setdefault((endpoint.get('path'), endpoint.get('method')), endpoint)
+            self.primary_key = self.config.get('primary_key', 'title')
+            self.indexed_fields = set(self.config.get('indexes', []))
+            self.directive_cache.max_entries = self.config.get('directive_cache_size', 256)
+            self._build_latency_samplers()
+            self._build_endpoint_limits()
+            self._build_body_usage()
+            self._build_etags()
+            self._build_feeds()
+            lap('endpoints')
+            
+            # Load database if specified
+            db_path = self.config.get('database')
+            if db_path:
+                self._load_database(db_path)
+                lap('database')
+                if self.database_source is not None:
+                    shards = self.database_source.derived(
+                        ('index', self.primary_key), lambda: self._primary_index(self.database).shards)
+                    self.index = ShardedIndex(list(shards), owned=False)
+                    self.indexes_shared = self.state_shared = True
+                else:
+                    self._rebuild_index()
+                # Build configured indexes up front (and before forking workers)
+                for field in self.indexed_fields:
+                    self._field_index(field)
+                lap('indexes')
+                if self.database_source is not None:
+                    self.database_cache.persist(self.database_source)
+                    lap('cache_write')
+        except FileNotFoundError:
+            print(f"[CONFIG] File not found: {self.config_path}")
+            self.config = self._default_config()
+        except json.JSONDecodeError as e:
+            print(f"[CONFIG] Invalid JSON: {e}")
+            self.config = self._default_config()
+        # Every process loading the same files gets the same prefix
+        self.etag_prefix = hashlib.blake2b(f"{self.config_digest}:{self.database_digest}".encode(),
+                                           digest_size=6).hexdigest()
+        # Snapshots of the previous records go; new processes could not replay them
+        self.snapshots = {'initial': self._capture()}
+        # Every process has this one, so checkpoints refer to it rather than copy it
+        self._loaded = self.snapshots['initial']
+    
+    def install(self, content):
+        """Replace the config file with content (bytes) and load it.
+        
+        Returns False, without reloading, if content is what is already
+        loaded. Raises ValueError for invalid JSON and OSError if the file
+        cannot be written.
+        """
+        if hashlib.sha256(content).hexdigest() == self.config_digest:
+            return False
+        json.loads(content)
+        directory = os.path.dirname(os.path.abspath(self.config_path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, self.config_path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.load()
+        return True
+    
+    def sync(self):
+        """Catch up with database mutations made by other processes."""
+        if self.journal is None:
+            return
         with self.lock:
+            self._refresh()
+    
+    def _reset_local(self):
+        with _gc_paused():
+            self._load_files()
+    
+    def _apply(self, op):
+        """Apply a journal entry to the local database copy."""
+        if op[0] == 'add':
+            self._add_local(op[1])
+        elif op[0] == 'delete':
+            self._delete_local(self._locate(op[1], op[2]))
+        elif op[0] == 'update':
+            self._update_local(self.index.get(op[1]), op[2])
+        else:
+            self._apply_snapshot_op(op)
+    
+    def _capture(self):
+        self.state_shared = True
+        return (self.database, self.index, self.field_indexes, self.tombstones, self.indexes_shared)
+    
+    def _reinstate(self, state):
+        self.database, self.index, self.field_indexes, self.tombstones, self.indexes_shared = state
+        self.state_shared = True
+        # Views follow the records they were built from; rebuild on next use
+        self.views = {}
+        self._changed()
+    
+    def _capture_key(self, captured):
+        return id(captured[0])
+    
+    def _encode(self, captured):
+        if captured[0] is self._loaded[0]:
+            return None
+        return [record for record in captured[0] if record is not None]
+    
+    def _decode(self, encoded):
+        if encoded is None:
+            return self._loaded
+        database = ChunkedRecords(encoded)
+        return (database, self._primary_index(database), {}, 0, False)
+    
+    def fork(self):
+        """A config with its own copy of the records and snapshots.
+        
+        Cheap: the fork shares the records' chunks and the indexes' shards
+        with this config until either side changes them (see _own_state).
+        
+        Routes, limits, feeds and faults stay shared with this config. The
+        fork has no journal: its changes stay in this process.
+        """
+        with self.lock:
+            self._refresh()
+            fork = copy.copy(self)
+            ReplicatedState.__init__(fork)
+            fork.snapshots = dict(self.snapshots)
+            fork.directive_cache = DirectiveCache(self.directive_cache.max_entries)
+            # Versions of the fork and this config will coincide
+            fork.etag_prefix = f"{self.etag_prefix}.{os.urandom(3).hex()}"
+            fork._reinstate(self._capture())
+            # The fork runs under its own lock, so it must not build indexes
+            # into (or rebuild the ordered pairs of) this config's
+            fork.field_indexes = {field: index.copy() for field, index in self.field_indexes.items()}
+            return fork
+    
+    @staticmethod
+    def _index_key(value):
+        """Return value if it can be used as an index key, else None."""
+        return value if isinstance(value, (str, int, float, bool)) else None
+    
+    def parse_key(self, text):
+        """The primary key a query parameter names: the text, or the number it spells."""
+        with self.lock:
+            if text in self.index:
+                return text
+            for convert in (int, float):
+                try:
+                    value = convert(text)
+                except ValueError:
+                    continue
+                if value in self.index:
+                    return value
+            return text
+    
+    def _primary_index(self, records):
+        """Map primary keys to positions in records."""
+        index_key, primary_key = self._index_key, self.primary_key
+        keys = ((index_key(record.get(primary_key)), position) for position, record in enumerate(records))
+        return ShardedIndex.build(((key, position) for key, position in keys if key is not None), len(records))
+    
+    def _rebuild_index(self):
+        """Drop tombstones and re-index records by primary key."""
+        self.database = ChunkedRecords([record for record in self.database if record is not None])
+        self.index = self._primary_index(self.database)
+        self.indexes_shared = self.state_shared = False
+        self.tombstones = 0
+        # Positions changed; views and field indexes are rebuilt on next use
+        self.views = {}
+        self.field_indexes = {}
+    
+    def _own_state(self):
+        """Copy records and indexes shared with other configs or snapshots before changing them.
+        
+        O(n / chunk size): the copies share their chunks and shards, and
+        copy each one only when this config first changes it.
+        """
+        # The records are about to differ from the parsed file's
+        self.indexes_shared = False
+        if self.state_shared:
+            self.state_shared = False
+            self.database = self.database.copy()
+            self.index = self.index.copy()
+            self.field_indexes = {field: index.copy() for field, index in self.field_indexes.items()}
+    
+    def _locate(self, field, value):
+        """Return the position of the first live record with field == value."""
+        if field == self.primary_key:
+            key = self._index_key(value)
+            return self.index.get(key) if key is not None else None
+        for position, record in enumerate(self.database):
+            if record is not None and record.get(field) == value:
+                return position
+        return None
+    
+    def _changed(self):
+        """Record that the database changed, invalidating cached results."""
+        self.version += 1
+        self.directive_cache.clear()
+    
+    def _derived_indexes(self):
+        """Views and field indexes that must follow every record change."""
+        return itertools.chain(self.views.values(), self.field_indexes.values())
+    
+    def _add_local(self, record):
+        """Append a record and index it."""
+        self._own_state()
+        position = len(self.database)
+        key = self._index_key(record.get(self.primary_key))
+        if key is not None:
+            self.index.setdefault(key, position)
+        self.database.append(record)
+        for derived in self._derived_indexes():
+            derived.add(position, record)
+        self._changed()
+    
+    def _delete_local(self, position):
+        """Tombstone the record at position and return it."""
+        if position is None:
+            return None
+        self._own_state()
+        record = self.database[position]
+        key = self._index_key(record.get(self.primary_key))
+        if self.index.get(key) == position:
+            del self.index[key]
+        for derived in self._derived_indexes():
+            derived.remove(position, record)
+        self.database[position] = None
+        self._changed()
+        self.tombstones += 1
+        if (self.tombstones >= self.COMPACT_MIN_TOMBSTONES
+                and self.tombstones * 2 >= len(self.database)):
+            self._rebuild_index()
+        return record
+    
+    def _update_local(self, position, record):
+        """Replace the record at position, re-indexing if its key changed."""
+        if position is None:
+            return
+        self._own_state()
+        old_key = self._index_key(self.database[position].get(self.primary_key))
+        new_key = self._index_key(record.get(self.primary_key))
+        if old_key != new_key:
+            if self.index.get(old_key) == position:
+                del self.index[old_key]
+            if new_key is not None:
+                self.index.setdefault(new_key, position)
+        for derived in self._derived_indexes():
+            derived.remove(position, self.database[position])
+            derived.add(position, record)
+        self.database[position] = record
+        self._changed()
+    
+    def _build_latency_samplers(self):
+        """Create samplers for endpoints whose latency_ms is a distribution."""
+        self.latency_samplers = {}
+        for endpoint in self.config.get('endpoints', []):
+            spec = endpoint.get('latency_ms')
+            if isinstance(spec, dict):
+                name = f"{endpoint.get('method')} {endpoint.get('path')}"
+                try:
+                    self.latency_samplers[id(endpoint)] = create_sampler(
+                        spec, name, self.config.get('latency_seed'))
+                except (ValueError, TypeError) as e:
+                    print(f"[CONFIG] Invalid latency for {name}: {e}")
+    
+    def _build_endpoint_limits(self):
+        """Create concurrency and rate limiters for endpoints that set them."""
+        self.endpoint_limits = {}
+        for endpoint in self.config.get('endpoints', []):
             try:
-                with open(self.config_path, 'r') as f:
-                    self.config = json.load(f)
-                print(f"[CONFIG] Loaded from {self.config_path}")
-                
-                # Load database if specified
-                db_path = self.config.get('database')
-                if db_path:
-                    self._load_database(db_path)
-            except FileNotFoundError:
-                print(f"[CONFIG] File not found: {self.config_path}")
-                self.config = self._default_config()
-            except json.JSONDecodeError as e:
-                print(f"[CONFIG] Invalid JSON: {e}")
-                self.config = self._default_config()
+                limits = create_limits(endpoint)
+            except (KeyError, ValueError, TypeError) as e:
+                print(f"[CONFIG] Invalid limits for {endpoint.get('method')} {endpoint.get('path')}: {e}")
+                continue
+            if limits is not None:
+                self.endpoint_limits[id(endpoint)] = limits
+    
+    def _build_body_usage(self):
+        """Note which endpoints read their request body."""
+        self.body_endpoints = set()
+        for endpoint in self.config.get('endpoints', []):
+            parse_body = endpoint.get('parse_body')
+            if parse_body is None:
+                # Body fields are rendered like query parameters
+                parse_body = bool(self.PARAM_DIRECTIVES.search(json.dumps(endpoint.get('response', {}))))
+            if parse_body:
+                self.body_endpoints.add(id(endpoint))
+    
+    def _build_etags(self):
+        """Note which GET endpoints get ETags (see etag()).
+        
+        An endpoint's "etag" (or the top-level "etag") of true or false
+        decides; otherwise endpoints get one unless they use a volatile
+        placeholder. Forced ETags on volatile endpoints are weak: a 304
+        keeps the client's old timestamps and ids until the data changes.
+        """
+        self.etag_endpoints = {}
+        default = self.config.get('etag')
+        for endpoint in self.config.get('endpoints', []):
+            if (endpoint.get('method') != 'GET' or endpoint.get('stream')
+                    or endpoint.get('status', 200) != 200):
+                continue
+            setting = endpoint.get('etag', default)
+            volatile = bool(self.VOLATILE_DIRECTIVES.search(json.dumps(endpoint.get('response', {}))))
+            if setting is True or (setting is None and not volatile):
+                self.etag_endpoints[id(endpoint)] = volatile
+    
+    def etag(self, endpoint, query_params):
+        """ETag of endpoint's response to query_params at the current version, or None.
+        
+        Computed without rendering: the response depends only on the
+        loaded files, the changes made since and the request parameters.
+        With a journal the changes are named by its epoch and length, so
+        every process serving the same state gives the same ETag.
+        """
+        weak = self.etag_endpoints.get(id(endpoint))
+        if weak is None:
+            return None
+        params = hashlib.blake2b(json.dumps(query_params, sort_keys=True).encode(),
+                                 digest_size=8).hexdigest()
+        with self.lock:
+            if self.journal is not None:
+                state = f"{self._journal_epoch:x}.{self._journal_seq:x}"
+            else:
+                state = f"{int(self.loaded_at * 1e6):x}.{self.version:x}"
+            tag = f'"{self.etag_prefix}-{state}-{params}"'
+        return 'W/' + tag if weak else tag
+    
+    def _build_feeds(self):
+        """Create the event source of each streaming endpoint.
+        
+        Subscribers of the previous config's feeds keep their stream until
+        they disconnect.
+        """
+        self.feeds = {}
+        for endpoint in self.config.get('endpoints', []):
+            spec = endpoint.get('stream')
+            if not spec:
+                continue
+            from feeds import Feed
+            try:
+                self.feeds[id(endpoint)] = Feed(spec, lambda template: TemplateEngine.render(template, {}, self))
+            except (OSError, KeyError, ValueError, TypeError) as e:
+                print(f"[CONFIG] Invalid stream for {endpoint.get('method')} {endpoint.get('path')}: {e}")
+    
+    def get_feed(self, endpoint):
+        """Get the Feed of a streaming endpoint, or None."""
+        return self.feeds.get(id(endpoint))
+    
+    def uses_body(self, endpoint):
+        """Check whether endpoint's response depends on the request body."""
+        return id(endpoint) in self.body_endpoints
+    
+    def max_body_bytes(self, endpoint=None):
+        """Largest request body accepted for endpoint (or for built-in routes)."""
+        if endpoint is not None and 'max_body_bytes' in endpoint:
+            return endpoint['max_body_bytes']
+        return self.get('max_body_bytes', self.DEFAULT_MAX_BODY_BYTES)
+    
+    def get_limits(self, endpoint):
+        """Get the EndpointLimits for endpoint, or None if it is unlimited."""
+        return self.endpoint_limits.get(id(endpoint))
+    
+    def sample_latency(self, endpoint):
+        """Get the simulated latency for one request to endpoint, in ms."""
+        latency = endpoint.get('latency_ms', 0)
+        if isinstance(latency, dict):
+            sampler = self.latency_samplers.get(id(endpoint))
+            return sampler.sample() if sampler else 0
+        return latency
     
     def _load_database(self, db_path):
         """Load database from JSON file."""
         try:
-            with open(db_path, 'r') as f:
-                self.database = json.load(f)
+            if self.database_cache is not None:
+                self.database_source = self.database_cache.load(db_path)
+                self.database = ChunkedRecords(self.database_source.records)
+                self.database_digest = self.database_source.digest
+            else:
+                with open(db_path, 'rb') as f:
+                    data = f.read()
+                self.database = ChunkedRecords(json.loads(data))
+                self.database_digest = hashlib.sha256(data).hexdigest()
             print(f"[DATABASE] Loaded {len(self.database)} records from {db_path}")
         except FileNotFoundError:
             print(f"[DATABASE] File not found: {db_path}")
-            self.database = []
+            self.database = ChunkedRecords()
         except json.JSONDecodeError as e:
             print(f"[DATABASE] Invalid JSON: {e}")
-            self.database = []
+            self.database = ChunkedRecords()
     
     def _default_config(self):
         """Return default configuration."""
@@ -122,69 +1506,288 @@ class MockServerConfig:
     def find_endpoint(self, path, method):
         """Find matching endpoint configuration."""
         with self.lock:
-            for endpoint in self.config.get('endpoints', []):
-                if endpoint.get('path') == path and endpoint.get('method') == method:
-                    return endpoint
-        return None
+            return self.routes.get((path, method))
     
     def get_database(self):
         """Get database records."""
         with self.lock:
-            return list(self.database)
+            return [record for record in self.database if record is not None]
+    
+    def stream_database(self, predicate=None):
+        """Get a lazily iterated, optionally filtered view of the records."""
+        with self.lock:
+            return RecordStream(self.database, len(self.database), predicate)
+    
+    def database_count(self):
+        """Get the number of database records in O(1)."""
+        with self.lock:
+            return len(self.database) - self.tombstones
     
     def filter_database(self, field, value):
         """Filter database by field value."""
         with self.lock:
-            return [record for record in self.database if record.get(field) == value]
+            return [record for record in self.database
+                    if record is not None and record.get(field) == value]
     
     def find_in_database(self, field, value):
         """Find a single record in database by field value."""
         with self.lock:
-            for record in self.database:
-                if record.get(field) == value:
-                    return record
+            position = self._locate(field, value)
+            return self.database[position] if position is not None else None
+    
+    def _view(self, filter_field, filter_value, sort_field):
+        """Get or build the view for a filter and sort order."""
+        key = (filter_field, filter_value, sort_field)
+        view = self.views.get(key)
+        if view is None:
+            view = DatabaseView(filter_field, filter_value, sort_field)
+            view.build(self.database)
+            if len(self.views) >= self.MAX_VIEWS:
+                del self.views[next(iter(self.views))]
+            self.views[key] = view
+        elif view.pending != []:
+            view.refresh(self.database)
+        return view
+    
+    def page_database(self, offset=0, limit=20, sort_field=None, descending=False,
+                      filter_field=None, filter_value=None):
+        """Get one page of (optionally filtered and sorted) records and the total.
+        
+        Costs O(limit) once the view is current, and the total is O(1).
+        Record changes are queued per view; the first page after them
+        applies the queue, or rebuilds the view after many changes.
+        """
+        with self.lock:
+            if filter_field is None and sort_field is None and not self.tombstones:
+                # Nothing deleted, so positions are already page order
+                total = len(self.database)
+                if descending:
+                    end = max(total - offset, 0)
+                    return self.database[max(end - limit, 0):end][::-1], total
+                return self.database[offset:offset + limit], total
+            view = self._view(filter_field, filter_value, sort_field)
+            records = [self.database[position] for position in view.page(offset, limit, descending)]
+            return records, len(view)
+    
+    def _field_index(self, field):
+        """Get the index for a configured field, building it on first use."""
+        index = self.field_indexes.get(field)
+        if index is None:
+            if self.indexes_shared:
+                def build():
+                    built = FieldIndex(field)
+                    built.build(self.database)
+                    return built.state()
+                index = FieldIndex.from_state(field, self.database_source.derived(('field', field), build))
+            else:
+                index = FieldIndex(field)
+                index.build(self.database)
+            self.field_indexes[field] = index
+        return index
+    
+    def _access_path(self, predicate):
+        """Return (index name, estimated rows, fetch) for a predicate, or None."""
+        field, op, operand = predicate
+        if field in self.indexed_fields:
+            access = self._field_index(field).access(op, operand)
+            return (field,) + access if access else None
+        if op == 'eq' and field == self.primary_key:
+            key = self._index_key(operand)
+            position = self.index.get(key) if key is not None else None
+            positions = [] if position is None else [position]
+            return 'primary_key', len(positions), lambda: positions
         return None
     
+    def _plan(self, branches):
+        """Choose how to evaluate OR-of-AND predicate lists.
+        
+        Each AND branch is driven by its most selective index, intersected
+        with other posting lists that are not much larger, and the remaining
+        predicates are checked per candidate. If any branch has no usable
+        index, the whole query is one full scan instead.
+        """
+        live = len(self.database) - self.tombstones
+        plans = []
+        for predicates in branches:
+            paths = []
+            for predicate in predicates:
+                path = self._access_path(predicate)
+                if path is not None:
+                    paths.append((path[1], predicate, path))
+            if not paths:
+                checks = sum(len(p) for p in branches) or 1
+                return {"strategy": "scan", "estimated_rows": live,
+                        "estimated_cost": live * checks, "branches": []}
+            paths.sort(key=lambda item: item[0])
+            rows = paths[0][0]
+            used, intersect = [paths[0]], []
+            for estimate, predicate, path in paths[1:]:
+                if estimate <= self.INTERSECT_RATIO * rows:
+                    intersect.append((estimate, predicate, path))
+                    rows = min(rows, estimate)
+            used += intersect
+            residual = [p for p in predicates if all(p is not u[1] for u in used)]
+            plans.append({
+                "driver": paths[0],
+                "intersect": intersect,
+                "residual": residual,
+                "estimated_rows": rows,
+                "estimated_cost": sum(u[0] for u in used) + rows * len(residual)
+            })
+        return {
+            "strategy": "index",
+            "estimated_rows": min(live, sum(p["estimated_rows"] for p in plans)),
+            "estimated_cost": sum(p["estimated_cost"] for p in plans),
+            "branches": plans
+        }
+    
+    @staticmethod
+    def _matches(record, predicates):
+        return all(_predicate_matches(record.get(field), op, operand)
+                   for field, op, operand in predicates)
+    
+    def query_database(self, branches):
+        """Get the records matching any branch of AND-ed predicates, in database order."""
+        with self.lock:
+            if not branches:
+                return []
+            if not all(branches):
+                return [record for record in self.database if record is not None]
+            plan = self._plan(branches)
+            if plan["strategy"] == "scan":
+                return [record for record in self.database if record is not None
+                        and any(self._matches(record, predicates) for predicates in branches)]
+            
+            positions = set()
+            for branch in plan["branches"]:
+                candidates = set(branch["driver"][2][2]())
+                for _, _, path in branch["intersect"]:
+                    candidates.intersection_update(path[2]())
+                residual = branch["residual"]
+                if residual:
+                    candidates = {position for position in candidates
+                                  if self._matches(self.database[position], residual)}
+                positions |= candidates
+            return [self.database[position] for position in sorted(positions)]
+    
+    def explain_query(self, branches):
+        """Describe the plan query_database would use, without running it."""
+        def describe(item):
+            estimate, (field, op, operand), path = item
+            return {"predicate": [field, op, operand], "index": path[0], "estimated_rows": estimate}
+        
+        with self.lock:
+            if not branches:
+                return {"strategy": "none", "estimated_rows": 0, "estimated_cost": 0}
+            if not all(branches):
+                count = len(self.database) - self.tombstones
+                return {"strategy": "all", "estimated_rows": count, "estimated_cost": count}
+            plan = self._plan(branches)
+            plan["branches"] = [{
+                "driver": describe(branch["driver"]),
+                "intersect": [describe(item) for item in branch["intersect"]],
+                "residual": [list(p) for p in branch["residual"]],
+                "estimated_rows": branch["estimated_rows"],
+                "estimated_cost": branch["estimated_cost"]
+            } for branch in plan["branches"]]
+            return plan
+    
     def filter_by_genre(self, genre):
         """Filter database by genre (checks if genre is in genres array)."""
         with self.lock:
             return [record for record in self.database 
-                    if genre in record.get('genres', [])]
+                    if record is not None and genre in record.get('genres', [])]
     
 
     def add_game(self, game_data):
         """Add a new game to the database."""
         with self.lock:
-            # Check if game already exists
-            title = game_data.get('title')
-            if title and any(record.get('title') == title for record in self.database):
-                return False, "Game already exists"
-            
-            self.database.append(game_data)
-            return True, game_data
+            try:
+                with self._mutation():
+                    # Check if game already exists
+                    key = self._index_key(game_data.get(self.primary_key))
+                    if key is not None and key in self.index:
+                        return False, "Game already exists"
+                    
+                    self._commit(['add', game_data])
+                    self._add_local(game_data)
+                    return True, game_data
+            except StateBackendError as e:
+                print(f"[STATE] {e}")
+                return False, str(e)
     
     def delete_game(self, identifier_field, identifier_value):
-        """Delete a game from the database."""
+        """Delete a game from the database.
+        
+        O(1) when identifier_field is the primary key, otherwise a scan.
+        """
+        with self.lock:
+            try:
+                with self._mutation():
+                    position = self._locate(identifier_field, identifier_value)
+                    if position is None:
+                        return False, None
+                    
+                    self._commit(['delete', identifier_field, identifier_value])
+                    return True, self._delete_local(position)
+            except StateBackendError as e:
+                print(f"[STATE] {e}")
+                return False, None
+    
+    def update_game(self, key, game_data, replace=True):
+        """Replace (PUT) or merge into (PATCH) the game with this primary key.
+        
+        Returns (success, game or error message, HTTP status).
+        """
         with self.lock:
-            for i, record in enumerate(self.database):
-                if record.get(identifier_field) == identifier_value:
-                    deleted_game = self.database.pop(i)
-                    return True, deleted_game
-            return False, None
+            try:
+                with self._mutation():
+                    position = self.index.get(self._index_key(key))
+                    if position is None:
+                        return False, f"Game not found with {self.primary_key}: {key}", 404
+                    
+                    if replace:
+                        record = dict(game_data)
+                    else:
+                        record = dict(self.database[position])
+                        record.update(game_data)
+                    record.setdefault(self.primary_key, key)
+                    
+                    new_key = self._index_key(record[self.primary_key])
+                    if new_key != key and new_key in self.index:
+                        return False, "Game already exists", 409
+                    
+                    self._commit(['update', key, record])
+                    self._update_local(position, record)
+                    return True, record, 200
+            except StateBackendError as e:
+                print(f"[STATE] {e}")
+                return False, str(e), 503
 
 
 class RequestLogger:
-    """Thread-safe request logger."""
+    """Thread-safe request logger.
+    
+    Entries are numbered by `seq` and kept in a ring of `buffer_size`, so
+    /__logs/stream readers can resume where they left off; /__logs shows
+    the last `max_logs`.
+    """
     
-    def __init__(self, max_logs=100):
-        self.logs = []
+    def __init__(self, max_logs=100, buffer_size=10000):
+        self.logs = deque(maxlen=max(buffer_size, max_logs))
         self.max_logs = max_logs
-        self.lock = threading.Lock()
+        self.seq = 0
+        # Totals since startup, for GET /__node
+        self.status_counts = {}
+        self.latency_total_ms = 0
+        self.lock = threading.Condition()
     
     def log(self, method, path, status, latency_ms):
         """Add a log entry."""
         with self.lock:
+            self.seq += 1
             entry = {
+                "seq": self.seq,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
                 "method": method,
                 "path": path,
@@ -192,39 +1795,540 @@ class RequestLogger:
                 "latency_ms": latency_ms
             }
             self.logs.append(entry)
-            if len(self.logs) > self.max_logs:
-                self.logs.pop(0)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.latency_total_ms += latency_ms
+            self.lock.notify_all()
+    
+    def stats(self):
+        """Request totals since startup: count, count per status and mean latency."""
+        with self.lock:
+            return {"requests": self.seq,
+                    "statuses": {str(status): n for status, n in sorted(self.status_counts.items())},
+                    "mean_latency_ms": round(self.latency_total_ms / self.seq, 1) if self.seq else 0}
+    
+    def get_logs(self):
+        """Get the most recent logs."""
+        with self.lock:
+            start = max(len(self.logs) - self.max_logs, 0)
+            return [self.logs[i] for i in range(start, len(self.logs))]
+    
+    def since(self, seq, limit=1000, timeout=None):
+        """Get up to limit entries logged after seq, waiting up to timeout for one.
+        
+        Returns (entries, dropped), where dropped counts entries after seq
+        that already fell out of the buffer.
+        """
+        with self.lock:
+            if timeout and self.seq <= seq:
+                self.lock.wait_for(lambda: self.seq > seq, timeout)
+            oldest = self.seq - len(self.logs) + 1
+            start = max(seq + 1 - oldest, 0)
+            stop = min(start + limit, len(self.logs))
+            # Deque indexing is cheap near the ends, where readers usually are
+            return [self.logs[i] for i in range(start, stop)], max(oldest - seq - 1, 0)
+
+
+class SharedRequestLogger:
+    """Request logger whose ring lives in shared memory, for forked workers.
+    
+    Same interface as RequestLogger. Each entry is a fixed-size slot, so
+    logging is a struct write under a multiprocessing.Lock rather than a
+    round-trip to another process; /__logs in any worker reads every
+    worker's entries. Paths longer than a slot are truncated. Create it
+    before forking; followers poll for new entries.
+    """
+    
+    # seq, latency total, then a counter per status code
+    HEADER = struct.Struct('<QQ')
+    STATUSES = 1000
+    # seq, timestamp, status, latency_ms, method, path length
+    SLOT = struct.Struct('<QdHQ8sH')
+    SLOT_SIZE = 256
+    POLL_INTERVAL = 0.05
+    
+    def __init__(self, max_logs=100, buffer_size=10000):
+        # Only --workers needs these; importing them costs startup time
+        import multiprocessing
+        from multiprocessing import shared_memory
+        self.max_logs = max_logs
+        self.capacity = max(buffer_size, max_logs)
+        self.slots_offset = self.HEADER.size + 8 * self.STATUSES
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=self.slots_offset + self.SLOT_SIZE * self.capacity)
+        self.owner_pid = os.getpid()
+        self.lock = multiprocessing.Lock()
+    
+    def _seq(self):
+        return struct.unpack_from('<Q', self.shm.buf, 0)[0]
+    
+    def log(self, method, path, status, latency_ms):
+        """Add a log entry."""
+        path = path.encode('utf-8')[:self.SLOT_SIZE - self.SLOT.size]
+        buf = self.shm.buf
+        with self.lock:
+            seq, latency_total = self.HEADER.unpack_from(buf, 0)
+            seq += 1
+            offset = self.slots_offset + (seq - 1) % self.capacity * self.SLOT_SIZE
+            self.SLOT.pack_into(buf, offset, seq, time.time(), status, latency_ms,
+                                method.encode('ascii', 'replace'), len(path))
+            buf[offset + self.SLOT.size:offset + self.SLOT.size + len(path)] = path
+            if 0 <= status < self.STATUSES:
+                counter = self.HEADER.size + 8 * status
+                struct.pack_into('<Q', buf, counter, struct.unpack_from('<Q', buf, counter)[0] + 1)
+            self.HEADER.pack_into(buf, 0, seq, latency_total + latency_ms)
+    
+    def _entries(self, start, stop):
+        """Decode entries start..stop-1 by seq; the caller holds the lock."""
+        buf = self.shm.buf
+        raw = []
+        for seq in range(start, stop):
+            offset = self.slots_offset + (seq - 1) % self.capacity * self.SLOT_SIZE
+            raw.append(bytes(buf[offset:offset + self.SLOT_SIZE]))
+        return raw
+    
+    def _decode(self, raw):
+        entries = []
+        for slot in raw:
+            seq, timestamp, status, latency_ms, method, length = self.SLOT.unpack_from(slot)
+            entries.append({
+                "seq": seq,
+                "timestamp": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                "method": method.rstrip(b'\0').decode('ascii'),
+                "path": slot[self.SLOT.size:self.SLOT.size + length].decode('utf-8', 'ignore'),
+                "status": status,
+                "latency_ms": latency_ms
+            })
+        return entries
+    
+    def stats(self):
+        """Request totals since startup: count, count per status and mean latency."""
+        with self.lock:
+            seq, latency_total = self.HEADER.unpack_from(self.shm.buf, 0)
+            counts = struct.unpack_from(f'<{self.STATUSES}Q', self.shm.buf, self.HEADER.size)
+        return {"requests": seq,
+                "statuses": {str(status): n for status, n in enumerate(counts) if n},
+                "mean_latency_ms": round(latency_total / seq, 1) if seq else 0}
     
     def get_logs(self):
-        """Get all logs."""
+        """Get the most recent logs."""
+        with self.lock:
+            seq = self._seq()
+            raw = self._entries(max(seq - self.max_logs, 0) + 1, seq + 1)
+        return self._decode(raw)
+    
+    def since(self, seq, limit=1000, timeout=None):
+        """Get up to limit entries logged after seq, waiting up to timeout for one.
+        
+        Returns (entries, dropped), where dropped counts entries after seq
+        that already fell out of the buffer.
+        """
+        if timeout:
+            deadline = time.monotonic() + timeout
+            while self._seq() <= seq and time.monotonic() < deadline:
+                time.sleep(self.POLL_INTERVAL)
         with self.lock:
-            return list(self.logs)
+            current = self._seq()
+            oldest = max(current - self.capacity, 0) + 1
+            start = max(seq + 1, oldest)
+            raw = self._entries(start, min(start + limit, current + 1))
+        return self._decode(raw), max(oldest - seq - 1, 0)
+    
+    def close(self):
+        self.shm.close()
+        if os.getpid() == self.owner_pid:
+            self.shm.unlink()
+
+
+class RecordStream:
+    """Lazily filtered view of database records for streamed responses.
+    
+    Holds a reference to the database list (or a cached result list) rather
+    than a copy. Mutations
+    either tombstone in place, replace a slot or swap in a new list, so
+    iterating without the config lock is safe and never sees a torn record.
+    """
+    
+    def __init__(self, records, length, predicate=None):
+        self.records = records
+        self.length = length
+        self.predicate = predicate
+    
+    def __iter__(self):
+        predicate = self.predicate
+        for record in itertools.islice(self.records, self.length):
+            if record is not None and (predicate is None or predicate(record)):
+                yield record
+
+
+class GeneratedStream(RecordStream):
+    """Items of a {{repeat}} or {{range}} directive, rendered one at a time.
+    
+    Nothing is materialized: iter_json() renders and encodes items in
+    batches as the response is sent. Every iteration restarts a
+    random.Random(seed), so the items are the same each time.
+    """
+    
+    def __init__(self, values, template, query_params, config, seed, context):
+        self.values = values
+        self.length = len(values)
+        self.template = template
+        self.query_params = query_params
+        self.config = config
+        self.seed = seed
+        # The response's context, for {{timestamp}} and {{request_uuid}}
+        self.context = context
+    
+    def __iter__(self):
+        if self.template is None:
+            yield from self.values
+            return
+        rng = random.Random(self.seed)
+        for value in self.values:
+            yield TemplateEngine.render(self.template, self.query_params, self.config,
+                                        context=ItemContext(rng, value, self.context))
+
+
+_JSON_ENCODER = json.JSONEncoder(indent=2)
+
+# Records encoded per json call when streaming; large enough to amortize the
+# encoder's per-call overhead, small enough to keep chunks bounded
+STREAM_BATCH_RECORDS = 256
+
+
+def iter_json(data, level=0):
+    """Yield the json.dumps(data, indent=2) text piece by piece.
+    
+    RecordStream values are consumed in small batches, so the full encoded
+    payload is never held in memory.
+    """
+    pad = ' ' * (2 * level)
+    if isinstance(data, RecordStream):
+        prefix, batch = '[', []
+        for record in data:
+            batch.append(record)
+            if len(batch) == STREAM_BATCH_RECORDS:
+                yield prefix + _JSON_ENCODER.encode(batch)[1:-2].replace('\n', '\n' + pad)
+                prefix, batch = ',', []
+        if batch:
+            yield prefix + _JSON_ENCODER.encode(batch)[1:-2].replace('\n', '\n' + pad)
+            prefix = ','
+        yield '[]' if prefix == '[' else '\n' + pad + ']'
+    elif isinstance(data, dict) and data:
+        for i, (key, value) in enumerate(data.items()):
+            yield ('{' if i == 0 else ',') + '\n' + pad + '  ' + json.dumps(str(key)) + ': '
+            yield from iter_json(value, level + 1)
+        yield '\n' + pad + '}'
+    elif isinstance(data, list) and data:
+        for i, item in enumerate(data):
+            yield ('[' if i == 0 else ',') + '\n' + pad + '  '
+            yield from iter_json(item, level + 1)
+        yield '\n' + pad + ']'
+    else:
+        yield _JSON_ENCODER.encode(data).replace('\n', '\n' + pad)
+
+
+class RenderContext:
+    """Values computed at most once per rendered response, and the source of random ones."""
+    
+    def __init__(self):
+        self._timestamp = None
+        self._request_uuid = None
+        # Source of {{random_int}} and {{random_price}}
+        self.random = random
+        # {{index}}, inside generated items only
+        self.index = None
+    
+    @property
+    def timestamp(self):
+        if self._timestamp is None:
+            self._timestamp = datetime.now(timezone.utc).isoformat()
+        return self._timestamp
+    
+    @property
+    def request_uuid(self):
+        if self._request_uuid is None:
+            self._request_uuid = self.new_uuid()
+        return self._request_uuid
+    
+    def new_uuid(self):
+        """A fresh UUID, for each {{uuid}}."""
+        import uuid
+        return str(uuid.uuid4())
+
+
+class ItemContext(RenderContext):
+    """RenderContext of one {{repeat}} or {{range}} item.
+    
+    Random values, {{uuid}} included, come from the stream's seeded
+    generator; the timestamp and request id are the response's.
+    """
+    
+    def __init__(self, rng, index, parent):
+        super().__init__()
+        self.random = rng
+        self.index = index
+        self.parent = parent
+    
+    @property
+    def timestamp(self):
+        return self.parent.timestamp
+    
+    @property
+    def request_uuid(self):
+        return self.parent.request_uuid
+    
+    def new_uuid(self):
+        import uuid
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+
+# Returned by TemplateEngine._render_database for unknown {{database...}} names
+_NOT_A_DIRECTIVE = object()
+
+
+class TemplateError(ValueError):
+    """Raised when request parameters cannot be applied to a template."""
 
 
 class TemplateEngine:
     """Simple template engine for dynamic response fields."""
     
+    # Page size for {{database_page}} when the request has no ?limit=
+    DEFAULT_PAGE_LIMIT = 20
+    
+    # Query language operators for {{database_query}}
+    QUERY_OPERATORS = {'<=': 'le', '>=': 'ge', '^=': 'prefix', '*=': 'contains',
+                       '=': 'eq', '<': 'lt', '>': 'gt'}
+    
     @staticmethod
-    def render(data, query_params, config):
-        """Recursively render templates in data structure."""
+    def _query_value(text):
+        """Convert a query literal: quoted strings, true/false/null, numbers."""
+        text = text.strip()
+        if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+            return text[1:-1]
+        if text.lower() in ('true', 'false'):
+            return text.lower() == 'true'
+        if text.lower() == 'null':
+            return None
+        if re.fullmatch(r'-?\d+', text):
+            return int(text)
+        if re.fullmatch(r'-?\d+\.\d*(e-?\d+)?', text, re.I):
+            return float(text)
+        return text
+    
+    @staticmethod
+    def parse_query(expression, query_params):
+        """Parse a query such as 'genres=RPG AND sales_leaderboard<=10 OR title^=Half'.
+        
+        Returns a list of OR branches, each a list of AND-ed (field, op, value)
+        predicates. AND binds tighter than OR. Operators are =, <, <=, >, >=,
+        ^= (prefix), *= (contains, case-insensitive) and 'in a|b|c'. A
+        predicate whose {{query.x}} parameter is missing is dropped, and so
+        is a branch left without predicates; no branches match no records.
+        """
+        branches = []
+        for branch in re.split(r'\s+OR\s+', expression.strip(), flags=re.I):
+            predicates, dropped = [], False
+            for text in re.split(r'\s+AND\s+', branch, flags=re.I):
+                params = re.findall(r'\{\{query\.(\w+)\}\}', text)
+                if any(param not in query_params for param in params):
+                    dropped = True
+                    continue
+                text = re.sub(r'\{\{query\.(\w+)\}\}',
+                              lambda m: str(query_params[m.group(1)][0]), text).strip()
+                if not text:
+                    continue
+                
+                membership = re.fullmatch(r'(\w+)\s+in\s+(.*)', text, re.I | re.S)
+                match = re.fullmatch(r'(\w+)\s*(<=|>=|\^=|\*=|=|<|>)(.*)', text, re.S)
+                if match:
+                    field, symbol, value = match.groups()
+                    op = TemplateEngine.QUERY_OPERATORS[symbol]
+                    if op in ('prefix', 'contains'):
+                        value = value.strip()
+                    else:
+                        value = TemplateEngine._query_value(value)
+                elif membership:
+                    field, values = membership.groups()
+                    op, value = 'in', [TemplateEngine._query_value(v) for v in values.split('|')]
+                else:
+                    raise TemplateError(f"Invalid query predicate: {text}")
+                predicates.append((field, op, value))
+            if predicates or not dropped:
+                branches.append(predicates)
+        return branches
+    
+    @staticmethod
+    def render(data, query_params, config, lazy=False, context=None):
+        """Recursively render templates in data structure.
+        
+        With lazy=True, database directives yield RecordStream objects that
+        must be encoded with iter_json instead of json.dumps.
+        """
+        if context is None:
+            context = RenderContext()
         if isinstance(data, dict):
-            return {k: TemplateEngine.render(v, query_params, config) for k, v in data.items()}
+            return {k: TemplateEngine.render(v, query_params, config, lazy, context) for k, v in data.items()}
         elif isinstance(data, list):
-            return [TemplateEngine.render(item, query_params, config) for item in data]
+            return [TemplateEngine.render(item, query_params, config, lazy, context) for item in data]
         elif isinstance(data, str):
-            return TemplateEngine._render_string(data, query_params, config)
+            return TemplateEngine._render_string(data, query_params, config, lazy, context)
         return data
     
     @staticmethod
-    def _render_string(template, query_params, config):
+    def has_stream(data):
+        """Check whether rendered data contains a RecordStream."""
+        if isinstance(data, RecordStream):
+            return True
+        if isinstance(data, dict):
+            return any(TemplateEngine.has_stream(v) for v in data.values())
+        if isinstance(data, list):
+            return any(TemplateEngine.has_stream(item) for item in data)
+        return False
+    
+    @staticmethod
+    def _page_params(query_params):
+        """Parse ?offset=&limit=&sort=&fields= for {{database_page}}."""
+        try:
+            offset = int(query_params.get('offset', [0])[0])
+            limit = int(query_params.get('limit', [TemplateEngine.DEFAULT_PAGE_LIMIT])[0])
+        except (TypeError, ValueError):
+            raise TemplateError("offset and limit must be non-negative integers")
+        if offset < 0 or limit < 0:
+            raise TemplateError("offset and limit must be non-negative integers")
+        
+        # ?sort=field ascending, ?sort=-field descending
+        sort = str(query_params.get('sort', [''])[0])
+        descending = sort.startswith('-')
+        sort_field = sort.lstrip('-') or None
+        if sort_field is not None and not re.fullmatch(r'\w+', sort_field):
+            raise TemplateError(f"Invalid sort field: {sort_field}")
+        
+        fields = str(query_params.get('fields', [''])[0])
+        fields = [field for field in fields.split(',') if field] or None
+        return offset, limit, sort_field, descending, fields
+    
+    @staticmethod
+    def _render_string(template, query_params, config, lazy=False, context=None):
         """Render template string with variables."""
+        # Most strings in a response are plain text
+        if '{{' not in template:
+            return template
+        context = context or RenderContext()
+        
+        if template.startswith('{{database'):
+            result = TemplateEngine._render_database(template, query_params, config, lazy)
+            if result is not _NOT_A_DIRECTIVE:
+                return result
+        
+        if template.startswith(('{{repeat:', '{{range:')) and template.endswith('}}'):
+            return TemplateEngine._render_generator(template, query_params, config, lazy, context)
+        
+        # {{index}} - the item number (or range value) inside {{repeat}} and {{range}}
+        if context.index is not None and '{{index}}' in template:
+            if template == '{{index}}':
+                return context.index
+            template = template.replace('{{index}}', str(context.index))
+        
+        # {{query.param_name}} - replace with query parameter value (JSON-escaped)
+        def replace_query(match):
+            param_name = match.group(1)
+            value = query_params.get(param_name, [''])[0]
+            # Escape for JSON: quotes, backslashes, newlines, etc.
+            value = value.replace('\\', '\\\\')  # Backslash first!
+            value = value.replace('"', '\\"')    # Quotes
+            value = value.replace('\n', '\\n')   # Newlines
+            value = value.replace('\r', '\\r')   # Carriage returns
+            value = value.replace('\t', '\\t')   # Tabs
+            return value
+        
+        if '{{query.' in template:
+            template = re.sub(r'\{\{query\.(\w+)\}\}', replace_query, template)
+        
+        # {{timestamp}} - the same for every string in the response
+        if '{{timestamp}}' in template:
+            template = template.replace('{{timestamp}}', context.timestamp)
+        
+        # {{random_int}}
+        if '{{random_int}}' in template:
+            template = template.replace('{{random_int}}', str(context.random.randint(0, 1000000)))
+        
+        # {{random_price}} - random price between $20-$80
+        if '{{random_price}}' in template:
+            template = template.replace('{{random_price}}', f'${context.random.randint(20, 80)}')
+        
+        # {{uuid}} - a new one at every use; {{request_uuid}} - one for the whole response
+        if '{{uuid}}' in template:
+            template = re.sub(r'\{\{uuid\}\}', lambda m: context.new_uuid(), template)
+        if '{{request_uuid}}' in template:
+            template = template.replace('{{request_uuid}}', context.request_uuid)
+        
+        return template
+    
+    @staticmethod
+    def _render_generator(template, query_params, config, lazy=False, context=None):
+        """Render {{repeat:N:ITEM}} or {{range:START:STOP[:STEP[:ITEM]]}}.
+        
+        ITEM is a template string, or JSON for structured items, rendered
+        once per element with {{index}} set to the element's number (repeat)
+        or value (range). Without ITEM, range yields the numbers. Counts
+        may be {{query.x}} parameters. Random values in items are seeded
+        from the config's "generator_seed" and the directive, so responses
+        are reproducible. With lazy=True the result is a GeneratedStream.
+        """
+        name, _, spec = template[2:-2].partition(':')
+        parts = spec.split(':', 1 if name == 'repeat' else 3)
+        
+        def number(text):
+            text = re.sub(r'\{\{query\.(\w+)\}\}',
+                          lambda m: str(query_params.get(m.group(1), [''])[0]), text).strip()
+            try:
+                return int(text)
+            except ValueError:
+                raise TemplateError(f"Invalid {name} bound: {text!r}")
+        
+        if name == 'repeat':
+            if len(parts) != 2 or number(parts[0]) < 0:
+                raise TemplateError("repeat needs a non-negative count and an item: {{repeat:N:ITEM}}")
+            values, item = range(number(parts[0])), parts[1]
+        else:
+            if len(parts) < 2:
+                raise TemplateError("range needs bounds: {{range:START:STOP[:STEP[:ITEM]]}}")
+            step = number(parts[2]) if len(parts) > 2 else 1
+            if step == 0:
+                raise TemplateError("range step must not be 0")
+            values = range(number(parts[0]), number(parts[1]), step)
+            item = parts[3] if len(parts) > 3 else None
+        if item is not None and item.lstrip().startswith(('{', '[')) and not item.lstrip().startswith('{{'):
+            try:
+                item = json.loads(item)
+            except json.JSONDecodeError as e:
+                raise TemplateError(f"Invalid {name} item: {e}")
+        
+        seed = f"{config.get('generator_seed', 0) if config is not None else 0}:{template}"
+        stream = GeneratedStream(values, item, query_params, config, seed, context)
+        return stream if lazy else list(stream)
+    
+    @staticmethod
+    def _render_database(template, query_params, config, lazy=False):
+        """Render a {{database...}} directive.
+        
+        Results other than {{database}} and {{database_count}} are cached by
+        directive, resolved parameters and database version. Cached values
+        are shared between requests and must not be modified.
+        """
+        cache = config.directive_cache
+        version = config.version
+        
         # {{database}} - return entire database
         if template == '{{database}}':
+            if lazy:
+                return config.stream_database()
             return config.get_database()
         
         # {{database_count}} - return database count
         if template == '{{database_count}}':
-            return len(config.get_database())
+            return config.database_count()
         
         # {{database_filter:field:value}} - filter database (with query param support)
         filter_match = re.match(r'\{\{database_filter:(\w+):(.+)\}\}', template)
@@ -234,14 +2338,59 @@ class TemplateEngine:
             query_match = re.match(r'\{\{query\.(\w+)\}\}', value)
             if query_match:
                 param_name = query_match.group(1)
-                value = query_params.get(param_name, [''])[0]
+                value = query_params.get(param_name, [''])[0]
+            # Convert value to appropriate type
+            if isinstance(value, str):
+                if value.lower() == 'true':
+                    value = True
+                elif value.lower() == 'false':
+                    value = False
+            records = cache.get_or_compute(('filter', field, repr(value), version),
+                                           lambda: config.filter_database(field, value))
+            return RecordStream(records, len(records)) if lazy else records
+        
+        # {{database_page}} / {{database_page:field:value}} - one page of records,
+        # driven by ?offset=&limit=&sort=&fields=
+        page_match = re.match(r'\{\{database_page(?::(\w+):(.+))?\}\}$', template)
+        if page_match:
+            field, value = page_match.groups()
+            # Check if value is a query param placeholder; a missing param means no filter
+            query_match = re.match(r'\{\{query\.(\w+)\}\}', value or '')
+            if query_match:
+                param_name = query_match.group(1)
+                value = query_params.get(param_name, [None])[0]
+                if value is None:
+                    field = None
             # Convert value to appropriate type
             if isinstance(value, str):
                 if value.lower() == 'true':
                     value = True
                 elif value.lower() == 'false':
                     value = False
-            return config.filter_database(field, value)
+            value = value if field else None
+            offset, limit, sort_field, descending, fields = TemplateEngine._page_params(query_params)
+            
+            def page():
+                records, total = config.page_database(offset, limit, sort_field, descending, field, value)
+                if fields:
+                    records = [{f: record[f] for f in fields if f in record} for record in records]
+                return {"items": records, "total": total, "offset": offset, "limit": limit}
+            
+            key = ('page', field, repr(value), offset, limit, sort_field, descending,
+                   tuple(fields or ()), version)
+            return cache.get_or_compute(key, page)
+        
+        # {{database_query:expression}} - compound query; without an expression,
+        # the query comes from ?q=
+        query_match = re.match(r'\{\{database_query(?::(.+))?\}\}$', template, re.S)
+        if query_match:
+            expression = query_match.group(1)
+            if expression is None:
+                expression = str(query_params.get('q', [''])[0])
+            branches = TemplateEngine.parse_query(expression, query_params)
+            records = cache.get_or_compute(('query', repr(branches), version),
+                                           lambda: config.query_database(branches))
+            return RecordStream(records, len(records)) if lazy else records
         
         # {{database_find:field:value}} - find single record (with query param support)
         find_match = re.match(r'\{\{database_find:(\w+):(.+)\}\}', template)
@@ -252,7 +2401,8 @@ class TemplateEngine:
             if query_match:
                 param_name = query_match.group(1)
                 value = query_params.get(param_name, [''])[0]
-            return config.find_in_database(field, value)
+            return cache.get_or_compute(('find', field, repr(value), version),
+                                        lambda: config.find_in_database(field, value))
         
         # {{database_filter_genre:genre}} - filter by genre (with query param support)
         genre_match = re.match(r'\{\{database_filter_genre:(.+)\}\}', template)
@@ -263,252 +2413,808 @@ class TemplateEngine:
             if query_match:
                 param_name = query_match.group(1)
                 genre = query_params.get(param_name, [''])[0]
-            return config.filter_by_genre(genre)
-        
-        # {{query.param_name}} - replace with query parameter value (JSON-escaped)
-        def replace_query(match):
-            param_name = match.group(1)
-            value = query_params.get(param_name, [''])[0]
-            # Escape for JSON: quotes, backslashes, newlines, etc.
-            value = value.replace('\\', '\\\\')  # Backslash first!
-            value = value.replace('"', '\\"')    # Quotes
-            value = value.replace('\n', '\\n')   # Newlines
-            value = value.replace('\r', '\\r')   # Carriage returns
-            value = value.replace('\t', '\\t')   # Tabs
-            return value
-        
-        template = re.sub(r'\{\{query\.(\w+)\}\}', replace_query, template)
-        
-        # {{timestamp}}
-        template = re.sub(
-            r'\{\{timestamp\}\}',
-            datetime.now(timezone.utc).isoformat(),
-            template
-        )
-        
-        # {{random_int}}
-        template = re.sub(
-            r'\{\{random_int\}\}',
-            str(random.randint(0, 1000000)),
-            template
-        )
-        
-        # {{random_price}} - random price between $20-$80
-        template = re.sub(
-            r'\{\{random_price\}\}',
-            f'${random.randint(20, 80)}',
-            template
-        )
-        
-        # {{uuid}}
-        template = re.sub(
-            r'\{\{uuid\}\}',
-            str(uuid.uuid4()),
-            template
-        )
+            records = cache.get_or_compute(('genre', repr(genre), version),
+                                           lambda: config.filter_by_genre(genre))
+            return RecordStream(records, len(records)) if lazy else records
         
-        return template
+        return _NOT_A_DIRECTIVE
 
 
-class MockRequestHandler(BaseHTTPRequestHandler):
-    """HTTP request handler with mock capabilities."""
+class MockRequest:
+    """One HTTP request, independent of the server that received it."""
     
-    config = None
-    logger = None
-    wishlist_manager = None
+    def __init__(self, method, target, headers=(), body=b'', stage_timer=None):
+        parsed_url = urlparse(target)
+        self.method = method
+        self.path = parsed_url.path
+        self.query_string = parsed_url.query
+        self.query_params = parse_qs(parsed_url.query)
+        # Header names are case-insensitive
+        self.headers = {name.lower(): value for name, value in headers}
+        self.body = body
+        self.body_data = {}
+        # Set by MockEngine._not_modified() for endpoints with ETags
+        self.etag = None
+        self.start_time = time.time()
+        self.timer = stage_timer
+        # Stage timings cost one attribute check per stage when disabled
+        self._lap_at = None if stage_timer is None else time.perf_counter()
     
-    def do_GET(self):
-        """Handle GET requests."""
-        self._handle_request('GET')
+    def lap(self, stage):
+        """Charge the time since the previous stage to stage."""
+        now = time.perf_counter()
+        if self.timer is not None and self._lap_at is not None:
+            self.timer.record(stage, now - self._lap_at)
+        self._lap_at = now
+
+
+class MockResponse:
+    """A response for a transport to send, with the network behaviour to simulate.
     
-    def do_POST(self):
-        """Handle POST requests."""
-        self._handle_request('POST')
+    The body is either `body` (bytes) or `chunks`, an iterator of strings
+    for bodies of unknown length. Transports wait `delay_ms` before
+    responding (or add it to the first-byte delay when pacing), pace the
+    bytes at `bandwidth_kbps` after `ttfb_ms`, apply `fault` (reset, hang,
+    truncate or slow_drip) and call MockEngine.complete() when done.
     
-    def do_DELETE(self):
-        """Handle DELETE requests."""
-        self._handle_request('DELETE')
+    A response with a `feed` has no body: after the headers (SSE) or the
+    101 handshake (WebSocket) the transport subscribes the client to it.
+    """
     
-    def do_OPTIONS(self):
-        """Handle OPTIONS requests for CORS preflight."""
-        self.send_response(200)
-        self.send_header('Content-Type', 'text/plain')
-        self.send_header('Content-Length', '0')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, Accept')
-        self.send_header('Access-Control-Max-Age', '86400')
-        self.end_headers()
+    def __init__(self, status, body=b'', content_type='application/json', headers=(), chunks=None):
+        self.status = status
+        self.headers = ([('Content-Type', content_type)] if content_type else []) + list(headers)
+        self.body = body
+        self.chunks = chunks
+        # Chunks may block waiting for data (log tails), so async servers
+        # pull them from a thread
+        self.blocking = False
+        self.delay_ms = 0
+        self.ttfb_ms = 0
+        self.bandwidth_kbps = None
+        self.fault = None
+        self.release = None
+        self.logged = True
+        self.feed = None
+
+
+class MockEngine:
+    """The mock server's request pipeline, independent of any transport.
     
-    def _handle_request(self, method):
-        """Main request handler."""
-        start_time = time.time()
-        parsed_url = urlparse(self.path)
-        path = parsed_url.path
-        query_params = parse_qs(parsed_url.query)
+    route() handles everything except configured endpoints, which it
+    returns for the transport to admit (waiting for a concurrency slot in
+    its own way, see admit() and admit_async()) and then serve(). Nothing
+    here sleeps or touches a socket: simulated latency, pacing and faults
+    are carried on the MockResponse for the transport to carry out.
+    """
+    
+    # Streamed responses are flushed in chunks of about this size
+    STREAM_CHUNK_SIZE = 64 * 1024
+    # Log entries per /__logs/stream write, and idle seconds between heartbeats
+    LOG_STREAM_BATCH = 1000
+    LOG_STREAM_HEARTBEAT = 15
+    # Built-in routes that read the request body
+    BODY_ROUTES = frozenset([('POST', '/__faults'), ('POST', '/__batch'), ('PUT', '/__config'),
+                             ('POST', '/api/games'),
+                             ('PUT', '/api/games'), ('PATCH', '/api/games'),
+                             ('POST', '/api/games/wishlist')])
+    # Sub-requests per POST /__batch unless the config sets max_batch_requests
+    DEFAULT_MAX_BATCH_REQUESTS = 1000
+    # Threads running the items of parallel batches, per process
+    BATCH_WORKERS = 8
+    # Requests naming a state view get their own fork of the state (see for_request)
+    STATE_VIEW_HEADER = 'x-state-view'
+    
+    def __init__(self, config, logger, wishlist_manager):
+        self.config = config
+        self.logger = logger
+        self.wishlist_manager = wishlist_manager
+        # State views forked from this engine, by name; a view knows its parent
+        self.state_views = {}
+        self.state_view = None
+        self.parent = None
+        self._views_lock = threading.Lock()
+        self._batch_pool = None
+        self._batch_pool_pid = None
+        # Set through /__profile/ (per process); stage_timer also by --stage-timings
+        self.profiler = None
+        self.stage_timer = None
+        # PUT /__config overwrites the config file, so nodes opt in (--controller)
+        self.accept_config_push = False
+        # Allowed CORS origins, overriding the "cors" config key (see main.py)
+        self.cors_origins = None
+        self._profile_timings = False
+        self._profile_lock = threading.Lock()
+    
+    def for_request(self, request):
+        """The engine for the request's state view (X-State-View), or self.
         
-
+        A view is forked from this engine's records and wishlists on first
+        use, sharing their memory until either side writes, and then
+        changes independently of them; routes, faults and logs stay
+        shared. Views live in this process only.
+        """
+        name = request.headers.get(self.STATE_VIEW_HEADER)
+        if not name or self.parent is not None:
+            return self
+        with self._views_lock:
+            engine = self.state_views.get(name)
+            if engine is None:
+                engine = MockEngine(self.config.fork(), self.logger, self.wishlist_manager.fork())
+                engine.parent, engine.state_view = self, name
+                engine.stage_timer = self.stage_timer
+                engine.cors_origins = self.cors_origins
+                self.state_views[name] = engine
+            return engine
+    
+    def _cors_headers(self):
+        if self.config.get('cors', True):
+            return [('Access-Control-Allow-Origin', '*'),
+                    ('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS'),
+                    ('Access-Control-Allow-Headers', 'Content-Type')]
+        return []
+    
+    def apply_cors(self, request, response):
+        """Limit the response's CORS headers to the allowed origins, if listed.
+        
+        Responses allow any origin ("*") unless "cors" (or cors_origins)
+        is a list of origins: then a listed Origin is echoed back with
+        credentials allowed, and any other Origin gets no CORS headers.
+        Transports call this before sending.
+        """
+        origins = self.cors_origins if self.cors_origins is not None else self.config.get('cors', True)
+        if not isinstance(origins, list) or not any(
+                name == 'Access-Control-Allow-Origin' for name, _ in response.headers):
+            return
+        headers = [(name, value) for name, value in response.headers if not name.startswith('Access-Control-')]
+        origin = request.headers.get('origin', '')
+        if origin and origin.rstrip('/') in {allowed.rstrip('/') for allowed in origins}:
+            headers += [('Access-Control-Allow-Origin', origin),
+                        ('Access-Control-Allow-Credentials', 'true'),
+                        ('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS'),
+                        ('Access-Control-Allow-Headers', 'Content-Type')]
+        response.headers = headers + ([('Vary', 'Origin')] if origins else [])
+    
+    def _json(self, status, data, headers=()):
+        """JSON response with CORS headers."""
+        body = json.dumps(data, indent=2).encode()
+        return MockResponse(status, body, headers=list(headers) + self._cors_headers())
+    
+    def _error(self, status, message, headers=()):
+        return self._json(status, {"error": message}, headers)
+    
+    def _stream(self, status, chunks, content_type='application/json', headers=()):
+        """Response whose body is produced incrementally by chunks."""
+        return MockResponse(status, content_type=content_type,
+                            headers=list(headers) + self._cors_headers(), chunks=chunks)
+    
+    def _json_chunks(self, data):
+        """Encode data incrementally, in pieces of about STREAM_CHUNK_SIZE."""
+        pending, size = [], 0
+        for piece in iter_json(data):
+            pending.append(piece)
+            size += len(piece)
+            if size >= self.STREAM_CHUNK_SIZE:
+                yield ''.join(pending)
+                pending, size = [], 0
+        if pending:
+            yield ''.join(pending)
+    
+    def body_plan(self, request):
+        """Decide, before it is read, what to do with a request's body.
+        
+        Returns (keep, max_bytes). Only JSON bodies of POST, PUT and PATCH
+        requests to routes or templates that use them are kept; transports
+        drain and discard the rest, whatever its size. Kept bodies over
+        max_bytes get body_too_large().
+        """
+        method, path = request.method, request.path
+        if (method, path) in self.BODY_ROUTES and (path != '/__config' or self.accept_config_push):
+            return True, self.config.max_body_bytes()
+        endpoint = self.config.find_endpoint(path, method)
+        if endpoint is None:
+            return False, self.config.max_body_bytes()
+        keep = method in ('POST', 'PUT', 'PATCH') and self.config.uses_body(endpoint)
+        return keep, self.config.max_body_bytes(endpoint)
+    
+    def body_too_large(self, max_bytes):
+        """Response for a kept body over max_bytes."""
+        return self._error(413, f"Request body is larger than {max_bytes} bytes")
+    
+    def malformed_body(self, reason):
+        """Response for a body whose framing could not be read."""
+        return self._error(400, f"Malformed request body: {reason}")
+    
+    def route(self, request):
+        """Handle a request; return its MockResponse, or the configured endpoint to serve()."""
+        self.config.sync()
+        method, path = request.method, request.path
+        query_params = request.query_params
         
-        # Parse request body for POST
+        if method == 'OPTIONS':
+            # CORS preflight
+            response = MockResponse(200, content_type='text/plain', headers=[
+                ('Access-Control-Allow-Origin', '*'),
+                ('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS'),
+                ('Access-Control-Allow-Headers',
+                 'Content-Type, Authorization, Accept, X-Session-Id, X-State-View'),
+                ('Access-Control-Max-Age', '86400')])
+            response.logged = False
+            return response
+        
+        # Parse request body for POST/PUT/PATCH
         body_data = {}
-        if method == 'POST':
-            content_length = self.headers.get('Content-Length')
-            if content_length:
-                try:
-                    body = self.rfile.read(int(content_length)).decode('utf-8')
-                    if body:
-                        body_data = json.loads(body)
-                        # Merge body data into query_params for template rendering
-                        for key, value in body_data.items():
-                            query_params[key] = [value]
-                except (json.JSONDecodeError, ValueError) as e:
-                    print(f"[ERROR] Failed to parse request body: {e}")
+        if request.body and method in ('POST', 'PUT', 'PATCH'):
+            try:
+                body_data = json.loads(request.body.decode('utf-8'))
+                # Merge body data into query_params for template rendering
+                if isinstance(body_data, dict):
+                    for key, value in body_data.items():
+                        query_params[key] = [value]
+            except (json.JSONDecodeError, ValueError) as e:
+                print(f"[ERROR] Failed to parse request body: {e}")
+        request.body_data = body_data
+        if request.timer is not None:
+            request.lap('parse')
         
         # Serve static files for frontend
         if method == 'GET' and (path == '/' or path.startswith('/static/')):
-            self._serve_static_file(path)
-            return
+            return self._serve_static_file(path)
         
         # Special endpoints
         if path == '/__reload' and method == 'POST':
-            self._handle_reload()
-            latency_ms = int((time.time() - start_time) * 1000)
-            self.logger.log(method, path, 200, latency_ms)
-            return
+            return self._handle_reload()
+        
+        if path == '/__logs/stream' and method == 'GET':
+            return self._handle_logs_stream(query_params)
         
         if path == '/__logs' and method == 'GET':
-            self._handle_logs()
-            latency_ms = int((time.time() - start_time) * 1000)
-            self.logger.log(method, path, 200, latency_ms)
-            return
+            return self._handle_logs()
+        
+        if path == '/__cache' and method == 'GET':
+            return self._json(200, dict(self.config.directive_cache.stats(),
+                                        database_version=self.config.version))
+        
+        if path == '/__explain' and method == 'GET':
+            return self._handle_explain(query_params)
+        
+        if path.startswith('/__profile/'):
+            return self._handle_profile(method, path[len('/__profile/'):], query_params)
+        
+        if path == '/__faults' and method in ('GET', 'POST'):
+            return self._handle_faults(method, body_data)
+        
+        if path == '/__node' and method == 'GET':
+            return self._handle_node()
+        
+        if path == '/__config' and method == 'PUT':
+            if not self.accept_config_push:
+                return self._error(403, "Config pushes are off; start the server with "
+                                        "--controller or --accept-config-push")
+            return self._handle_config_push(request.body)
+        
+        if path == '/__batch' and method == 'POST':
+            return self._handle_batch(request, body_data)
+        
+        if path == '/__state' or path.startswith('/__state/'):
+            return self._handle_state(method, path[len('/__state/'):], query_params)
         
-
         # Wishlist endpoints with real storage
         if path == '/api/games/wishlist':
+            # Each virtual user (session) gets its own wishlist partition
+            session = query_params.get('session', [request.headers.get('x-session-id', '')])[0]
             if method == 'GET':
-                self._handle_wishlist_get()
-                latency_ms = int((time.time() - start_time) * 1000)
-                self.logger.log(method, path, 200, latency_ms)
-                return
+                return self._handle_wishlist_get(session, query_params)
             elif method == 'POST':
-                title = query_params.get('title', [''])[0]
-                self._handle_wishlist_add(title)
-                latency_ms = int((time.time() - start_time) * 1000)
-                self.logger.log(method, path, 200, latency_ms)
-                return
+                return self._handle_wishlist_add(query_params.get('title', [''])[0], session)
             elif method == 'DELETE':
-                title = query_params.get('title', [''])[0]
-                self._handle_wishlist_remove(title)
-                latency_ms = int((time.time() - start_time) * 1000)
-                self.logger.log(method, path, 200, latency_ms)
-                return
+                return self._handle_wishlist_remove(query_params.get('title', [''])[0], session)
         
         # Games CRUD endpoints with real database modification
         if path == '/api/games':
             if method == 'POST':
-                self._handle_game_create(body_data)
-                latency_ms = int((time.time() - start_time) * 1000)
-                self.logger.log(method, path, 201, latency_ms)
-                return
+                return self._handle_game_create(body_data)
             elif method == 'DELETE':
-                self._handle_game_delete(query_params)
-                latency_ms = int((time.time() - start_time) * 1000)
-                self.logger.log(method, path, 200, latency_ms)
-                return
+                return self._handle_game_delete(query_params)
+            elif method in ('PUT', 'PATCH'):
+                # Key comes from the URL; body fields are merged into query_params
+                return self._handle_game_update(parse_qs(request.query_string), body_data,
+                                                replace=(method == 'PUT'))
         
-
         # Find endpoint configuration
         endpoint = self.config.find_endpoint(path, method)
-        
         if not endpoint:
-            self._send_error_response(404, "Endpoint not found")
-            latency_ms = int((time.time() - start_time) * 1000)
-            self.logger.log(method, path, 404, latency_ms)
-            return
+            return self._error(404, "Endpoint not found")
+        if request.timer is not None:
+            request.lap('route')
+        return endpoint
+    
+    def admit(self, endpoint):
+        """Apply the endpoint's capacity limits, blocking while queued.
         
-        # Simulate latency
-        latency = endpoint.get('latency_ms', 0)
-        if latency > 0:
-            time.sleep(latency / 1000.0)
-        
-        # Simulate failures
-        failure_rate = endpoint.get('failure_rate', 0.0)
-        if random.random() < failure_rate:
-            self._send_error_response(500, "Simulated failure")
-            latency_ms = int((time.time() - start_time) * 1000)
-            self.logger.log(method, path, 500, latency_ms)
-            return
+        Returns the (status, retry_after_s, seconds queued) admission to
+        pass to serve(), or None if the endpoint is unlimited.
+        """
+        limits = self.config.get_limits(endpoint)
+        return None if limits is None else limits.admit()
+    
+    async def admit_async(self, endpoint):
+        """admit() for asyncio servers."""
+        limits = self.config.get_limits(endpoint)
+        return None if limits is None else await limits.admit_async()
+    
+    def serve(self, request, endpoint, admission=None):
+        """Build the response for an admitted configured endpoint.
         
-        # Render response with templates
-        response_data = endpoint.get('response', {})
-        rendered_data = TemplateEngine.render(response_data, query_params, self.config)
+        A refused admission becomes 429 (rate limit) or 503 (overloaded)
+        with Retry-After. An admitted response frees its concurrency slot
+        in complete().
+        """
+        headers = []
+        if admission is not None:
+            status, retry_after, queued = admission
+            if status is not None:
+                message = "Rate limit exceeded" if status == 429 else "Service overloaded"
+                return self._error(status, message, [('Retry-After', str(retry_after))])
+            if request.timer is not None:
+                request.lap('queue')
+            limits = self.config.get_limits(endpoint)
+            # Time spent queued is part of the response latency
+            if limits.limiter is not None:
+                headers.append(('X-Queue-Wait-Ms', str(int(queued * 1000))))
         
-        # Send response
-        status = endpoint.get('status', 200)
-        self._send_json_response(status, rendered_data)
+        try:
+            response = self._serve_endpoint(request, endpoint, headers)
+        except BaseException:
+            if admission is not None:
+                limits.release()
+            raise
+        if admission is not None:
+            response.release = limits.release
+        return response
+    
+    def _serve_endpoint(self, request, endpoint, headers):
+        """Pick latency and faults, then render an endpoint's response."""
+        # Simulate failures: the active scenario, the endpoint's faults and failure_rate
+        fault = self.config.faults.pick(endpoint)
+        if fault is not None and fault.type == 'error':
+            response = self._json(fault.status, fault.body, headers)
+        elif fault is not None and fault.type in ('reset', 'hang'):
+            # Nothing is sent; logged with status 0
+            response = MockResponse(0)
+            response.fault = fault
+        elif endpoint.get('stream'):
+            response = self._serve_feed(request, endpoint, headers)
+        elif self._not_modified(request, endpoint, headers):
+            # The client's copy is current: skip rendering altogether
+            response = MockResponse(304, content_type=None, headers=headers + self._cors_headers())
+        else:
+            # Render response with templates
+            try:
+                rendered_data = TemplateEngine.render(endpoint.get('response', {}), request.query_params,
+                                                      self.config, lazy=True)
+            except TemplateError as e:
+                response = self._error(400, str(e), headers)
+            else:
+                if request.timer is not None:
+                    request.lap('render')
+                # Database-backed bodies are encoded incrementally
+                status = endpoint.get('status', 200)
+                if request.etag is not None:
+                    headers = headers + [('ETag', request.etag)]
+                if TemplateEngine.has_stream(rendered_data):
+                    response = self._stream(status, self._json_chunks(rendered_data), headers=headers)
+                else:
+                    response = self._json(status, rendered_data, headers)
+                    if request.timer is not None:
+                        request.lap('serialize')
+                # Truncate and slow_drip damage the rendered response
+                response.fault = fault
         
-        latency_ms = int((time.time() - start_time) * 1000)
-        self.logger.log(method, path, status, latency_ms)
+        response.delay_ms = self.config.sample_latency(endpoint)
+        response.ttfb_ms = endpoint.get('ttfb_ms', 0)
+        response.bandwidth_kbps = endpoint.get('bandwidth_kbps')
+        return response
+    
+    def _not_modified(self, request, endpoint, headers):
+        """Check If-None-Match against the endpoint's ETag (kept on request.etag).
+        
+        Adds the ETag to headers when the client's copy is current.
+        """
+        request.etag = self.config.etag(endpoint, request.query_params)
+        if request.etag is None:
+            return False
+        header = request.headers.get('if-none-match')
+        if not header:
+            return False
+        # Weak comparison, as RFC 9110 asks for If-None-Match
+        tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+        if '*' not in tags and request.etag.removeprefix('W/') not in tags:
+            return False
+        headers.append(('ETag', request.etag))
+        return True
+    
+    def _serve_feed(self, request, endpoint, headers):
+        """Accept a subscriber to a streaming endpoint: WebSocket if asked, else SSE."""
+        feed = self.config.get_feed(endpoint)
+        if feed is None:
+            return self._error(500, "Invalid stream configuration", headers)
+        if request.headers.get('upgrade', '').lower() == 'websocket':
+            key = request.headers.get('sec-websocket-key')
+            if not key:
+                return self._error(400, "Missing Sec-WebSocket-Key", headers)
+            from feeds import websocket_accept
+            response = MockResponse(101, content_type=None, headers=headers + [
+                ('Upgrade', 'websocket'), ('Connection', 'Upgrade'),
+                ('Sec-WebSocket-Accept', websocket_accept(key))])
+        else:
+            response = MockResponse(200, content_type='text/event-stream', headers=headers + [
+                ('Cache-Control', 'no-cache'), ('Connection', 'close')] + self._cors_headers())
+        response.feed = feed
+        return response
+    
+    def complete(self, request, response):
+        """Log a sent response and free its concurrency slot."""
+        if response.release is not None:
+            response.release()
+            response.release = None
+        if response.logged:
+            latency_ms = int((time.time() - request.start_time) * 1000)
+            self.logger.log(request.method, request.path, response.status, latency_ms)
     
     def _handle_reload(self):
         """Reload configuration."""
         self.config.load()
-        self._send_json_response(200, {"message": "Configuration reloaded"})
+        return self._json(200, {"message": "Configuration reloaded"})
+    
+    def _handle_node(self):
+        """This node's config version and request totals, for cluster controllers."""
+        return self._json(200, {"pid": os.getpid(), "config": self.config.config_path,
+                                "config_digest": self.config.config_digest,
+                                "loaded_at": self.config.loaded_at,
+                                "database_version": self.config.version,
+                                "records": self.config.database_count(),
+                                "requests": self.logger.stats()})
+    
+    def _handle_config_push(self, body):
+        """Install a pushed config file (PUT /__config) unless it is unchanged."""
+        try:
+            reloaded = self.config.install(body)
+        except ValueError as e:
+            return self._error(400, f"Invalid config: {e}")
+        except OSError as e:
+            return self._error(500, f"Could not write config: {e}")
+        return self._json(200, {"config_digest": self.config.config_digest, "reloaded": reloaded})
     
     def _handle_logs(self):
         """Return request logs."""
         logs = self.logger.get_logs()
-        self._send_json_response(200, {"logs": logs, "count": len(logs)})
+        return self._json(200, {"logs": logs, "count": len(logs)})
     
-    def _handle_wishlist_get(self):
-        """Get all wishlist items."""
-        items = self.wishlist_manager.get_all()
+    def _handle_logs_stream(self, query_params):
+        """Stream log entries after ?since= as NDJSON; ?follow=1 keeps tailing."""
+        try:
+            cursor = int(query_params.get('since', ['0'])[0])
+        except ValueError:
+            cursor = 0
+        follow = query_params.get('follow', ['0'])[0] not in ('0', 'false', '')
+        response = self._stream(200, self._log_chunks(cursor, follow), 'application/x-ndjson')
+        response.blocking = follow
+        return response
+    
+    def _log_chunks(self, cursor, follow):
+        """NDJSON log lines after cursor, LOG_STREAM_BATCH entries at a time.
+        
+        Memory is bounded however long the stream runs. Entries that fell
+        out of the buffer before they could be sent are reported as
+        {"dropped": n}; idle follow streams send a blank line every
+        LOG_STREAM_HEARTBEAT seconds.
+        """
+        last_write = time.monotonic()
+        while True:
+            entries, dropped = self.logger.since(cursor, self.LOG_STREAM_BATCH,
+                                                 timeout=1.0 if follow else None)
+            lines = [json.dumps({"dropped": dropped})] if dropped else []
+            lines.extend(json.dumps(entry) for entry in entries)
+            if lines:
+                cursor = entries[-1]['seq']
+                yield '\n'.join(lines) + '\n'
+                last_write = time.monotonic()
+            elif not follow:
+                return
+            elif time.monotonic() - last_write >= self.LOG_STREAM_HEARTBEAT:
+                yield '\n'
+                last_write = time.monotonic()
+    
+    def _handle_profile(self, method, action, query_params):
+        """Start or stop the sampling profiler (POST), or show stage timings (GET)."""
+        def flag(name):
+            return query_params.get(name, ['0'])[0] not in ('0', 'false', '')
+        
+        if action == 'start' and method == 'POST':
+            try:
+                interval_ms = float(query_params.get('interval_ms', ['5'])[0])
+            except ValueError:
+                return self._error(400, "interval_ms must be a number")
+            from profiling import SamplingProfiler, StageTimer
+            with self._profile_lock:
+                if self.profiler is not None:
+                    return self._error(409, "Profiler already running")
+                self.profiler = SamplingProfiler(interval_ms, include_idle=flag('idle')).start()
+                if flag('timings') and self.stage_timer is None:
+                    self.stage_timer, self._profile_timings = StageTimer(), True
+            return self._json(200, {"message": "Profiler started", "pid": os.getpid(),
+                                    "interval_ms": self.profiler.interval * 1000,
+                                    "timings": self.stage_timer is not None})
+        
+        if action == 'stop' and method == 'POST':
+            with self._profile_lock:
+                profiler, self.profiler = self.profiler, None
+                if profiler is None:
+                    return self._error(409, "Profiler is not running")
+                timings = self.stage_timer.snapshot() if self.stage_timer is not None else None
+                if self._profile_timings:
+                    self.stage_timer, self._profile_timings = None, False
+            profiler.stop()
+            if query_params.get('format', ['collapsed'])[0] == 'json':
+                return self._json(200, dict(profiler.summary(), timings=timings))
+            # Collapsed stacks for flamegraph.pl or speedscope
+            return MockResponse(200, profiler.collapsed().encode(), 'text/plain; charset=utf-8',
+                                self._cors_headers())
+        
+        if action == 'timings' and method == 'GET':
+            timer = self.stage_timer
+            if timer is None:
+                return self._error(404, "Stage timings are off; use /__profile/start?timings=1 "
+                                        "or --stage-timings")
+            return self._json(200, {"pid": os.getpid(), "stages": timer.snapshot()})
+        
+        return self._error(404, "Endpoint not found")
+    
+    def _handle_faults(self, method, body_data):
+        """Show fault rules (GET) or switch scenario (POST {"scenario": name, "rules": {...}})."""
+        if method == 'POST':
+            if not isinstance(body_data, dict) or 'scenario' not in body_data:
+                return self._error(400, "Body must name a scenario (or null for none)")
+            success, message = self.config.faults.activate(body_data['scenario'], body_data.get('rules'))
+            if not success:
+                return self._error(400, message)
+        return self._json(200, self.config.faults.status())
+    
+    def _handle_state(self, method, action, query_params):
+        """Snapshot (POST snapshot?name=), restore (POST restore/{name}) or show the state.
+        
+        Snapshots cover the records and every wishlist. DELETE snapshot/{name}
+        and DELETE views/{name} free a snapshot or a state view.
+        """
+        kind, _, name = action.partition('/')
+        states = (self.config, self.wishlist_manager)
+        if method == 'GET' and not kind:
+            root = self.parent or self
+            return self._json(200, {"view": self.state_view,
+                                    "snapshots": self.config.snapshot_names(),
+                                    "views": sorted(root.state_views),
+                                    "records": self.config.database_count(),
+                                    "database_version": self.config.version})
+        if kind == 'snapshot' and method == 'POST' and not name:
+            name = query_params.get('name', [''])[0] or f"snapshot-{os.urandom(4).hex()}"
+            if not all(state.snapshot(name) for state in states):
+                return self._error(503, "Could not take snapshot")
+            return self._json(201, {"snapshot": name})
+        if kind in ('snapshot', 'restore') and name:
+            if not all(name in state.snapshot_names() for state in states):
+                return self._error(404, f"No snapshot named {name!r}")
+            if kind == 'restore' and method == 'POST':
+                if not all(state.restore(name) for state in states):
+                    return self._error(503, "Could not restore snapshot")
+                return self._json(200, {"restored": name, "records": self.config.database_count()})
+            if kind == 'snapshot' and method == 'DELETE':
+                for state in states:
+                    state.drop_snapshot(name)
+                return self._json(200, {"dropped": name})
+        if kind == 'views' and name and method == 'DELETE':
+            root = self.parent or self
+            with root._views_lock:
+                if root.state_views.pop(name, None) is None:
+                    return self._error(404, f"No state view named {name!r}")
+            return self._json(200, {"dropped": name})
+        return self._error(404, "Endpoint not found")
+    
+    def _handle_batch(self, request, body_data):
+        """Run many sub-requests through route() and serve(), answering them in one response.
+        
+        The body is {"requests": [{"method", "path", "query", "body",
+        "headers"}, ...], "parallel": bool} or just the list. Each item
+        gets its status, non-CORS headers, body, simulated latency and the
+        time it took to build. The batch response is delayed by the
+        items' simulated latency: the slowest item's when parallel,
+        otherwise their sum. Parallel items also run concurrently, on up to
+        BATCH_WORKERS threads. Items never queue for a concurrency slot; a
+        full endpoint answers 503 at once.
+        """
+        if isinstance(body_data, list):
+            body_data = {"requests": body_data}
+        items = body_data.get('requests') if isinstance(body_data, dict) else None
+        if not isinstance(items, list):
+            return self._error(400, 'Body must be {"requests": [...]} or a list of requests')
+        max_items = self.config.get('max_batch_requests', self.DEFAULT_MAX_BATCH_REQUESTS)
+        if len(items) > max_items:
+            return self._error(400, f"A batch may hold at most {max_items} requests")
+        parallel = bool(body_data.get('parallel', False))
+        # Items inherit the batch's headers (session, state view) unless they set their own
+        headers = {name: value for name, value in request.headers.items()
+                   if name not in ('content-length', 'content-type', 'transfer-encoding')}
+        
+        started = time.perf_counter()
+        if parallel and len(items) > 1:
+            results = list(self._batch_executor().map(lambda item: self._batch_item(item, headers), items))
+        else:
+            results = [self._batch_item(item, headers) for item in items]
+        latencies = [result["latency_ms"] for result in results]
+        total = max(latencies, default=0) if parallel else sum(latencies)
+        response = self._json(200, {"responses": results, "count": len(results), "parallel": parallel,
+                                    "latency_ms": total,
+                                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)})
+        response.delay_ms = total
+        return response
+    
+    def _batch_executor(self):
+        """This process's pool for parallel batch items, shared by all state views."""
+        root = self.parent or self
+        with root._views_lock:
+            if root._batch_pool is None or root._batch_pool_pid != os.getpid():
+                # Only parallel batches need threads
+                from concurrent.futures import ThreadPoolExecutor
+                root._batch_pool = ThreadPoolExecutor(self.BATCH_WORKERS, thread_name_prefix='batch')
+                root._batch_pool_pid = os.getpid()
+            return root._batch_pool
+    
+    def _batch_item(self, item, headers):
+        """Route and serve one /__batch sub-request; return its result entry."""
+        started = time.perf_counter()
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            return {"status": 400, "body": {"error": "Each request needs a path"},
+                    "latency_ms": 0, "elapsed_ms": 0.0}
+        method = str(item.get('method', 'GET')).upper()
+        target = item['path']
+        if target.startswith('/__'):
+            return {"status": 400, "body": {"error": "Control endpoints cannot be batched"},
+                    "latency_ms": 0, "elapsed_ms": 0.0}
+        query = item.get('query')
+        if isinstance(query, dict) and query:
+            target += ('&' if '?' in target else '?') + urlencode(query, doseq=True)
+        body = item.get('body')
+        body = json.dumps(body).encode() if body is not None else b''
+        request = MockRequest(method, target, dict(headers, **{
+            name.lower(): str(value) for name, value in (item.get('headers') or {}).items()}).items(),
+            body=body)
+        
+        # An item's own X-State-View picks its view; without one it inherits the batch's
+        engine = (self.parent or self).for_request(request)
+        result = engine.route(request)
+        if isinstance(result, MockResponse):
+            response = result
+        elif result.get('stream'):
+            response = engine._error(400, "Streaming endpoints cannot be batched")
+        else:
+            limits = engine.config.get_limits(result)
+            response = engine.serve(request, result, None if limits is None else limits.try_admit())
+        try:
+            body = b''.join(chunk.encode() for chunk in response.chunks) if response.chunks else response.body
+        finally:
+            engine.complete(request, response)
+        
+        entry = {"status": response.status}
+        content_type = 'application/json'
+        entry_headers = {}
+        for name, value in response.headers:
+            if name == 'Content-Type':
+                content_type = value
+            elif not name.startswith('Access-Control-'):
+                entry_headers[name] = value
+        if entry_headers:
+            entry["headers"] = entry_headers
+        latency_ms = response.delay_ms + response.ttfb_ms
+        if response.fault is not None:
+            entry["fault"] = response.fault.type
+            if response.fault.type == 'hang':
+                latency_ms += response.fault.hang_ms
+        if body:
+            text = body.decode('utf-8', 'replace')
+            entry["body"] = json.loads(text) if content_type.startswith('application/json') else text
+        entry["latency_ms"] = latency_ms
+        entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return entry
+    
+    def _handle_explain(self, query_params):
+        """Show the query plan for ?q=, or for the queries of endpoint ?path=."""
+        path = query_params.get('path', [None])[0]
+        if path is None:
+            expressions = [str(query_params.get('q', [''])[0])]
+        else:
+            endpoint = self.config.find_endpoint(path, 'GET')
+            if not endpoint:
+                return self._error(404, "Endpoint not found")
+            # Collect {{database_query...}} directives from the response template
+            expressions, pending = [], [endpoint.get('response')]
+            while pending:
+                value = pending.pop()
+                if isinstance(value, dict):
+                    pending.extend(value.values())
+                elif isinstance(value, list):
+                    pending.extend(value)
+                elif isinstance(value, str):
+                    match = re.match(r'\{\{database_query(?::(.+))?\}\}$', value, re.S)
+                    if match:
+                        expressions.append(match.group(1) or str(query_params.get('q', [''])[0]))
+        
+        try:
+            plans = [{"query": expression,
+                      "plan": self.config.explain_query(TemplateEngine.parse_query(expression, query_params))}
+                     for expression in expressions]
+        except TemplateError as e:
+            return self._error(400, str(e))
+        return self._json(200, {"plans": plans})
+    
+    def _handle_wishlist_get(self, session, query_params):
+        """Get wishlist items, optionally one page at a time."""
+        try:
+            offset = int(query_params.get('offset', ['0'])[0])
+            limit = query_params.get('limit', [None])[0]
+            limit = int(limit) if limit is not None else None
+            if offset < 0 or (limit is not None and limit < 0):
+                raise ValueError
+        except ValueError:
+            return self._json(400, {"error": "offset and limit must be non-negative integers"})
+        
+        items, total = self.wishlist_manager.get_page(session, offset, limit)
         response = {
             "wishlist": items,
-            "total_items": self.wishlist_manager.count(),
+            "total_items": total,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
-        self._send_json_response(200, response)
+        if limit is not None or offset:
+            response["offset"] = offset
+            response["limit"] = limit
+        return self._json(200, response)
     
-    def _handle_wishlist_add(self, title):
+    def _handle_wishlist_add(self, title, session=''):
         """Add item to wishlist."""
         if not title:
-            self._send_json_response(400, {"error": "Title is required"})
-            return
+            return self._json(400, {"error": "Title is required"})
         
-        success, message = self.wishlist_manager.add(title)
+        success, message, count = self.wishlist_manager.add(title, session)
         response = {
             "message": message,
             "game_title": title,
             "added_at": datetime.now(timezone.utc).isoformat(),
-            "wishlist_count": self.wishlist_manager.count(),
+            "wishlist_count": count,
             "success": success
         }
         status = 200 if success else 409  # 409 Conflict if already exists
-        self._send_json_response(status, response)
+        return self._json(status, response)
     
-    def _handle_wishlist_remove(self, title):
+    def _handle_wishlist_remove(self, title, session=''):
         """Remove item from wishlist."""
         if not title:
-            self._send_json_response(400, {"error": "Title is required"})
-            return
+            return self._json(400, {"error": "Title is required"})
         
-        success, message = self.wishlist_manager.remove(title)
+        success, message, count = self.wishlist_manager.remove(title, session)
         response = {
             "message": message,
             "game_title": title,
             "removed_at": datetime.now(timezone.utc).isoformat(),
-            "wishlist_count": self.wishlist_manager.count(),
+            "wishlist_count": count,
             "success": success
         }
         status = 200 if success else 404  # 404 Not Found if doesn't exist
-        self._send_json_response(status, response)
+        return self._json(status, response)
     
     def _handle_game_create(self, body_data):
         """Create a new game in the database."""
-        if not body_data or 'title' not in body_data:
-            self._send_json_response(400, {"error": "Game data with title is required"})
-            return
+        primary_key = self.config.primary_key
+        if not isinstance(body_data, dict) or primary_key not in body_data:
+            return self._json(400, {"error": f"Game data with {primary_key} is required"})
         
         # Add timestamp if not provided
         if 'created_at' not in body_data:
@@ -523,22 +3229,20 @@ class MockRequestHandler(BaseHTTPRequestHandler):
                 "created_at": body_data['created_at'],
                 "status": "success"
             }
-            self._send_json_response(201, response)
-        else:
-            self._send_json_response(409, {"error": result, "status": "failed"})
+            return self._json(201, response)
+        return self._json(409, {"error": result, "status": "failed"})
     
     def _handle_game_delete(self, query_params):
-        """Delete a game from the database."""
-        title = query_params.get('title', [''])[0]
-        game_id = query_params.get('id', [''])[0]
-        
-        if not title and not game_id:
-            self._send_json_response(400, {"error": "Game title or id is required"})
-            return
-        
-        # Try to delete by title first, then by id
-        identifier_field = 'title' if title else 'id'
-        identifier_value = title if title else game_id
+        """Delete a game by primary key, or else by title or id."""
+        primary_key = self.config.primary_key
+        for identifier_field in dict.fromkeys((primary_key, 'title', 'id')):
+            identifier_value = query_params.get(identifier_field, [''])[0]
+            if identifier_value:
+                break
+        else:
+            return self._json(400, {"error": f"Game {primary_key} is required"})
+        if identifier_field == primary_key:
+            identifier_value = self.config.parse_key(identifier_value)
         
         success, deleted_game = self.config.delete_game(identifier_field, identifier_value)
         
@@ -549,30 +3253,31 @@ class MockRequestHandler(BaseHTTPRequestHandler):
                 "deleted_at": datetime.now(timezone.utc).isoformat(),
                 "status": "success"
             }
-            self._send_json_response(200, response)
-        else:
-            self._send_json_response(404, {
-                "error": f"Game not found with {identifier_field}: {identifier_value}",
-                "status": "failed"
-            })
+            return self._json(200, response)
+        return self._json(404, {
+            "error": f"Game not found with {identifier_field}: {identifier_value}",
+            "status": "failed"
+        })
     
-
-    def _send_json_response(self, status, data):
-        """Send JSON response with CORS headers."""
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
-        
-        if self.config.get('cors', True):
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+    def _handle_game_update(self, url_params, body_data, replace):
+        """Replace (PUT) or partially update (PATCH) a game by primary key."""
+        primary_key = self.config.primary_key
+        key = url_params.get(primary_key, [''])[0]
+        if not key or not isinstance(body_data, dict) or not body_data:
+            return self._json(400, {
+                "error": f"Game {primary_key} query parameter and JSON body are required"
+            })
         
-        self.end_headers()
-        self.wfile.write(json.dumps(data, indent=2).encode())
-    
-    def _send_error_response(self, status, message):
-        """Send error response."""
-        self._send_json_response(status, {"error": message})
+        success, result, status = self.config.update_game(self.config.parse_key(key), body_data, replace)
+        if success:
+            response = {
+                "message": "Game updated successfully",
+                "game": result,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+                "status": "success"
+            }
+            return self._json(200, response)
+        return self._json(status, {"error": result, "status": "failed"})
     
     def _serve_static_file(self, path):
         """Serve static files from public directory."""
@@ -585,73 +3290,531 @@ class MockRequestHandler(BaseHTTPRequestHandler):
         
         # Security check - prevent directory traversal
         if '..' in file_path:
-            self.send_error(403, "Forbidden")
-            return
-        
+            response = MockResponse(403, b"Forbidden", 'text/plain')
         # Check if file exists
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            self.send_error(404, "File not found")
-            return
+        elif not os.path.exists(file_path) or not os.path.isfile(file_path):
+            response = MockResponse(404, b"File not found", 'text/plain')
+        else:
+            # Determine content type
+            content_type, _ = mimetypes.guess_type(file_path)
+            if content_type is None:
+                content_type = 'application/octet-stream'
+            try:
+                with open(file_path, 'rb') as f:
+                    content = f.read()
+                headers = [('Access-Control-Allow-Origin', '*')] if self.config.get('cors', True) else []
+                response = MockResponse(200, content, content_type, headers)
+            except Exception as e:
+                response = MockResponse(500, f"Error reading file: {str(e)}".encode(), 'text/plain')
+        response.logged = False
+        return response
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Serves a MockEngine over http.server, one thread per connection.
+    
+    Simulated latency sleeps the connection's thread; paced, slow-drip and
+    hanging responses are handed to the server's pacing scheduler instead.
+    """
+    
+    # Keep-alive and chunked responses; every response sets Content-Length
+    # or uses chunked transfer encoding
+    protocol_version = 'HTTP/1.1'
+    
+    engine = None
+    # Set instead of engine to serve several namespaces (see tenants.py)
+    router = None
+    
+    def do_GET(self):
+        """Handle GET requests."""
+        self._handle_request('GET')
+    
+    def do_POST(self):
+        """Handle POST requests."""
+        self._handle_request('POST')
+    
+    def do_PUT(self):
+        """Handle PUT requests."""
+        self._handle_request('PUT')
+    
+    def do_PATCH(self):
+        """Handle PATCH requests."""
+        self._handle_request('PATCH')
+    
+    def do_DELETE(self):
+        """Handle DELETE requests."""
+        self._handle_request('DELETE')
+    
+    def do_OPTIONS(self):
+        """Handle OPTIONS requests for CORS preflight."""
+        self._handle_request('OPTIONS')
+    
+    def _handle_request(self, method):
+        """Main request handler."""
+        target = self.path
+        if self.router is not None:
+            target = self._select_namespace()
+            if target is None:
+                return
+        request = MockRequest(method, target, self.headers.items(), stage_timer=self.engine.stage_timer)
+        engine = self.engine.for_request(request)
+        
+        result = self._read_body(request)
+        if result is None:
+            result = engine.route(request)
+        if isinstance(result, MockResponse):
+            response = result
+        else:
+            response = engine.serve(request, result, engine.admit(result))
+        engine.apply_cors(request, response)
+        try:
+            self._send(request, response)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away (e.g. ended a log tail)
+            self.close_connection = True
+        finally:
+            engine.complete(request, response)
+    
+    def _select_namespace(self):
+        """Point self.engine at the request's namespace; return the target it sees.
+        
+        Returns None once the request has been answered here instead:
+        GET /__tenants, or no namespace matching.
+        """
+        if urlparse(self.path).path == '/__tenants':
+            response = MockResponse(200, json.dumps(self.router.status(), indent=2).encode())
+        else:
+            namespace, target = self.router.resolve(self.path, self.headers.get('Host'),
+                                                    self.server.server_address[1])
+            if namespace is not None:
+                self.engine = namespace.engine
+                return target
+            response = MockResponse(404, json.dumps({"error": "No namespace for this request"}).encode())
+        # Any request body is left unread
+        self.close_connection = True
+        self._write_response(MockRequest('GET', self.path), response)
+        return None
+    
+    def _read_body(self, request):
+        """Read or drain the request body; return an error response, or None.
         
-        # Determine content type
-        content_type, _ = mimetypes.guess_type(file_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
+        Bodies are read even when ignored, so the connection stays usable
+        for the next request, unless they are too large or malformed.
+        """
+        encoding = self.headers.get('Transfer-Encoding', '').lower()
+        chunked = encoding.split(',')[-1].strip() == 'chunked'
+        content_length = self.headers.get('Content-Length')
+        if encoding and not chunked:
+            # Can't find the end of the body; don't reuse the connection
+            self.close_connection = True
+            return None
+        if not chunked and not content_length:
+            return None
         
-        # Send file
+        keep, max_bytes = self.engine.body_plan(request)
         try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            
-            self.send_response(200)
-            self.send_header('Content-Type', content_type)
-            self.send_header('Content-Length', len(content))
-            
-            if self.config.get('cors', True):
-                self.send_header('Access-Control-Allow-Origin', '*')
-            
+            # Ignored bodies are drained in pieces, so they need no limit
+            request.body = read_body(self.rfile, content_length, chunked, max_bytes if keep else None, keep)
+            return None
+        except BodyTooLarge:
+            response = self.engine.body_too_large(max_bytes)
+        except ValueError as e:
+            response = self.engine.malformed_body(e)
+        # The rest of the body is unread
+        self.close_connection = True
+        if response is not None:
+            response.headers.append(('Connection', 'close'))
+        return response
+    
+    def _send(self, request, response):
+        """Send a response, simulating its latency, pacing and fault."""
+        fault = response.fault
+        # Paced responses delay their first byte instead, so no thread sleeps
+        paced = (bool(response.bandwidth_kbps or response.ttfb_ms) and response.feed is None
+                 and hasattr(self.server, 'pacer'))
+        if response.delay_ms > 0 and not paced:
+            time.sleep(response.delay_ms / 1000.0)
+        if request.timer is not None:
+            request.lap('latency')
+        
+        if fault is not None and fault.type in ('reset', 'hang'):
+            self._drop_connection(fault, response.delay_ms if paced else 0)
+            return
+        if response.feed is not None:
+            self._subscribe(response)
+            return
+        if not paced and fault is None:
+            self._write_response(request, response)
+            return
+        
+        # Capture the bytes and hand them to the pacing scheduler; the
+        # connection is closed afterwards
+        from pacing import PacingScheduler
+        payload = self._capture(lambda: self._write_response(request, response))
+        ttfb_ms = response.delay_ms + response.ttfb_ms if paced else 0
+        bandwidth_kbps = response.bandwidth_kbps if paced else None
+        min_slice = PacingScheduler.MIN_SLICE
+        if fault is not None and fault.type == 'truncate':
+            # Headers promise the whole body; the connection closes partway
+            head = payload.find(b'\r\n\r\n') + 4
+            payload = payload[:head + int((len(payload) - head) * fault.fraction)]
+        elif fault is not None:
+            # A drip sends a few bytes per tick rather than the usual minimum slice
+            bandwidth_kbps = fault.bytes_per_second * 8 / 1000
+            min_slice = fault.bytes_per_second * PacingScheduler.TICK
+        if hasattr(self.server, 'pacer'):
+            self.server.detach(self.connection)
+            self.server.pacer().submit(self.connection, payload, ttfb_ms, bandwidth_kbps, min_slice)
+        else:
+            self.wfile.write(payload)
+    
+    def _subscribe(self, response):
+        """Send the SSE headers or WebSocket handshake, then hand the socket to the feed hub."""
+        self.send_response(response.status)
+        for name, value in response.headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+        kind = 'websocket' if response.status == 101 else 'sse'
+        self.server.detach(self.connection)
+        self.server.feed_hub().subscribe(response.feed, self.connection, kind)
+    
+    def _write_response(self, request, response):
+        """Write status line, headers and body (chunked when its length is unknown)."""
+        self.send_response(response.status)
+        for name, value in response.headers:
+            self.send_header(name, value)
+        if response.chunks is None:
+            self.send_header('Content-Length', str(len(response.body)))
             self.end_headers()
-            self.wfile.write(content)
-        except Exception as e:
-            self.send_error(500, f"Error reading file: {str(e)}")
+            self.wfile.write(response.body)
+            if request.timer is not None:
+                request.lap('write')
+            return
+        
+        # HTTP/1.0 clients get the same bytes delimited by connection close
+        chunked = self.request_version != 'HTTP/1.0'
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        for text in response.chunks:
+            payload = text.encode()
+            if request.timer is not None:
+                request.lap('serialize')
+            if chunked:
+                self.wfile.write(b'%X\r\n%s\r\n' % (len(payload), payload))
+            else:
+                self.wfile.write(payload)
+            self.wfile.flush()
+            if request.timer is not None:
+                request.lap('write')
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+    
+    def _capture(self, send):
+        """Run send() and return the bytes it would have written."""
+        self.close_connection = True
+        self._paced = True
+        real_wfile, self.wfile = self.wfile, io.BytesIO()
+        try:
+            send()
+            return self.wfile.getvalue()
+        finally:
+            self.wfile = real_wfile
+            self._paced = False
+    
+    def _drop_connection(self, fault, delay_ms=0):
+        """Reset the connection, or hold it open without answering (hang)."""
+        self.close_connection = True
+        if fault.type == 'reset':
+            # Zero linger makes close() send RST instead of FIN
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            if hasattr(self.server, 'detach'):
+                self.server.detach(self.connection)
+            self.connection.close()
+        elif hasattr(self.server, 'pacer'):
+            # The pacer closes it after hang_ms without tying up a thread
+            self.server.detach(self.connection)
+            self.server.pacer().submit(self.connection, b'', delay_ms + fault.hang_ms)
+        else:
+            time.sleep((delay_ms + fault.hang_ms) / 1000.0)
+    
+    def end_headers(self):
+        # Captured responses always end the connection
+        if getattr(self, '_paced', False):
+            self.send_header('Connection', 'close')
+        super().end_headers()
     
     def log_message(self, format, *args):
         """Override to customize logging."""
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {format % args}")
 
 
+class MockHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server whose handlers can hand connections to a pacer or feed hub."""
+    
+    # Paced downloads keep many connections open at once
+    request_queue_size = 1024
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+        self._pacer = None
+        self._pacer_pid = None
+        self._feed_hub = None
+        self._feed_hub_pid = None
+    
+    def pacer(self):
+        """Get this process's pacing scheduler, creating it on first use."""
+        with self._detached_lock:
+            if self._pacer is None or self._pacer_pid != os.getpid():
+                from pacing import PacingScheduler
+                self._pacer, self._pacer_pid = PacingScheduler(), os.getpid()
+            return self._pacer
+    
+    def feed_hub(self):
+        """Get this process's feed hub, creating it on first use."""
+        with self._detached_lock:
+            if self._feed_hub is None or self._feed_hub_pid != os.getpid():
+                from feeds import FeedHub
+                self._feed_hub, self._feed_hub_pid = FeedHub(), os.getpid()
+            return self._feed_hub
+    
+    def detach(self, request):
+        """Keep request open after its handler returns."""
+        with self._detached_lock:
+            self._detached.add(request)
+    
+    def shutdown_request(self, request):
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+
+def serve_all(servers):
+    """Serve the first server in this thread and the others in their own."""
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    servers[0].serve_forever()
+
+
+def run_workers(servers, workers, configs):
+    """Fork worker processes that share the listening sockets.
+    
+    The parent process only supervises: it restarts workers that exit and
+    turns SIGHUP into a reload that every worker picks up.
+    """
+    import multiprocessing
+    import multiprocessing.connection
+    ctx = multiprocessing.get_context('fork')
+    
+    def serve():
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        try:
+            serve_all(servers)
+        except KeyboardInterrupt:
+            pass
+    
+    def reload(signum, frame):
+        for config in configs:
+            config.load()
+    
+    # Keep the loaded config out of GC bookkeeping so pages stay shared after fork
+    gc.freeze()
+    processes = []
+    for _ in range(workers):
+        process = ctx.Process(target=serve, daemon=True)
+        process.start()
+        processes.append(process)
+    
+    signal.signal(signal.SIGHUP, reload)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    
+    try:
+        while True:
+            multiprocessing.connection.wait([p.sentinel for p in processes])
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"[WORKER] pid {process.pid} exited ({process.exitcode}), restarting")
+                    processes[i] = ctx.Process(target=serve, daemon=True)
+                    processes[i].start()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+def build_engine(config_path, state_backend, new_logger, channel_prefix='', database_cache=None):
+    """Load a config and wire its state to the backend's journals."""
+    config = MockServerConfig(config_path, database_cache)
+    wishlist_manager = WishlistManager()
+    if state_backend.journal(channel_prefix + 'games') is not None:
+        config.attach_journal(state_backend.journal(channel_prefix + 'games'))
+        config.faults.attach_journal(state_backend.journal(channel_prefix + 'faults'))
+        wishlist_manager.attach_journal(state_backend.journal(channel_prefix + 'wishlist'))
+    logger = new_logger(buffer_size=config.get('log_buffer', 10000))
+    return MockEngine(config, logger, wishlist_manager)
+
+
+def print_startup_profile(steps, configs, database_cache):
+    """Print where startup time went (--startup-profile)."""
+    loads = {}
+    for config in configs:
+        for step, seconds in config.load_timings.items():
+            loads[step] = loads.get(step, 0.0) + seconds
+    rows = steps[:2] + [(f"load: {step}", seconds) for step, seconds in loads.items()] + steps[2:]
+    total = sum(seconds for _, seconds in steps)
+    print("[STARTUP] Startup profile:")
+    for step, seconds in rows:
+        print(f"[STARTUP]   {step:<22} {seconds * 1000:8.1f} ms")
+    print(f"[STARTUP]   {'total':<22} {total * 1000:8.1f} ms")
+    if database_cache is not None and database_cache.directory:
+        stats = database_cache.stats()
+        print(f"[STARTUP]   database cache: {stats['disk_hits']} hit(s), {stats['disk_misses']} miss(es)")
+
+
 def main():
     """Main entry point."""
+    started = time.perf_counter()
+    steps = [('imports', started - _IMPORTS_STARTED)]
+    
+    def step(name):
+        nonlocal started
+        now = time.perf_counter()
+        steps.append((name, now - started))
+        started = now
+    
+    import argparse
     parser = argparse.ArgumentParser(description='Local API Mock Server')
     parser.add_argument('--config', default='config.json', help='Configuration file path')
+    parser.add_argument('--tenants',
+                        help='Serve every namespace in this tenants file instead of --config '
+                             '(see tenants.py)')
     parser.add_argument('--port', type=int, help='Server port (overrides config)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes sharing the port (default: 1)')
+    parser.add_argument('--state-backend', choices=sorted(BACKENDS),
+                        help='Where wishlist and games CRUD state is shared '
+                             '(default: memory, or shared with --workers)')
+    parser.add_argument('--state-path', help='SQLite file for --state-backend sqlite')
+    parser.add_argument('--stage-timings', action='store_true',
+                        help='Record per-stage request timings (see GET /__profile/timings)')
+    parser.add_argument('--config-cache', metavar='DIR',
+                        help='Cache parsed databases and their indexes in DIR (see config_cache.py)')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='Print how long each startup step took')
+    parser.add_argument('--controller', metavar='URL',
+                        help='Register with this cluster controller (see cluster.py)')
+    parser.add_argument('--advertise', metavar='URL',
+                        help='URL the controller reaches this server at (default: http://localhost:PORT)')
+    parser.add_argument('--accept-config-push', action='store_true',
+                        help='Accept PUT /__config without --controller (it overwrites --config)')
     args = parser.parse_args()
     
-    # Initialize configuration, logger, and wishlist manager
-    config = MockServerConfig(args.config)
-    logger = RequestLogger()
-    wishlist_manager = WishlistManager()
+    backend_name = args.state_backend or ('shared' if args.workers > 1 else 'memory')
+    if args.workers > 1 and backend_name == 'memory':
+        parser.error("--workers needs a shared state backend (shared or sqlite)")
+    tenant_port, tenant_specs = None, []
+    if args.tenants:
+        from tenants import load_tenants
+        try:
+            tenant_port, tenant_specs = load_tenants(args.tenants)
+        except (OSError, ValueError) as e:
+            parser.error(f"--tenants: {e}")
+    # Each namespace journals its state on channels of its own
+    prefixes = [spec['name'] + '/' for spec in tenant_specs] or ['']
+    state_backend = create_backend(backend_name, args.state_path,
+                                   [prefix + channel for prefix in prefixes for channel in CHANNELS])
+    step('arguments and state')
     
-    # Set class variables
-    MockRequestHandler.config = config
-    MockRequestHandler.logger = logger
-    MockRequestHandler.wishlist_manager = wishlist_manager
+    loggers = []
+    if args.workers > 1:
+        # Request logs live in shared memory so every worker sees them
+        def new_logger(**kwargs):
+            loggers.append(SharedRequestLogger(**kwargs))
+            return loggers[-1]
+    else:
+        new_logger = RequestLogger
+    stage_timer = None
+    if args.stage_timings:
+        from profiling import StageTimer
+        stage_timer = StageTimer()
+    accept_config_push = bool(args.controller or args.accept_config_push)
     
-    # Determine port
-    port = args.port or config.get('port', 8000)
+    # Configs share databases in one cache whenever there is something to share
+    database_cache = DatabaseCache(args.config_cache) if tenant_specs or args.config_cache else None
+    if tenant_specs:
+        from tenants import Namespace, TenantRouter
+        namespaces = []
+        for spec, prefix in zip(tenant_specs, prefixes):
+            engine = build_engine(spec['config'], state_backend, new_logger, prefix, database_cache)
+            engine.stage_timer = stage_timer
+            engine.accept_config_push = accept_config_push
+            namespaces.append(Namespace(spec['name'], engine, spec.get('prefix'),
+                                        spec.get('host'), spec.get('port')))
+        router = TenantRouter(namespaces, database_cache)
+        MockRequestHandler.router = router
+        configs = [namespace.engine.config for namespace in namespaces]
+        port = args.port or tenant_port or 8000
+        extra_ports = [p for p in router.ports() if p != port]
+    else:
+        engine = build_engine(args.config, state_backend, new_logger, database_cache=database_cache)
+        engine.stage_timer = stage_timer
+        engine.accept_config_push = accept_config_push
+        MockRequestHandler.engine = engine
+        configs = [engine.config]
+        port = args.port or engine.config.get('port', 8000)
+        extra_ports = []
+    
+    step('configs')
     
     # Start server
-    server = HTTPServer(('', port), MockRequestHandler)
+    servers = [MockHTTPServer(('', p), MockRequestHandler) for p in [port] + extra_ports]
+    step('listen')
+    if args.startup_profile:
+        print_startup_profile(steps, configs, database_cache)
     print(f"Mock Server running on http://localhost:{port}")
-    print(f"Config: {args.config}")
+    for p in extra_ports:
+        print(f"Also listening on http://localhost:{p}")
+    if tenant_specs:
+        print(f"Tenants: {', '.join(spec['name'] for spec in tenant_specs)} "
+              f"(GET http://localhost:{port}/__tenants)")
+    else:
+        print(f"Config: {args.config}")
+    print(f"State: {state_backend.name}")
+    if args.workers > 1:
+        print(f"Workers: {args.workers}")
     print(f"Reload: POST http://localhost:{port}/__reload")
     print(f"Logs: GET http://localhost:{port}/__logs")
+    if args.controller:
+        # Only cluster nodes need urllib; registration retries until the controller is up
+        from cluster import register_with
+        threading.Thread(target=register_with, daemon=True, args=(
+            args.controller, args.advertise or f"http://localhost:{port}")).start()
     
     try:
-        server.serve_forever()
+        if args.workers > 1:
+            run_workers(servers, args.workers, configs)
+        else:
+            serve_all(servers)
     except KeyboardInterrupt:
         print("\n Shutting down...")
-        server.shutdown()
+        for server in servers:
+            if args.workers > 1:
+                server.server_close()
+            else:
+                server.shutdown()
+    finally:
+        state_backend.close()
+        for logger in loggers:
+            logger.close()
 
 
 if __name__ == '__main__':
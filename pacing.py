@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Paced Responses
+Sends responses at a limited bandwidth and after a time-to-first-byte delay,
+for simulating slow links.
+
+A single scheduler thread per process drives every paced transfer: a heap
+of timers decides when each transfer may send its next slice, and a
+selector waits for sockets whose send buffer is full. Request handler
+threads hand over the socket and return immediately, so thousands of slow
+downloads cost one thread, not one each.
+"""
+
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+
+
+class PacedTransfer:
+    """One response being written to a socket at a limited rate."""
+
+    def __init__(self, sock, payload, bytes_per_second=None, min_slice=1024):
+        self.sock = sock
+        self.payload = memoryview(payload)
+        self.offset = 0
+        self.bytes_per_second = bytes_per_second
+        self.min_slice = min_slice
+        self.started = None
+
+    def done(self):
+        return self.offset >= len(self.payload)
+
+
+class PacingScheduler:
+    """Event loop that writes paced transfers from one thread.
+
+    Each wakeup sends a slice worth TICK seconds of bandwidth (at least the
+    transfer's min_slice bytes) and schedules the next slice for when the
+    link would have carried it. Create the scheduler in the process that
+    uses it (not before forking), since the selector and wakeup sockets
+    cannot be shared.
+    """
+
+    TICK = 0.05
+    MIN_SLICE = 1024
+
+    def __init__(self):
+        self.timers = []
+        self.counter = itertools.count()
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.active = 0
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ)
+
+    def submit(self, sock, payload, ttfb_ms=0, bandwidth_kbps=None, min_slice=MIN_SLICE):
+        """Take ownership of sock and send payload; the socket is closed when done.
+
+        Lower min_slice to trickle a few bytes at a time at very low rates.
+        """
+        sock.setblocking(False)
+        rate = bandwidth_kbps * 1000 / 8 if bandwidth_kbps else None
+        transfer = PacedTransfer(sock, payload, rate, max(int(min_slice), 1))
+        due = time.monotonic() + max(ttfb_ms, 0) / 1000
+        with self.lock:
+            self.active += 1
+            heapq.heappush(self.timers, (due, next(self.counter), transfer))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='pacing', daemon=True)
+                self.thread.start()
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run(self):
+        while True:
+            with self.lock:
+                timeout = max(self.timers[0][0] - time.monotonic(), 0) if self.timers else None
+            for key, _ in self.selector.select(timeout):
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    # Send buffer has room again; resume at once
+                    self.selector.unregister(key.fileobj)
+                    self._schedule(key.data, time.monotonic())
+
+            now = time.monotonic()
+            due = []
+            with self.lock:
+                while self.timers and self.timers[0][0] <= now:
+                    due.append(heapq.heappop(self.timers)[2])
+            for transfer in due:
+                self._send_slice(transfer, now)
+
+    def _schedule(self, transfer, when):
+        with self.lock:
+            heapq.heappush(self.timers, (when, next(self.counter), transfer))
+
+    def _send_slice(self, transfer, now):
+        if transfer.started is None:
+            transfer.started = now
+        end = len(transfer.payload)
+        if transfer.bytes_per_second:
+            # Never get ahead of what the link would have carried by now
+            allowed = int((now - transfer.started + self.TICK) * transfer.bytes_per_second)
+            end = min(end, max(allowed, transfer.offset + transfer.min_slice))
+        try:
+            while transfer.offset < end:
+                transfer.offset += transfer.sock.send(transfer.payload[transfer.offset:end])
+        except BlockingIOError:
+            self.selector.register(transfer.sock, selectors.EVENT_WRITE, transfer)
+            return
+        except OSError:
+            # Client went away
+            self._finish(transfer)
+            return
+
+        if transfer.done():
+            self._finish(transfer)
+        elif transfer.bytes_per_second:
+            self._schedule(transfer, transfer.started + transfer.offset / transfer.bytes_per_second)
+        else:
+            self._schedule(transfer, now)
+
+    def _finish(self, transfer):
+        try:
+            transfer.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        transfer.sock.close()
+        with self.lock:
+            self.active -= 1
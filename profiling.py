@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Profiling
+A sampling profiler and per-stage request timings for finding out where a
+slow mock server spends its time.
+
+The profiler samples every thread's Python stack at a fixed interval and
+counts identical stacks, producing collapsed-stack output that
+flamegraph.pl or speedscope read directly. Samples are wall-clock: a
+thread sleeping for simulated latency shows up in the frame that sleeps.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# Leaf frames of threads that are only waiting for work
+IDLE_FRAMES = frozenset([
+    'selectors.py:select', 'threading.py:wait', 'socket.py:readinto',
+    'socket.py:accept', 'connection.py:wait'
+])
+
+
+class SamplingProfiler:
+    """Samples all thread stacks from a background thread."""
+
+    def __init__(self, interval_ms=5, include_idle=False, max_depth=128):
+        self.interval = max(interval_ms, 0.5) / 1000
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.counts = Counter()
+        self.samples = 0
+        self.started = None
+        self.stopped = None
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.time()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return label
+
+    def sample(self):
+        """Record the current stack of every thread but the profiler's."""
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if not stack or (not self.include_idle and stack[0] in IDLE_FRAMES):
+                continue
+            stack.reverse()
+            self.counts[';'.join(stack)] += 1
+        self.samples += 1
+
+    def collapsed(self):
+        """Collapsed stacks, one "frame;frame;leaf count" line each."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def summary(self, top=50):
+        """Sample counts plus the most frequent stacks and leaf functions."""
+        leaves = Counter()
+        for stack, count in self.counts.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        end = self.stopped or time.time()
+        return {
+            "samples": self.samples,
+            "duration_s": round(end - self.started, 3) if self.started else 0,
+            "interval_ms": self.interval * 1000,
+            "top_functions": [{"function": f, "samples": c} for f, c in leaves.most_common(top)],
+            "top_stacks": [{"stack": s, "samples": c} for s, c in self.counts.most_common(top)]
+        }
+
+
+class StageTimer:
+    """Histograms of how long each request stage takes.
+
+    Buckets are log-spaced from 10us to 10s; percentiles are reported as the
+    upper bound of the bucket they fall in.
+    """
+
+    STAGES = ('parse', 'route', 'queue', 'latency', 'render', 'serialize', 'write')
+    BOUNDS_MS = [b * 10 ** e for e in range(-2, 4) for b in (1, 2, 5)] + [10000]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.totals = {}
+        self.maxima = {}
+
+    def record(self, stage, seconds):
+        ms = seconds * 1000
+        bucket = bisect.bisect_left(self.BOUNDS_MS, ms)
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = [0] * (len(self.BOUNDS_MS) + 1)
+                self.totals[stage] = 0.0
+                self.maxima[stage] = 0.0
+            histogram[bucket] += 1
+            self.totals[stage] += ms
+            if ms > self.maxima[stage]:
+                self.maxima[stage] = ms
+
+    def _percentile(self, histogram, count, pct):
+        rank, seen = pct / 100 * count, 0
+        for bucket, n in enumerate(histogram):
+            seen += n
+            if seen >= rank:
+                return self.BOUNDS_MS[bucket] if bucket < len(self.BOUNDS_MS) else None
+        return None
+
+    def snapshot(self):
+        """Per stage: count, mean, bucketed p50/p90/p99 and max, in ms."""
+        with self.lock:
+            stages = {}
+            order = sorted(self.histograms, key=lambda s: (self.STAGES + (s,)).index(s))
+            for stage in order:
+                histogram = self.histograms[stage]
+                count = sum(histogram)
+                stages[stage] = {
+                    "count": count,
+                    "mean_ms": round(self.totals[stage] / count, 3),
+                    "p50_ms": self._percentile(histogram, count, 50),
+                    "p90_ms": self._percentile(histogram, count, 90),
+                    "p99_ms": self._percentile(histogram, count, 99),
+                    "max_ms": round(self.maxima[stage], 3),
+                    "buckets": {(f"le_{bound:g}ms" if bound is not None else "over"): n
+                                for bound, n in zip(self.BOUNDS_MS + [None], histogram) if n}
+                }
+            return stages
@@ -2,14 +2,25 @@
 """
 Traffic Recorder and Replay (Stretch Goal)
 Capture real HTTP traffic and serve it later.
+
+Record mode proxies requests to --target and saves each exchange, with the
+upstream's response time as "latency_ms", so recordings can also be fitted
+into latency distributions (see latency.py).
 """
 
 import json
 import argparse
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import HTTPServer, BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse
 from datetime import datetime, timezone
 import threading
+import time
+import urllib.error
+import urllib.request
+
+# Headers that describe one connection, not the response
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'host',
+               'proxy-connection', 'te', 'trailer', 'upgrade'}
 
 
 class TrafficRecorder:
@@ -20,8 +31,8 @@ class TrafficRecorder:
         self.recordings = []
         self.lock = threading.Lock()
     
-    def record(self, method, path, status, response_body, headers):
-        """Record a request/response pair."""
+    def record(self, method, path, status, response_body, headers, latency_ms=None):
+        """Record a request/response pair, and how long the response took."""
         with self.lock:
             entry = {
                 "timestamp": datetime.now(timezone.utc).isoformat(),
@@ -31,6 +42,8 @@ class TrafficRecorder:
                 "response": response_body,
                 "headers": dict(headers)
             }
+            if latency_ms is not None:
+                entry["latency_ms"] = round(latency_ms, 1)
             self.recordings.append(entry)
     
     def save(self):
@@ -94,30 +107,85 @@ class ReplayHandler(BaseHTTPRequestHandler):
             self.wfile.write(str(response).encode())
 
 
+class RecordHandler(BaseHTTPRequestHandler):
+    """Forwards requests to the target and records each exchange."""
+    
+    target = None
+    recorder = None
+    
+    def do_GET(self):
+        self._proxy('GET')
+    
+    def do_POST(self):
+        self._proxy('POST')
+    
+    def do_PUT(self):
+        self._proxy('PUT')
+    
+    def do_PATCH(self):
+        self._proxy('PATCH')
+    
+    def do_DELETE(self):
+        self._proxy('DELETE')
+    
+    def _proxy(self, method):
+        """Forward the request, time the upstream's response, record and return it."""
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in HOP_HEADERS}
+        request = urllib.request.Request(self.target.rstrip('/') + self.path, data=body,
+                                         headers=headers, method=method)
+        # From sending the request to having the whole body, like a client sees it
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as upstream:
+                status, upstream_headers, data = upstream.status, upstream.getheaders(), upstream.read()
+        except urllib.error.HTTPError as e:
+            status, upstream_headers, data = e.code, list(e.headers.items()), e.read()
+        except (urllib.error.URLError, OSError) as e:
+            self.send_error(502, f"Upstream unreachable: {e}")
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        try:
+            response = json.loads(data)
+        except ValueError:
+            response = data.decode('utf-8', 'replace')
+        upstream_headers = [(name, value) for name, value in upstream_headers
+                            if name.lower() not in HOP_HEADERS]
+        self.recorder.record(method, urlparse(self.path).path, status, response, upstream_headers, latency_ms)
+        
+        self.send_response(status)
+        for name, value in upstream_headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def record_server(target_url, recorder, port):
+    """A server proxying to target_url and recording into recorder."""
+    handler = type('BoundRecordHandler', (RecordHandler,), {'target': target_url, 'recorder': recorder})
+    return ThreadingHTTPServer(('', port), handler)
+
+
 def record_mode(target_url, output_file, port):
     """Run in record mode - proxy requests and save responses."""
-    print(f"Recording mode: Proxying to {target_url}")
-    print(f"Saving to: {output_file}")
-    print(f"Note: Full proxy implementation requires 'requests' library")
-    print(f"For now, manually create recordings in JSON format")
-    
-    # This would require implementing a full HTTP proxy
-    # For simplicity, we'll just show the structure
-    example = [
-        {
-            "timestamp": "2025-11-20T10:00:00Z",
-            "method": "GET",
-            "path": "/api/users",
-            "status": 200,
-            "response": {"users": []},
-            "headers": {"Content-Type": "application/json"}
-        }
-    ]
-    
-    with open(output_file, 'w') as f:
-        json.dump(example, f, indent=2)
-    
-    print(f"Created example recording file")
+    recorder = TrafficRecorder(output_file)
+    server = record_server(target_url, recorder, port)
+    print(f"Recording mode: Proxying http://localhost:{port} to {target_url}")
+    print(f"Saving to {output_file} on Ctrl+C")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n Shutting down...")
+    finally:
+        server.server_close()
+        recorder.save()
 
 
 def replay_mode(input_file, port):
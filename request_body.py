@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Request Bodies
+Bounded reading of HTTP/1.1 request bodies, with Content-Length or
+Transfer-Encoding: chunked.
+
+Bodies are read in pieces of at most PIECE_SIZE bytes. A body that will be
+used is collected up to a size limit; one that nothing reads is drained
+and thrown away piece by piece, so large uploads never sit in memory.
+"""
+
+PIECE_SIZE = 64 * 1024
+# Longest chunk-size or trailer line accepted
+MAX_LINE = 8192
+
+
+class BodyTooLarge(Exception):
+    """The request body is larger than the limit."""
+
+
+def iter_chunked(rfile, piece_size=PIECE_SIZE):
+    """Yield the decoded data of a chunked body, in pieces of at most piece_size."""
+    while True:
+        line = rfile.readline(MAX_LINE + 1)
+        if not line.endswith(b'\n'):
+            raise ValueError("Malformed chunk size line")
+        try:
+            # Chunk extensions after ';' are ignored
+            size = int(line.split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            raise ValueError("Malformed chunk size line")
+        if size < 0:
+            raise ValueError("Malformed chunk size line")
+        if size == 0:
+            # Skip trailers up to the blank line ending the body
+            while True:
+                line = rfile.readline(MAX_LINE + 1)
+                if line in (b'\r\n', b'\n', b''):
+                    return
+                if not line.endswith(b'\n'):
+                    raise ValueError("Malformed chunk trailer")
+        while size:
+            data = rfile.read(min(size, piece_size))
+            if not data:
+                raise ValueError("Connection closed mid-chunk")
+            size -= len(data)
+            yield data
+        if rfile.readline(MAX_LINE + 1) not in (b'\r\n', b'\n'):
+            raise ValueError("Missing CRLF after chunk")
+
+
+def iter_sized(rfile, length, piece_size=PIECE_SIZE):
+    """Yield exactly length bytes of body, in pieces of at most piece_size."""
+    while length:
+        data = rfile.read(min(length, piece_size))
+        if not data:
+            raise ValueError("Connection closed mid-body")
+        length -= len(data)
+        yield data
+
+
+def read_body(rfile, content_length=None, chunked=False, limit=None, keep=True):
+    """Read a request body, returning it (or b'' when keep is False).
+
+    Raises BodyTooLarge as soon as the body is known to be over limit
+    bytes: before reading anything when Content-Length says so, otherwise
+    once that much has arrived. The rest of the body is then left unread,
+    so the caller must close the connection. Raises ValueError for a
+    malformed body.
+    """
+    if chunked:
+        pieces = iter_chunked(rfile)
+    else:
+        length = int(content_length or 0)
+        if length < 0:
+            raise ValueError("Negative Content-Length")
+        if limit is not None and length > limit:
+            raise BodyTooLarge(length)
+        pieces = iter_sized(rfile, length)
+
+    body, size = [], 0
+    for data in pieces:
+        size += len(data)
+        if limit is not None and size > limit:
+            raise BodyTooLarge(size)
+        if keep:
+            body.append(data)
+    return b''.join(body)
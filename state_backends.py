@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+State Backends
+Pluggable stores that keep wishlist and games CRUD state consistent across
+worker processes and mock server instances.
+
+Every backend exposes named journals ("channels"). A journal is an ordered
+log of mutations; each process keeps its own materialized copy of the state
+and replays entries it has not seen yet. Reads therefore never leave the
+process, and writers only pay for one append.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+# multiprocessing and sqlite3 are imported by the backends that use them,
+# so the default in-memory backend doesn't pay for them at startup
+
+
+# Journals each mock server needs
+CHANNELS = ('games', 'wishlist', 'faults')
+
+
+class StateBackendError(Exception):
+    """Raised when a backend cannot accept a mutation."""
+
+
+class StateBackend:
+    """Interface for shared state stores."""
+
+    name = None
+
+    def journal(self, channel):
+        """Return the journal for a channel, or None for process-local state."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the backend."""
+
+
+class Journal:
+    """Interface for an ordered, epoch-versioned mutation log.
+
+    Writers take `write_lock()`, catch up with `since()`, validate against
+    their local state and then `append()`. Appends are also rejected unless
+    the writer has applied every earlier entry (`expected_seq`), so
+    validation such as duplicate checks stays consistent across processes.
+    `reset()` starts a new epoch and drops the log; readers in an older epoch
+    must rebuild their state from scratch. A new journal's first epoch is
+    its creation time in milliseconds, so (epoch, seq) never names the
+    state of an earlier journal.
+
+    Journals are compacted with checkpoints: once `needs_checkpoint()`, the
+    writer replaces the log with a single entry holding the whole state
+    (`checkpoint()`), in a new epoch. Readers, including new ones, start
+    from the latest checkpoint instead of replaying every entry.
+    """
+
+    def write_lock(self):
+        """Context manager excluding other writers, across processes."""
+        raise NotImplementedError
+
+    def changes(self):
+        """Return a token that changes whenever another writer commits."""
+        raise NotImplementedError
+
+    def since(self, epoch, seq):
+        """Return (current epoch, entries after seq) for a reader."""
+        raise NotImplementedError
+
+    def append(self, epoch, expected_seq, op):
+        """Append an entry; return (ok, current epoch, current length)."""
+        raise NotImplementedError
+
+    def reset(self):
+        """Discard the log and return the new epoch."""
+        raise NotImplementedError
+
+    def needs_checkpoint(self):
+        """Whether the entries since the last checkpoint should be compacted (under write_lock).
+
+        True once they take more than checkpoint_bytes, and more than the
+        checkpoint itself, so checkpoints cost no more than the log they replace.
+        """
+        return False
+
+    def checkpoint(self, epoch, expected_seq, op):
+        """Replace the log with op, a checkpoint entry, in a new epoch.
+
+        Returns (ok, current epoch, current length) like append().
+        """
+        raise NotImplementedError
+
+
+class InProcessStateBackend(StateBackend):
+    """State lives in the process that owns it (the default)."""
+
+    name = 'memory'
+
+    def journal(self, channel):
+        return None
+
+
+class SharedMemoryJournal(Journal):
+    """Journal stored in a shared memory segment, for forked workers.
+
+    Layout: a header of five unsigned 64-bit integers (change counter, epoch,
+    entry count, bytes used, end of the checkpoint entry) followed by
+    length-prefixed JSON entries. The lock is a multiprocessing.Lock, so all
+    users must be forked from the process that created the journal.
+    """
+
+    HEADER = struct.Struct('<QQQQQ')
+    ENTRY = struct.Struct('<I')
+
+    def __init__(self, size, checkpoint_bytes=None):
+        import multiprocessing
+        from multiprocessing import shared_memory
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.owner_pid = os.getpid()
+        self.lock = multiprocessing.RLock()
+        # Compacting at a quarter leaves room for the checkpoint and new entries
+        self.checkpoint_bytes = size // 4 if checkpoint_bytes is None else checkpoint_bytes
+        epoch = int(time.time() * 1000)
+        self.HEADER.pack_into(self.shm.buf, 0, 0, epoch, 0, self.HEADER.size, self.HEADER.size)
+        # Per-process read cursor: (epoch, seq, byte offset)
+        self._cursor = (epoch, 0, self.HEADER.size)
+
+    def _header(self):
+        return self.HEADER.unpack_from(self.shm.buf, 0)
+
+    def write_lock(self):
+        return self.lock
+
+    def changes(self):
+        return struct.unpack_from('<Q', self.shm.buf, 0)[0]
+
+    def since(self, epoch, seq):
+        with self.lock:
+            _, current_epoch, count, _, _ = self._header()
+            if current_epoch != epoch:
+                seq = 0
+            cursor_epoch, cursor_seq, offset = self._cursor
+            if cursor_epoch != current_epoch or cursor_seq > seq:
+                cursor_seq, offset = 0, self.HEADER.size
+            ops = []
+            buf = self.shm.buf
+            while cursor_seq < count:
+                (length,) = self.ENTRY.unpack_from(buf, offset)
+                start = offset + self.ENTRY.size
+                if cursor_seq >= seq:
+                    ops.append(json.loads(bytes(buf[start:start + length])))
+                offset = start + length
+                cursor_seq += 1
+            self._cursor = (current_epoch, cursor_seq, offset)
+            return current_epoch, ops
+
+    def _write(self, offset, data):
+        """Write an entry at offset and return where it ends."""
+        end = offset + self.ENTRY.size + len(data)
+        if end > self.shm.size:
+            raise StateBackendError("Shared state segment is full")
+        self.ENTRY.pack_into(self.shm.buf, offset, len(data))
+        self.shm.buf[offset + self.ENTRY.size:end] = data
+        return end
+
+    def append(self, epoch, expected_seq, op):
+        data = json.dumps(op).encode('utf-8')
+        with self.lock:
+            changes, current_epoch, count, used, base = self._header()
+            if epoch != current_epoch or expected_seq != count:
+                return False, current_epoch, count
+            end = self._write(used, data)
+            self.HEADER.pack_into(self.shm.buf, 0, changes + 1, current_epoch, count + 1, end, base)
+            return True, current_epoch, count + 1
+
+    def reset(self):
+        with self.lock:
+            changes, epoch, _, _, _ = self._header()
+            self.HEADER.pack_into(self.shm.buf, 0, changes + 1, epoch + 1, 0,
+                                  self.HEADER.size, self.HEADER.size)
+            return epoch + 1
+
+    def needs_checkpoint(self):
+        _, _, _, used, base = self._header()
+        return used - base > max(self.checkpoint_bytes, base - self.HEADER.size)
+
+    def checkpoint(self, epoch, expected_seq, op):
+        data = json.dumps(op).encode('utf-8')
+        with self.lock:
+            changes, current_epoch, count, _, _ = self._header()
+            if epoch != current_epoch or expected_seq != count:
+                return False, current_epoch, count
+            # Readers hold the lock, so none sees the log half rewritten
+            end = self._write(self.HEADER.size, data)
+            self.HEADER.pack_into(self.shm.buf, 0, changes + 1, current_epoch + 1, 1, end, end)
+            return True, current_epoch + 1, 1
+
+    def close(self):
+        self.shm.close()
+        if os.getpid() == self.owner_pid:
+            self.shm.unlink()
+
+
+class SharedMemoryStateBackend(StateBackend):
+    """Journals in shared memory segments; create before forking workers."""
+
+    name = 'shared'
+
+    def __init__(self, size=64 * 1024 * 1024, channels=CHANNELS, checkpoint_bytes=None):
+        # Segments are sparse until written, so a generous size costs nothing
+        self.journals = {channel: SharedMemoryJournal(size, checkpoint_bytes) for channel in channels}
+
+    def journal(self, channel):
+        return self.journals[channel]
+
+    def close(self):
+        for journal in self.journals.values():
+            journal.close()
+
+
+class SQLiteJournal(Journal):
+    """Journal stored in a SQLite database in WAL mode.
+
+    Works across unrelated processes on one host, and survives restarts.
+    Each process opens its own connection on first use.
+    """
+
+    CHECKPOINT_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, path, channel, checkpoint_bytes=None):
+        self.path = path
+        self.channel = channel
+        self.checkpoint_bytes = self.CHECKPOINT_BYTES if checkpoint_bytes is None else checkpoint_bytes
+        self.lock = threading.RLock()
+        self._conn = None
+        self._in_write = False
+        self._pid = None
+        # data_version is per connection, so tokens carry a connection counter
+        self._generation = 0
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS journal_heads '
+                         '(channel TEXT PRIMARY KEY, epoch INTEGER NOT NULL, count INTEGER NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS journal_entries '
+                         '(channel TEXT, epoch INTEGER, seq INTEGER, op TEXT, '
+                         'PRIMARY KEY (channel, epoch, seq))')
+            # Bytes of the epoch's checkpoint entry and of the entries after it
+            conn.execute('CREATE TABLE IF NOT EXISTS journal_sizes '
+                         '(channel TEXT PRIMARY KEY, base INTEGER NOT NULL, logged INTEGER NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO journal_heads VALUES (?, ?, 0)',
+                         (self.channel, int(time.time() * 1000)))
+            conn.execute('INSERT OR IGNORE INTO journal_sizes VALUES (?, 0, 0)', (self.channel,))
+            self._conn, self._pid = conn, os.getpid()
+            self._generation += 1
+        return self._conn
+
+    @contextmanager
+    def _transaction(self, mode=''):
+        """Run a transaction, or join the caller's write transaction."""
+        conn = self._connection()
+        if self._in_write:
+            yield conn
+            return
+        conn.execute(f'BEGIN {mode}')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @contextmanager
+    def write_lock(self):
+        with self.lock, self._transaction('IMMEDIATE'):
+            self._in_write = True
+            try:
+                yield
+            finally:
+                self._in_write = False
+
+    def _head(self, conn):
+        return conn.execute('SELECT epoch, count FROM journal_heads WHERE channel = ?',
+                            (self.channel,)).fetchone()
+
+    def changes(self):
+        with self.lock:
+            version = self._connection().execute('PRAGMA data_version').fetchone()[0]
+            return self._generation, version
+
+    def since(self, epoch, seq):
+        with self.lock, self._transaction() as conn:
+            current_epoch, _ = self._head(conn)
+            if current_epoch != epoch:
+                seq = 0
+            rows = conn.execute('SELECT op FROM journal_entries '
+                                'WHERE channel = ? AND epoch = ? AND seq >= ? ORDER BY seq',
+                                (self.channel, current_epoch, seq)).fetchall()
+        return current_epoch, [json.loads(row[0]) for row in rows]
+
+    def append(self, epoch, expected_seq, op):
+        data = json.dumps(op)
+        with self.lock, self._transaction('IMMEDIATE') as conn:
+            current_epoch, count = self._head(conn)
+            if epoch != current_epoch or expected_seq != count:
+                return False, current_epoch, count
+            conn.execute('INSERT INTO journal_entries VALUES (?, ?, ?, ?)',
+                         (self.channel, epoch, count, data))
+            conn.execute('UPDATE journal_heads SET count = count + 1 WHERE channel = ?',
+                         (self.channel,))
+            conn.execute('UPDATE journal_sizes SET logged = logged + ? WHERE channel = ?',
+                         (len(data), self.channel))
+            return True, epoch, count + 1
+
+    def reset(self):
+        with self.lock, self._transaction('IMMEDIATE') as conn:
+            conn.execute('UPDATE journal_heads SET epoch = epoch + 1, count = 0 WHERE channel = ?',
+                         (self.channel,))
+            conn.execute('DELETE FROM journal_entries WHERE channel = ?', (self.channel,))
+            conn.execute('UPDATE journal_sizes SET base = 0, logged = 0 WHERE channel = ?',
+                         (self.channel,))
+            epoch, _ = self._head(conn)
+        return epoch
+
+    def needs_checkpoint(self):
+        with self.lock, self._transaction() as conn:
+            base, logged = conn.execute('SELECT base, logged FROM journal_sizes WHERE channel = ?',
+                                        (self.channel,)).fetchone()
+        return logged > max(self.checkpoint_bytes, base)
+
+    def checkpoint(self, epoch, expected_seq, op):
+        data = json.dumps(op)
+        with self.lock, self._transaction('IMMEDIATE') as conn:
+            current_epoch, count = self._head(conn)
+            if epoch != current_epoch or expected_seq != count:
+                return False, current_epoch, count
+            conn.execute('DELETE FROM journal_entries WHERE channel = ?', (self.channel,))
+            conn.execute('INSERT INTO journal_entries VALUES (?, ?, 0, ?)',
+                         (self.channel, epoch + 1, data))
+            conn.execute('UPDATE journal_heads SET epoch = ?, count = 1 WHERE channel = ?',
+                         (epoch + 1, self.channel))
+            conn.execute('UPDATE journal_sizes SET base = ?, logged = 0 WHERE channel = ?',
+                         (len(data), self.channel))
+            return True, epoch + 1, 1
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+class SQLiteStateBackend(StateBackend):
+    """Journals in a SQLite file shared by every process that opens it."""
+
+    name = 'sqlite'
+
+    def __init__(self, path='mock_state.db', channels=CHANNELS, checkpoint_bytes=None):
+        self.path = path
+        self.journals = {channel: SQLiteJournal(path, channel, checkpoint_bytes) for channel in channels}
+
+    def journal(self, channel):
+        return self.journals[channel]
+
+    def close(self):
+        for journal in self.journals.values():
+            journal.close()
+
+
+BACKENDS = {
+    'memory': InProcessStateBackend,
+    'shared': SharedMemoryStateBackend,
+    'sqlite': SQLiteStateBackend
+}
+
+
+def create_backend(name, path=None, channels=CHANNELS):
+    """Create a backend by its command-line name."""
+    if name == 'sqlite':
+        return SQLiteStateBackend(path or 'mock_state.db', channels)
+    if name == 'shared':
+        return SharedMemoryStateBackend(channels=channels)
+    return BACKENDS[name]()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tenants
+Serves many mock configs ("namespaces") from one server process.
+
+A tenants file lists the namespaces and how requests reach them:
+
+    {"port": 8000,
+     "tenants": [
+        {"name": "shop", "config": "shop.json", "prefix": "/shop"},
+        {"name": "search", "config": "search.json", "host": "search.localhost"},
+        {"name": "legacy", "config": "legacy.json", "port": 8101}
+     ]}
+
+A namespace matches a request when every selector it sets matches: the
+port the request arrived on, its Host header, and a path prefix, which is
+stripped before the namespace routes the request. The most specific match
+wins (longest prefix, then most selectors), so a namespace with no
+selectors catches everything else. Each namespace has its own engine:
+routes, database, wishlist, faults, logs and /__reload.
+
+Database files are parsed once per distinct content (see config_cache.py),
+so namespaces loading the same file share its records and indexes.
+"""
+
+import json
+
+
+def load_tenants(path):
+    """Read and check a tenants file; return (port or None, tenant specs)."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    specs, names = data.get('tenants', []), set()
+    if not specs:
+        raise ValueError("tenants file lists no tenants")
+    for spec in specs:
+        name = spec.get('name')
+        if not name or name in names:
+            raise ValueError(f"tenant names must be unique and not empty: {name!r}")
+        names.add(name)
+        if 'config' not in spec:
+            raise ValueError(f"tenant {name} has no config")
+        prefix = spec.get('prefix')
+        if prefix is not None and (not prefix.startswith('/') or prefix.endswith('/')):
+            raise ValueError(f"tenant {name}: prefix must start and not end with '/'")
+        if 'port' in spec and not isinstance(spec['port'], int):
+            raise ValueError(f"tenant {name}: port must be an integer")
+    return data.get('port'), specs
+
+
+class Namespace:
+    """One tenant: its engine and the requests it serves."""
+
+    def __init__(self, name, engine, prefix=None, host=None, port=None):
+        self.name = name
+        self.engine = engine
+        self.prefix = prefix
+        self.host = host.lower() if host else None
+        self.port = port
+
+    def matches(self, path, host, port):
+        if self.port is not None and port != self.port:
+            return False
+        if self.host is not None and host != self.host:
+            return False
+        if self.prefix is not None:
+            return path == self.prefix or path.startswith(self.prefix + '/')
+        return True
+
+    def status(self):
+        config = self.engine.config
+        config.sync()
+        source = config.database_source
+        return {"name": self.name, "prefix": self.prefix, "host": self.host, "port": self.port,
+                "config": config.config_path, "records": config.database_count(),
+                "database_digest": source.digest if source is not None else None}
+
+
+class TenantRouter:
+    """Picks the namespace for each request."""
+
+    def __init__(self, namespaces, database_cache=None):
+        # Most specific first: longest prefix, then most selectors
+        self.namespaces = sorted(namespaces, key=lambda ns: (
+            -len(ns.prefix or ''), -sum(s is not None for s in (ns.prefix, ns.host, ns.port))))
+        self.database_cache = database_cache
+
+    @staticmethod
+    def _hostname(host):
+        """Host header without its port."""
+        host = host.lower()
+        if host.startswith('['):
+            return host[:host.find(']') + 1]
+        return host.rsplit(':', 1)[0]
+
+    def resolve(self, target, host, port):
+        """Return (namespace or None, target with the namespace's prefix removed)."""
+        path, sep, query = target.partition('?')
+        host = self._hostname(host or '')
+        for namespace in self.namespaces:
+            if namespace.matches(path, host, port):
+                if namespace.prefix is not None:
+                    target = (path[len(namespace.prefix):] or '/') + sep + query
+                return namespace, target
+        return None, target
+
+    def ports(self):
+        """Ports that namespaces are bound to."""
+        return sorted({ns.port for ns in self.namespaces if ns.port is not None})
+
+    def status(self):
+        """Namespaces and database sharing, for GET /__tenants."""
+        return {"tenants": [namespace.status() for namespace in self.namespaces],
+                "databases": self.database_cache.stats() if self.database_cache else None}
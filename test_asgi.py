@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests for serving the mock engine as an ASGI application
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from asgi import ResponseAborted, create_app
+
+
+async def call(app, method, path, query='', body=b'', headers=()):
+    """Run one request through app; return (status, headers, body, seconds)."""
+    # Bodies arrive in pieces, like from a real server
+    received = [{'type': 'http.request', 'body': body[i:i + 65536], 'more_body': True}
+                for i in range(0, len(body), 65536)]
+    received.append({'type': 'http.request', 'body': b'', 'more_body': False})
+    sent = []
+
+    async def receive():
+        if received:
+            return received.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+             'headers': [(b'content-type', b'application/json')] +
+                        [(name.encode(), value.encode()) for name, value in headers]}
+    start = time.monotonic()
+    await app(scope, receive, send)
+    elapsed = time.monotonic() - start
+    status = sent[0]['status'] if sent else None
+    headers = dict(sent[0]['headers']) if sent else {}
+    return status, headers, b''.join(m.get('body', b'') for m in sent[1:]), elapsed
+
+
+def make_app(tmp, endpoints, **settings):
+    path = os.path.join(tmp, 'config.json')
+    with open(path, 'w') as f:
+        json.dump(dict(settings, endpoints=endpoints), f)
+    return create_app(path)
+
+
+def test_endpoints_and_latency():
+    """Test templates, CRUD and concurrent latency on one event loop."""
+    print("Testing ASGI endpoints...")
+
+    endpoints = [{"path": "/hello", "method": "GET", "response": {"name": "{{query.name}}"}},
+                 {"path": "/slow", "method": "GET", "response": {"ok": True}, "latency_ms": 200}]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp, endpoints)
+
+        async def run():
+            status, headers, body, _ = await call(app, 'GET', '/hello', 'name=Ada')
+            assert status == 200 and json.loads(body) == {"name": "Ada"}
+            assert headers[b'access-control-allow-origin'] == b'*'
+
+            status, _, body, _ = await call(app, 'POST', '/api/games', body=b'{"title": "Zed"}')
+            assert status == 201 and json.loads(body)["game"]["title"] == "Zed"
+
+            assert (await call(app, 'GET', '/missing'))[0] == 404
+
+            # 50 delayed requests overlap instead of taking 50 * 200ms
+            start = time.monotonic()
+            results = await asyncio.gather(*(call(app, 'GET', '/slow') for _ in range(50)))
+            assert all(r[0] == 200 and r[3] >= 0.19 for r in results)
+            assert time.monotonic() - start < 1.0
+
+        asyncio.run(run())
+        assert app.engine.logger.get_logs()[-1]["path"] == '/slow'
+
+    print("✓ ASGI endpoints work")
+
+
+def test_admission_and_faults():
+    """Test queued admission, 503s and faults under ASGI."""
+    print("Testing ASGI admission and faults...")
+
+    endpoints = [{"path": "/limited", "method": "GET", "response": {}, "latency_ms": 100,
+                  "max_concurrency": 1, "max_queue": 1},
+                 {"path": "/broken", "method": "GET", "response": {"data": "x" * 100},
+                  "faults": [{"type": "truncate", "fraction": 0.5}]},
+                 {"path": "/drip", "method": "GET", "response": {"data": "x" * 30},
+                  "faults": [{"type": "slow_drip", "bytes_per_second": 100}]}]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp, endpoints)
+
+        async def run():
+            results = await asyncio.gather(*(call(app, 'GET', '/limited') for _ in range(3)))
+            statuses = sorted(r[0] for r in results)
+            assert statuses == [200, 200, 503], statuses
+            queued = [r for r in results if r[0] == 200 and int(r[1][b'x-queue-wait-ms']) >= 90]
+            assert len(queued) == 1, "The second request waits for the first"
+
+            try:
+                await call(app, 'GET', '/broken')
+                assert False, "Truncated responses abort"
+            except ResponseAborted:
+                pass
+
+            status, headers, body, elapsed = await call(app, 'GET', '/drip')
+            assert status == 200 and len(body) == int(headers[b'content-length'])
+            assert elapsed >= 0.2, "About 50 bytes at 100 bytes/s"
+
+        asyncio.run(run())
+        assert [log["status"] for log in app.engine.logger.get_logs()][-2:] == [200, 200]
+
+    print("✓ ASGI admission and faults work")
+
+
+def test_request_bodies():
+    """Test large bodies get 413 where they are used and are discarded elsewhere."""
+    print("Testing ASGI request bodies...")
+
+    endpoints = [{"path": "/echo", "method": "POST", "response": {"name": "{{query.name}}"}},
+                 {"path": "/ignore", "method": "POST", "response": {"ok": True}}]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp, endpoints, max_body_bytes=100000)
+
+        async def run():
+            status, _, body, _ = await call(app, 'POST', '/echo', body=b'{"name": "Ada"}')
+            assert status == 200 and json.loads(body) == {"name": "Ada"}
+            assert (await call(app, 'POST', '/echo', body=b' ' * 200000))[0] == 413
+            assert (await call(app, 'POST', '/ignore', body=b' ' * 200000))[0] == 200
+
+        asyncio.run(run())
+
+    print("✓ ASGI request bodies are bounded")
+
+
+def test_cors_origins():
+    """Test CORS answers any origin, or only the configured ones."""
+    print("Testing ASGI CORS origins...")
+
+    endpoints = [{"path": "/hello", "method": "GET", "response": {"ok": True}}]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp, endpoints)
+        listed = make_app(tmp, endpoints, cors=["http://localhost:3000/"])
+
+        async def run():
+            headers = (await call(app, 'GET', '/hello', headers=[('origin', 'http://elsewhere')]))[1]
+            assert headers[b'access-control-allow-origin'] == b'*'
+
+            headers = (await call(listed, 'GET', '/hello', headers=[('origin', 'http://localhost:3000')]))[1]
+            assert headers[b'access-control-allow-origin'] == b'http://localhost:3000'
+            assert headers[b'access-control-allow-credentials'] == b'true'
+            assert headers[b'vary'] == b'Origin'
+            status, headers, _, _ = await call(listed, 'GET', '/hello', headers=[('origin', 'http://elsewhere')])
+            assert status == 200 and not any(name.startswith(b'access-control-') for name in headers)
+
+            # main.py leaves CORS to its middleware
+            listed.engine.cors_origins = []
+            headers = (await call(listed, 'GET', '/hello', headers=[('origin', 'http://localhost:3000')]))[1]
+            assert not any(name.startswith(b'access-control-') for name in headers)
+
+        asyncio.run(run())
+
+    print("✓ Only configured origins get CORS headers")
+
+
+if __name__ == '__main__':
+    test_endpoints_and_latency()
+    test_admission_and_faults()
+    test_request_bodies()
+    test_cors_origins()
+    print("\n✅ All ASGI tests passed!")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests for POST /__batch
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from asgi import create_app
+from mock_server import MockEngine, MockRequest, MockServerConfig, RequestLogger, WishlistManager
+
+
+ENDPOINTS = [
+    {"path": "/hello", "method": "GET", "response": {"name": "{{query.name}}"}, "latency_ms": 200},
+    {"path": "/echo", "method": "POST", "response": {"name": "{{query.name}}"}, "latency_ms": 100},
+    {"path": "/limited", "method": "GET", "response": {"ok": True}, "rate_limit": {"rate": 1, "burst": 1}}
+]
+
+
+def make_config(tmp, **settings):
+    path = os.path.join(tmp, 'config.json')
+    with open(path, 'w') as f:
+        json.dump(dict(settings, endpoints=ENDPOINTS), f)
+    return path
+
+
+def batch(engine, payload, headers=()):
+    request = MockRequest('POST', '/__batch', headers, body=json.dumps(payload).encode())
+    response = engine.route(request)
+    return response, json.loads(response.body)
+
+
+def test_batch_items():
+    """Test sub-requests are routed, rendered and reported one by one."""
+    print("Testing batch items...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = MockEngine(MockServerConfig(make_config(tmp)), RequestLogger(), WishlistManager())
+        response, data = batch(engine, [
+            {"path": "/hello", "query": {"name": "Ada"}},
+            {"method": "POST", "path": "/echo", "body": {"name": "Bob"}},
+            {"method": "POST", "path": "/api/games/wishlist?title=Doom"},
+            {"path": "/missing"},
+            {"path": "/__logs"},
+            {"path": "/limited"},
+            {"path": "/limited"},
+            "nonsense"
+        ], headers=[('X-Session-Id', 'vu-1')])
+
+        assert response.status == 200 and data["count"] == 8
+        statuses = [item["status"] for item in data["responses"]]
+        assert statuses == [200, 200, 200, 404, 400, 200, 429, 400]
+        first, second = data["responses"][:2]
+        assert first["body"] == {"name": "Ada"} and first["latency_ms"] == 200
+        assert second["body"] == {"name": "Bob"}
+        assert data["responses"][6]["headers"] == {"Retry-After": "1"}
+        assert all(item["elapsed_ms"] >= 0 for item in data["responses"])
+
+        # Sequential items add up; batch headers reach the items
+        assert data["parallel"] is False and data["latency_ms"] == response.delay_ms == 300
+        assert engine.wishlist_manager.count('vu-1') == 1
+        assert len(engine.logger.get_logs()) == 6, "Every routed item is logged"
+
+        for bad in ({"requests": "x"}, 5, {"requests": [{}] * 1001}):
+            assert batch(engine, bad)[0].status == 400
+
+    print("✓ Items are answered in order")
+
+
+def test_parallel_batch():
+    """Test parallel items wait for the slowest one only."""
+    print("Testing parallel batches...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(tmp))
+        payload = {"parallel": True, "requests": [{"path": "/hello", "query": {"name": str(i)}}
+                                                  for i in range(5)]}
+        body = json.dumps(payload).encode()
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/__batch', 'query_string': b'',
+                 'headers': [(b'content-type', b'application/json')]}
+        start = time.monotonic()
+        asyncio.run(app(scope, receive, send))
+        elapsed = time.monotonic() - start
+
+    data = json.loads(b''.join(m.get('body', b'') for m in sent[1:]))
+    assert sent[0]['status'] == 200 and data["latency_ms"] == 200
+    assert [item["body"]["name"] for item in data["responses"]] == ['0', '1', '2', '3', '4']
+    assert 0.2 <= elapsed < 0.6, f"Latencies should overlap, took {elapsed:.2f}s"
+
+    print("✓ Parallel latencies overlap")
+
+
+def test_parallel_items_run_concurrently():
+    """Test parallel items run on several threads, sequential ones on one."""
+    print("Testing concurrent batch items...")
+
+    class SlowItems(MockEngine):
+        def _batch_item(self, item, headers):
+            time.sleep(0.1)
+            return super()._batch_item(item, headers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = SlowItems(MockServerConfig(make_config(tmp)), RequestLogger(), WishlistManager())
+        items = [{"path": "/echo", "method": "POST", "body": {"name": str(i)}} for i in range(8)]
+
+        start = time.monotonic()
+        response, data = batch(engine, {"parallel": True, "requests": items})
+        assert time.monotonic() - start < 0.5, "Items should overlap"
+        assert [item["body"]["name"] for item in data["responses"]] == [str(i) for i in range(8)]
+
+        start = time.monotonic()
+        batch(engine, items)
+        assert time.monotonic() - start >= 0.8
+
+    print("✓ Parallel items overlap")
+
+
+def test_items_choose_state_views():
+    """Test items with their own X-State-View change only that view."""
+    print("Testing batch items in state views...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = MockEngine(MockServerConfig(make_config(tmp)), RequestLogger(), WishlistManager())
+        response, data = batch(engine, [
+            {"method": "POST", "path": "/api/games/wishlist?title=Doom"},
+            {"method": "POST", "path": "/api/games/wishlist?title=Quake", "headers": {"X-State-View": "b"}},
+            {"method": "POST", "path": "/api/games/wishlist?title=Tetris", "headers": {"X-State-View": "b"}}
+        ], headers=[('X-State-View', 'a')])
+
+        assert [item["status"] for item in data["responses"]] == [200, 200, 200]
+        assert engine.wishlist_manager.count() == 0
+        assert engine.state_views['a'].wishlist_manager.count() == 1
+        assert engine.state_views['b'].wishlist_manager.count() == 2
+
+    print("✓ Items run in their own views")
+
+
+if __name__ == '__main__':
+    test_batch_items()
+    test_parallel_batch()
+    test_parallel_items_run_concurrently()
+    test_items_choose_state_views()
+    print("\n✅ All batch tests passed!")
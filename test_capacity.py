@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for per-endpoint capacity limits
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from capacity import ConcurrencyLimiter, TokenBucket, create_limits
+
+
+def test_token_bucket():
+    """Test the bucket allows a burst, then refills at its rate."""
+    print("Testing token bucket...")
+
+    bucket = TokenBucket(rate=20, burst=3)
+    assert [bucket.try_acquire()[0] for _ in range(4)] == [True, True, True, False]
+    ok, wait = bucket.try_acquire()
+    assert not ok and 0 < wait <= 0.05, "Retry-After should be the time to the next token"
+    time.sleep(0.06)
+    assert bucket.try_acquire()[0], "A token should have refilled"
+
+    print("✓ Token bucket works")
+
+
+def test_concurrency_queue():
+    """Test slots, FIFO queueing, rejection and queue timeouts."""
+    print("Testing concurrency limiter...")
+
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1)
+    assert limiter.acquire() == (True, 0.0)
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    assert limiter.acquire() == (False, 0.0), "Queue is full, so reject"
+
+    limiter.release()
+    waiter.join()
+    granted, waited = results[0]
+    assert granted and waited >= 0.04, "Queued request gets the released slot"
+    limiter.release()
+    assert limiter.active == 0
+
+    timed = ConcurrencyLimiter(max_concurrency=1, max_queue=5, queue_timeout_ms=50)
+    timed.acquire()
+    assert timed.acquire()[0] is False, "Waiting past queue_timeout_ms is rejected"
+    assert not timed.waiters
+
+    print("✓ Concurrency limiter works")
+
+
+def test_cancelled_async_waiters():
+    """Test cancelled async waiters never keep a slot."""
+    print("Testing cancelled async waiters...")
+
+    async def scenario(granted_first):
+        limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=5, queue_timeout_ms=10000)
+        limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        if granted_first:
+            # The slot is handed over, but the waiter is cancelled before it resumes
+            limiter.release()
+            waiter.cancel()
+        else:
+            waiter.cancel()
+            await asyncio.sleep(0)
+            limiter.release()
+        try:
+            await waiter
+            assert False, "Expected CancelledError"
+        except asyncio.CancelledError:
+            pass
+        assert limiter.active == 0 and not limiter.waiters
+        assert limiter.try_acquire()
+
+    asyncio.run(scenario(granted_first=False))
+    asyncio.run(scenario(granted_first=True))
+
+    print("✓ Cancelled waiters free their slots")
+
+
+def test_endpoint_limits():
+    """Test endpoint settings map to 429 and 503 decisions."""
+    print("Testing endpoint limits...")
+
+    assert create_limits({"path": "/x"}) is None
+    limits = create_limits({"rate_limit": 1, "max_concurrency": 1, "retry_after_s": 2})
+    assert limits.admit() == (None, 0, 0.0)
+    assert limits.admit()[0] == 429
+    limits.release()
+
+    busy = create_limits({"max_concurrency": 1, "retry_after_s": 2})
+    busy.admit()
+    assert busy.admit() == (503, 2, 0.0)
+
+    print("✓ Endpoint limits work")
+
+
+if __name__ == '__main__':
+    test_token_bucket()
+    test_concurrency_queue()
+    test_cancelled_async_waiters()
+    test_endpoint_limits()
+    print("\n✅ All capacity tests passed!")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for the cluster controller, against real node processes
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cluster import Controller, ControllerHandler, request_json
+from mock_server import MockEngine, MockRequest, MockServerConfig, RequestLogger, WishlistManager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def write_config(path, message):
+    with open(path, 'w') as f:
+        json.dump({"endpoints": [{"path": "/hello", "method": "GET", "response": {"message": message}}]}, f)
+
+
+def start_node(tmp, name, extra=()):
+    """Start mock_server.py with a config of its own; return (process, url)."""
+    config = os.path.join(tmp, f'{name}.json')
+    write_config(config, 'old')
+    port = free_port()
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, 'mock_server.py'), '--config', config,
+                                '--port', str(port)] + list(extra),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://localhost:{port}'
+    for _ in range(100):
+        try:
+            request_json(url + '/__node', timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"node {name} did not start")
+
+
+class QuietHandler(ControllerHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_push_and_aggregate():
+    """Test pushes skip current nodes, converge, and metrics and logs are merged."""
+    print("Testing cluster controller...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        controller_port = free_port()
+        nodes = [start_node(tmp, 'a', ['--accept-config-push']),
+                 start_node(tmp, 'b', ['--controller', f'http://localhost:{controller_port}'])]
+        controller = Controller(os.path.join(tmp, 'cluster.json'))
+        QuietHandler.controller = controller
+        server = ThreadingHTTPServer(('127.0.0.1', controller_port), QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            # One node is listed, the other registers itself
+            controller.register(nodes[0][1])
+            for _ in range(100):
+                if len(controller.nodes) == 2:
+                    break
+                time.sleep(0.05)
+            assert sorted(controller.nodes) == sorted(url for _, url in nodes)
+
+            write_config(os.path.join(tmp, 'cluster.json'), 'new')
+            report = controller.push()
+            assert report["converged"] and sorted(report["pushed"]) == sorted(controller.nodes)
+            for _, url in nodes:
+                assert get(url + '/hello') == {"message": "new"}
+
+            # Same content again: nothing to do
+            report = controller.push()
+            assert report["converged"] and report["pushed"] == [] and len(report["skipped"]) == 2
+
+            # Invalid configs never reach the nodes
+            try:
+                controller.push(b'{not json')
+                assert False, "Expected ValueError"
+            except ValueError:
+                pass
+
+            for _, url in nodes:
+                get(url + '/hello')
+            metrics = get(f'http://localhost:{controller_port}/metrics')
+            assert metrics["reachable"] == 2
+            assert metrics["cluster"]["requests"] == sum(
+                stats["requests"] for stats in metrics["per_node"].values()) >= 4
+
+            logs = get(f'http://localhost:{controller_port}/logs')["logs"]
+            assert {entry["node"] for entry in logs} == set(controller.nodes)
+            assert [entry["timestamp"] for entry in logs] == sorted(entry["timestamp"] for entry in logs)
+            with urllib.request.urlopen(f'http://localhost:{controller_port}/logs/stream', timeout=5) as response:
+                streamed = [json.loads(line) for line in response if line.strip()]
+            assert {entry["node"] for entry in streamed} == set(controller.nodes)
+
+            # A node that went away stops the cluster from converging
+            nodes[0][0].kill()
+            nodes[0][0].wait()
+            write_config(os.path.join(tmp, 'cluster.json'), 'newer')
+            report = controller.push(wait_s=0.5)
+            assert not report["converged"] and report["unreachable"] == [nodes[0][1]]
+        finally:
+            server.shutdown()
+            server.server_close()
+            for process, _ in nodes:
+                process.kill()
+                process.wait()
+
+    print("✓ Nodes converge and report as one")
+
+
+def test_config_push_is_opt_in():
+    """Test servers refuse PUT /__config unless they joined a cluster."""
+    print("Testing config push opt-in...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        write_config(path, 'old')
+        engine = MockEngine(MockServerConfig(path), RequestLogger(), WishlistManager())
+        body = json.dumps({"endpoints": []}).encode()
+
+        def push():
+            return engine.route(MockRequest('PUT', '/__config', body=body)).status
+
+        assert push() == 403
+        assert engine.body_plan(MockRequest('PUT', '/__config'))[0] is False, "Refused bodies are drained"
+        with open(path) as f:
+            assert json.load(f)["endpoints"][0]["response"] == {"message": "old"}
+
+        engine.accept_config_push = True
+        assert push() == 200
+        with open(path) as f:
+            assert json.load(f) == {"endpoints": []}
+
+    print("✓ Only opted-in servers take pushed configs")
+
+
+if __name__ == '__main__':
+    test_config_push_is_opt_in()
+    test_push_and_aggregate()
+    print("\n✅ All cluster tests passed!")
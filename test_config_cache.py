@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk cache of parsed databases and their indexes
+"""
+
+import glob
+import json
+import marshal
+import os
+import subprocess
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config_cache import DatabaseCache
+from mock_server import MockServerConfig
+
+
+def write_config(tmp, records, **settings):
+    database = os.path.join(tmp, 'games.json')
+    with open(database, 'w') as f:
+        json.dump(records, f)
+    path = os.path.join(tmp, 'config.json')
+    with open(path, 'w') as f:
+        json.dump(dict(settings, database=database, endpoints=[
+            {"path": "/first", "method": "GET", "response": {"n": 1}},
+            {"path": "/first", "method": "GET", "response": {"n": 2}}]), f)
+    return path
+
+
+def test_cache_round_trip():
+    """Test a warm start loads the same records and indexes from disk."""
+    print("Testing cache round trip...")
+
+    records = [{"title": f"Game {i}", "price": i % 7, "genres": ["RPG", "Indie"][:i % 3]}
+               for i in range(200)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_config(tmp, records, indexes=["price", "genres"])
+        cache_dir = os.path.join(tmp, 'cache')
+
+        cold = MockServerConfig(path, DatabaseCache(cache_dir))
+        assert len(glob.glob(os.path.join(cache_dir, '*.db.marshal'))) == 1
+        warm_cache = DatabaseCache(cache_dir)
+        warm = MockServerConfig(path, warm_cache)
+        assert warm_cache.stats()["disk_hits"] == 1
+
+        assert warm.get_database() == cold.get_database() == records
+        assert warm.index == cold.index
+        for field in ("price", "genres"):
+            assert warm.field_indexes[field].state() == cold.field_indexes[field].state()
+        branches = [[('price', 'lt', 2), ('genres', 'eq', 'RPG')]]
+        assert warm.query_database(branches) == cold.query_database(branches)
+
+        # The first endpoint listed wins
+        assert warm.find_endpoint('/first', 'GET')["response"] == {"n": 1}
+
+        # Changes after loading don't touch the cache
+        assert warm.add_game({"title": "New", "price": 1})[0]
+        assert MockServerConfig(path, DatabaseCache(cache_dir)).database_count() == 200
+
+    print("✓ Warm starts match cold starts")
+
+
+def test_cache_misses():
+    """Test changed content, other indexes and broken entries."""
+    print("Testing cache misses...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        path = write_config(tmp, [{"title": "A"}])
+        MockServerConfig(path, DatabaseCache(cache_dir))
+
+        # New content gets a new entry
+        path = write_config(tmp, [{"title": "A"}, {"title": "B"}])
+        cache = DatabaseCache(cache_dir)
+        assert MockServerConfig(path, cache).database_count() == 2
+        assert cache.stats()["disk_misses"] == 1
+        assert len(glob.glob(os.path.join(cache_dir, '*.db.marshal'))) == 2
+
+        # An index the entry lacks is built and added to it
+        path = write_config(tmp, [{"title": "A"}, {"title": "B"}], indexes=["title"])
+        MockServerConfig(path, DatabaseCache(cache_dir))
+        entries = glob.glob(os.path.join(cache_dir, '*.db.marshal'))
+        newest = max(entries, key=os.path.getmtime)
+        with open(newest, 'rb') as f:
+            assert ('field', 'title') in marshal.loads(f.read())[2]
+
+        # Unreadable or outdated entries are ignored
+        for payload in (b'garbage', marshal.dumps((0, (), {}))):
+            with open(newest, 'wb') as f:
+                f.write(payload)
+            cache = DatabaseCache(cache_dir)
+            assert MockServerConfig(path, cache).database_count() == 2
+            assert cache.stats()["disk_misses"] == 1
+
+    print("✓ Stale and broken entries are rebuilt")
+
+
+def test_opt_in_imports():
+    """Test configs without opt-in features never import their modules."""
+    print("Testing lazy imports...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_config(tmp, [{"title": "A"}])
+        script = f"""
+import sys
+from mock_server import MockEngine, MockRequest, MockServerConfig, RequestLogger, WishlistManager
+engine = MockEngine(MockServerConfig({path!r}), RequestLogger(), WishlistManager())
+opt_in = {{'faults', 'pacing', 'feeds', 'profiling', 'tenants', 'cluster'}}
+for target in ('/first', '/__faults'):
+    request = MockRequest('GET', target)
+    result = engine.route(request)
+    engine.complete(request, result if target.startswith('/__') else engine.serve(request, result))
+    print(sorted(opt_in & set(sys.modules)))
+"""
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        assert output.strip().splitlines()[-2:] == ["[]", "['faults']"], output
+
+    print("✓ Opt-in modules load on first use")
+
+
+if __name__ == '__main__':
+    test_cache_round_trip()
+    test_cache_misses()
+    test_opt_in_imports()
+    print("\n✅ All config cache tests passed!")
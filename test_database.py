@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Tests for the games database and its primary-key index
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import (DatabaseView, MockEngine, MockRequest, MockServerConfig, RequestLogger, TemplateEngine,
+                         WishlistManager, iter_json)
+
+
+def _make_config(tmp, records, **extra):
+    """Write a config + database and return a loaded MockServerConfig."""
+    db_path = os.path.join(tmp, 'games.json')
+    with open(db_path, 'w') as f:
+        json.dump(records, f)
+    config_path = os.path.join(tmp, 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump(dict({"database": db_path, "endpoints": []}, **extra), f)
+    return MockServerConfig(config_path)
+
+
+def test_crud_by_primary_key():
+    """Test add, lookup, update and delete through the index."""
+    print("Testing primary-key CRUD...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = _make_config(tmp, [{"title": "Minecraft"}, {"title": "Tetris"}])
+
+        assert config.add_game({"title": "Doom"})[0]
+        assert not config.add_game({"title": "Doom"})[0], "Duplicate must be rejected"
+        assert config.find_in_database('title', 'Doom') == {"title": "Doom"}
+
+        assert config.update_game('Tetris', {"genres": ["Puzzle"]}, replace=False)[0]
+        assert config.find_in_database('title', 'Tetris')['genres'] == ["Puzzle"]
+        assert config.update_game('Doom', {"title": "Minecraft"})[2] == 409
+
+        assert config.delete_game('title', 'Minecraft')[0]
+        assert config.find_in_database('title', 'Minecraft') is None
+        assert [r['title'] for r in config.get_database()] == ["Tetris", "Doom"]
+        assert config.database_count() == 2
+
+    print("✓ Primary-key CRUD works")
+
+
+def test_tombstones_compact_in_order():
+    """Test bulk deletes compact tombstones without reordering."""
+    print("Testing tombstone compaction...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = _make_config(tmp, [], primary_key="id")
+        for i in range(5000):
+            config.add_game({"id": i})
+        for i in range(0, 5000, 3):
+            config.delete_game('id', i)
+        for i in range(1, 5000, 3):
+            config.delete_game('id', i)
+
+        ids = [r['id'] for r in config.get_database()]
+        assert ids == list(range(2, 5000, 3)), "Survivors should keep insertion order"
+        assert config.tombstones < len(config.database), "Tombstones should have been compacted"
+        assert config.find_in_database('id', 4997) == {"id": 4997}
+
+    print("✓ Tombstones compact in order")
+
+
+def test_crud_endpoints_use_primary_key():
+    """Test the games endpoints validate and look up by a configured key."""
+    print("Testing CRUD endpoints with a custom primary key...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = _make_config(tmp, [{"sku": 7, "name": "Doom"}, {"sku": "A-1", "name": "Tetris"}],
+                              primary_key="sku")
+        engine = MockEngine(config, RequestLogger(), WishlistManager())
+
+        def call(method, target, body=None):
+            request = MockRequest(method, target, body=json.dumps(body).encode() if body is not None else b'')
+            result = engine.route(request)
+            return (result if hasattr(result, 'status') else engine.serve(request, result)).status
+
+        assert call('POST', '/api/games', {"name": "Quake"}) == 400
+        assert call('POST', '/api/games', {"sku": 9, "name": "Quake"}) == 201
+        assert call('POST', '/api/games', {"sku": 9}) == 409
+        assert call('PATCH', '/api/games?sku=9', {"name": "Quake II"}) == 200
+        assert config.find_in_database('sku', 9)["name"] == "Quake II"
+        assert call('DELETE', '/api/games?sku=7') == 200, "Numeric keys are found from the query string"
+        assert call('DELETE', '/api/games?sku=A-1') == 200
+        assert call('DELETE', '/api/games?sku=7') == 404
+        assert call('DELETE', '/api/games') == 400
+        assert [r["sku"] for r in config.get_database()] == [9]
+
+    print("✓ Endpoints use the primary key")
+
+
+def test_streamed_rendering_matches_json():
+    """Test lazily rendered database responses encode like json.dumps."""
+    print("Testing streamed database rendering...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records = [{"title": f"Game {i}", "new_release": i % 2 == 0, "genres": ["RPG"]}
+                   for i in range(600)]
+        config = _make_config(tmp, records)
+        config.delete_game('title', 'Game 3')
+
+        for template in [
+            {"games": "{{database}}", "total": "{{database_count}}", "empty": [], "nested": {"a": [1]}},
+            {"games": "{{database_filter:new_release:true}}"},
+            {"games": "{{database_filter_genre:Nope}}"},
+            "{{database}}"
+        ]:
+            expected = json.dumps(TemplateEngine.render(template, {}, config), indent=2)
+            streamed = TemplateEngine.render(template, {}, config, lazy=True)
+            assert ''.join(iter_json(streamed)) == expected, template
+
+    print("✓ Streamed rendering matches json.dumps")
+
+
+def test_paging_matches_naive_sort():
+    """Test indexed pages stay correct as records change."""
+    print("Testing paging, sorting and filtering...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records = [{"title": f"Game {i}", "rank": (i * 7) % 50, "genres": ["RPG" if i % 3 else "FPS"]}
+                   for i in range(300)]
+        config = _make_config(tmp, records)
+
+        def check():
+            live = config.get_database()
+            rpg = [r for r in live if "RPG" in r["genres"]]
+            by_rank = sorted(rpg, key=lambda r: r["rank"])
+            for offset, limit in [(0, 10), (95, 10), (195, 50), (500, 5)]:
+                page, total = config.page_database(offset, limit, 'rank', False, 'genres', 'RPG')
+                assert total == len(rpg)
+                assert [r["rank"] for r in page] == [r["rank"] for r in by_rank[offset:offset + limit]]
+                page, total = config.page_database(offset, limit)
+                assert (page, total) == (live[offset:offset + limit], len(live))
+            page, _ = config.page_database(0, 5, 'rank', True)
+            assert [r["rank"] for r in page] == sorted((r["rank"] for r in live), reverse=True)[:5]
+
+        check()
+        for i in range(0, 300, 4):
+            config.delete_game('title', f"Game {i}")
+        config.update_game("Game 1", {"rank": -1, "genres": ["RPG"]}, replace=False)
+        config.update_game("Game 2", {"genres": ["FPS"]}, replace=False)
+        config.add_game({"title": "New", "rank": 25, "genres": ["RPG"]})
+        check()
+
+        # More queued changes than a view applies one by one: it is rebuilt
+        for i in range(DatabaseView.MAX_PENDING + 10):
+            config.add_game({"title": f"Bulk {i}", "rank": i % 60, "genres": ["RPG"]})
+        check()
+
+    print("✓ Paging matches a naive sort")
+
+
+def test_query_planner_matches_scan():
+    """Test indexed compound queries return the same records as a scan."""
+    print("Testing compound queries...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records = [{"title": f"Game {i:03d}", "rank": (i * 7) % 50, "new": i % 2 == 0,
+                    "genres": ["RPG", "FPS"][:i % 3]} for i in range(300)]
+        indexed = _make_config(tmp, records, indexes=["genres", "rank", "title"])
+        plain = _make_config(tmp, records)
+        queries = [
+            "genres=RPG AND rank<=10",
+            "genres in RPG|FPS AND new=true AND rank>40",
+            "title^=Game 01 OR rank=5 AND genres=FPS",
+            "title*=game 1 AND new=false AND rank<30",
+            "rank>=49 OR title=\"Game 007\"",
+            "genres={{query.genre}} AND rank<{{query.max_rank}}"
+        ]
+
+        def check():
+            for query in queries:
+                branches = TemplateEngine.parse_query(query, {"max_rank": ["20"]})
+                assert indexed.query_database(branches) == plain.query_database(branches), query
+                assert indexed.explain_query(branches)["strategy"] == "index", query
+
+        assert plain.explain_query(TemplateEngine.parse_query(queries[0], {}))["strategy"] == "scan"
+        check()
+        for config in (indexed, plain):
+            config.snapshot('before')
+            for i in range(0, 300, 4):
+                config.delete_game('title', f"Game {i:03d}")
+        check()
+        for config in (indexed, plain):
+            config.update_game("Game 001", {"rank": 3, "genres": ["FPS"]}, replace=False)
+            config.add_game({"title": "Game 999", "rank": 5, "genres": ["RPG", "FPS"]})
+        check()
+
+        # Indexes shared with the snapshot were not changed by the writes
+        for config in (indexed, plain):
+            config.restore('before')
+        check()
+
+    print("✓ Compound queries match a scan")
+
+
+def test_query_with_missing_parameters():
+    """Test branches emptied by missing parameters match nothing."""
+    print("Testing queries with missing parameters...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = _make_config(tmp, [{"title": "Doom", "rank": 1}, {"title": "Tetris", "rank": 2}],
+                              indexes=["rank"])
+
+        def titles(expression, params):
+            branches = TemplateEngine.parse_query(expression, params)
+            return [r["title"] for r in config.query_database(branches)]
+
+        assert titles("title={{query.x}} OR rank=1", {}) == ["Doom"]
+        assert titles("title={{query.x}} OR rank=1", {"x": ["Tetris"]}) == ["Doom", "Tetris"]
+        assert titles("title={{query.x}} AND rank=2", {}) == ["Tetris"], "Other predicates still apply"
+        assert titles("title={{query.x}}", {}) == []
+        assert titles("", {}) == ["Doom", "Tetris"], "No expression means no filter"
+        assert config.explain_query(TemplateEngine.parse_query("rank={{query.x}}", {}))["strategy"] == "none"
+
+    print("✓ Emptied branches are dropped")
+
+
+def test_directive_cache_invalidation():
+    """Test directive results are cached until the database changes."""
+    print("Testing directive result cache...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = _make_config(tmp, [{"title": "Doom", "new_release": True}])
+        template = "{{database_filter:new_release:true}}"
+
+        assert len(TemplateEngine.render(template, {}, config)) == 1
+        assert len(TemplateEngine.render(template, {}, config)) == 1
+        stats = config.directive_cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+        config.add_game({"title": "Quake", "new_release": True})
+        assert len(TemplateEngine.render(template, {}, config)) == 2, "Add must invalidate"
+        config.delete_game('title', 'Doom')
+        assert len(TemplateEngine.render(template, {}, config)) == 1, "Delete must invalidate"
+        assert config.directive_cache.stats()["misses"] == 3
+
+    print("✓ Directive cache invalidates on mutation")
+
+
+if __name__ == '__main__':
+    test_crud_by_primary_key()
+    test_tombstones_compact_in_order()
+    test_crud_endpoints_use_primary_key()
+    test_streamed_rendering_matches_json()
+    test_paging_matches_naive_sort()
+    test_query_planner_matches_scan()
+    test_query_with_missing_parameters()
+    test_directive_cache_invalidation()
+    print("\n✅ All database tests passed!")
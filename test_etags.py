@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for ETags and conditional GETs of configured endpoints
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import (MockEngine, MockRequest, MockResponse, MockServerConfig, RequestLogger,
+                         TemplateEngine, WishlistManager)
+
+
+ENDPOINTS = [
+    {"path": "/games", "method": "GET", "response": {"games": "{{database_filter:genre:{{query.genre}}}}"}},
+    {"path": "/dashboard", "method": "GET", "etag": True,
+     "response": {"total": "{{database_count}}", "at": "{{timestamp}}"}},
+    {"path": "/health", "method": "GET", "response": {"id": "{{uuid}}"}},
+    {"path": "/fixed", "method": "GET", "etag": False, "response": {"ok": True}},
+    {"path": "/created", "method": "GET", "status": 201, "response": {"ok": True}}
+]
+
+
+def make_engine(tmp):
+    db_path = os.path.join(tmp, 'games.json')
+    with open(db_path, 'w') as f:
+        json.dump([{"title": "Doom", "genre": "FPS"}, {"title": "Tetris", "genre": "Puzzle"}], f)
+    path = os.path.join(tmp, 'config.json')
+    with open(path, 'w') as f:
+        json.dump({"database": db_path, "endpoints": ENDPOINTS}, f)
+    return MockEngine(MockServerConfig(path), RequestLogger(), WishlistManager())
+
+
+def get(engine, target, etag=None, view=None):
+    """GET target; return (status, ETag header or None)."""
+    headers = [('If-None-Match', etag)] if etag else []
+    if view:
+        headers.append(('X-State-View', view))
+    request = MockRequest('GET', target, headers)
+    engine = engine.for_request(request)
+    result = engine.route(request)
+    response = result if isinstance(result, MockResponse) else engine.serve(request, result)
+    return response.status, dict(response.headers).get('ETag')
+
+
+def test_which_endpoints():
+    """Test only deterministic 200 GET endpoints get ETags unless forced."""
+    print("Testing ETag eligibility...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        tags = {endpoint["path"]: get(engine, endpoint["path"])[1] for endpoint in ENDPOINTS}
+        assert tags["/games"].startswith('"')
+        assert tags["/dashboard"].startswith('W/"'), "Forced ETags on volatile templates are weak"
+        assert tags["/health"] is None and tags["/fixed"] is None and tags["/created"] is None
+        assert get(engine, '/games?genre=FPS')[1] != get(engine, '/games?genre=Puzzle')[1]
+
+    print("✓ ETags go to cacheable endpoints")
+
+
+def test_conditional_get():
+    """Test If-None-Match is answered before rendering until the database changes."""
+    print("Testing conditional GET...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        config = engine.config
+        status, etag = get(engine, '/games?genre=FPS')
+        assert status == 200
+
+        render = TemplateEngine.render
+        TemplateEngine.render = None
+        try:
+            assert get(engine, '/games?genre=FPS', etag) == (304, etag)
+            assert get(engine, '/games?genre=FPS', f'"other", W/{etag}')[0] == 304
+            assert get(engine, '/games?genre=FPS', '*')[0] == 304
+        finally:
+            TemplateEngine.render = render
+        assert get(engine, '/games?genre=FPS', '"other"')[0] == 200
+
+        # Every change to the records gives new ETags
+        seen = {etag}
+        for change in (lambda: config.add_game({"title": "Quake", "genre": "FPS"}),
+                       lambda: config.delete_game('title', 'Quake'),
+                       lambda: config.restore('initial'),
+                       config.load):
+            change()
+            status, etag = get(engine, '/games?genre=FPS', etag)
+            assert status == 200 and etag not in seen
+            seen.add(etag)
+
+        # A forked state view starts at the same version with other ETags
+        assert get(engine, '/games?genre=FPS', view='gw0')[1] not in seen
+
+    print("✓ Unchanged responses are not rendered again")
+
+
+if __name__ == '__main__':
+    test_which_endpoints()
+    test_conditional_get()
+    print("\n✅ All ETag tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for fault injection schedules and runtime scenario switching
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from faults import FaultRule, compile_schedule
+from mock_server import MockServerConfig
+
+
+def test_burst_and_ramp_schedules():
+    """Test burst windows and ramps give the expected rate over time."""
+    print("Testing fault schedules...")
+
+    burst = FaultRule({"type": "error", "every_s": 60, "for_s": 10, "offset_s": 5})
+    assert [burst.probability(t) for t in (0, 5, 14.9, 15, 64, 65, 125)] == [0, 1, 1, 0, 0, 1, 1]
+
+    ramp = FaultRule({"type": "error", "rate": 0.5, "ramp_s": 100, "ramp_from": 0.1})
+    assert abs(ramp.probability(0) - 0.1) < 1e-9
+    assert abs(ramp.probability(50) - 0.3) < 1e-9
+    assert ramp.probability(500) == 0.5
+
+    seeded = FaultRule({"type": "reset", "rate": 0.3}, seed=1)
+    again = FaultRule({"type": "reset", "rate": 0.3}, seed=1)
+    assert [seeded.fires(0) for _ in range(100)] == [again.fires(0) for _ in range(100)]
+
+    try:
+        FaultRule({"type": "explode"})
+        assert False, "Unknown fault types must be rejected"
+    except ValueError:
+        pass
+
+    print("✓ Burst windows and ramps work")
+
+
+def test_compiled_rule_order():
+    """Test scenario rules come before the endpoint's own faults and failure_rate."""
+    print("Testing compiled fault rules...")
+
+    endpoints = [{"path": "/a", "method": "GET", "failure_rate": 1.0},
+                 {"path": "/b", "method": "GET"}]
+    schedule = compile_schedule(endpoints, {"GET /a": [{"type": "hang", "every_s": 10, "for_s": 5}]},
+                                started=0)
+    assert schedule.pick(endpoints[0], now=1).type == 'hang'
+    assert schedule.pick(endpoints[0], now=7).status == 500, "Outside the window failure_rate applies"
+    assert schedule.pick(endpoints[1], now=1) is None
+
+    print("✓ Rules are compiled in order")
+
+
+def test_runtime_scenario_switch():
+    """Test switching scenarios without reloading the config."""
+    print("Testing scenario switching...")
+
+    config_data = {
+        "fault_scenarios": {"down": {"*": [{"type": "error", "status": 503}]}},
+        "endpoints": [{"path": "/a", "method": "GET", "response": {}}]
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        with open(path, 'w') as f:
+            json.dump(config_data, f)
+        config = MockServerConfig(path)
+        endpoint = config.find_endpoint('/a', 'GET')
+
+        assert config.faults.pick(endpoint) is None
+        assert config.faults.activate('missing')[0] is False
+        assert config.faults.activate('down')[0]
+        assert config.faults.pick(endpoint).status == 503
+        assert config.faults.status()["scenario"] == 'down'
+
+        # Inline scenarios are validated before switching
+        assert config.faults.activate('bad', {"*": [{"type": "nope"}]})[0] is False
+        assert config.faults.pick(endpoint).status == 503
+
+        # Reloading recompiles against the new endpoints but keeps the scenario
+        config.load()
+        assert config.faults.pick(config.find_endpoint('/a', 'GET')).status == 503
+        assert config.faults.activate(None)[0]
+        assert config.faults.pick(config.find_endpoint('/a', 'GET')) is None
+
+    print("✓ Scenarios switch at runtime")
+
+
+if __name__ == '__main__':
+    test_burst_and_ramp_schedules()
+    test_compiled_rule_order()
+    test_runtime_scenario_switch()
+    print("\n✅ All fault tests passed!")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for SSE and WebSocket push feeds
+"""
+
+import asyncio
+import json
+import os
+import struct
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from asgi import create_app
+from feeds import OP_CLOSE, OP_PING, Feed, FeedEvent, FrameParser, load_replay, websocket_accept
+
+
+def test_events_and_slow_consumers():
+    """Test events are encoded once and slow subscribers are bounded."""
+    print("Testing feed events...")
+
+    feed = Feed({"event": {"n": 1}, "event_name": "tick", "interval_ms": 50, "queue_size": 2})
+    event, delay = feed.next_event()
+    assert delay == 0.05
+    assert event.sse == b'id: 1\nevent: tick\ndata: {"n": 1}\n\n'
+    assert event.sse is event.sse, "Encoded bytes are shared by all subscribers"
+    assert event.ws == b'\x81\x08{"n": 1}'
+
+    # "drop" keeps the newest events
+    slow = feed.subscribe('sse')
+    for i in range(5):
+        assert feed.publish(FeedEvent(i, None, i)) == []
+    assert [e.id for e in slow.queue] == [3, 4] and slow.dropped == 3
+
+    # "disconnect" reports the subscriber instead
+    strict = Feed({"event": {}, "queue_size": 2, "slow_consumer": "disconnect"})
+    subscriber = strict.subscribe('websocket')
+    overflowed = [strict.publish(FeedEvent(i, None, i)) for i in range(3)]
+    assert overflowed == [[], [], [subscriber]]
+
+    for bad in ({"event": {}, "slow_consumer": "block"}, {"event": {}, "interval_ms": 0}, {}):
+        try:
+            Feed(bad)
+            assert False, f"Expected ValueError for {bad}"
+        except ValueError:
+            pass
+
+    print("✓ Events are shared and queues are bounded")
+
+
+def test_replay():
+    """Test recordings replay in order, spaced by their timestamps."""
+    print("Testing feed replay...")
+
+    recording = [
+        {"timestamp": "2024-01-01T00:00:00", "path": "/prices", "response": {"n": 1}},
+        {"timestamp": "2024-01-01T00:00:01", "path": "/other", "response": {"n": 0}},
+        {"timestamp": "2024-01-01T00:00:02", "path": "/prices", "response": {"n": 2}}
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'recording.json')
+        with open(path, 'w') as f:
+            json.dump(recording, f)
+        assert load_replay(path, '/prices', speed=2) == [(0.0, None, {"n": 1}), (1.0, None, {"n": 2})]
+
+        feed = Feed({"replay": path, "replay_path": "/prices", "loop": False})
+        first, delay = feed.next_event()
+        assert first.text == '{"n": 1}' and delay == 2.0
+        last, delay = feed.next_event()
+        assert last.text == '{"n": 2}' and delay == 0
+        assert feed.next_event() == (None, None)
+
+        looping = Feed({"replay": path, "replay_path": "/prices", "interval_ms": 500})
+        looping.next_event()
+        assert looping.next_event()[1] == 0.5
+        assert looping.next_event()[0].text == '{"n": 1}'
+
+    print("✓ Replays follow the recording")
+
+
+def test_websocket_framing():
+    """Test the handshake key and decoding masked client frames."""
+    print("Testing WebSocket framing...")
+
+    # The example from RFC 6455
+    assert websocket_accept('dGhlIHNhbXBsZSBub25jZQ==') == 's3pPLMBiTxaQ9kYGzzhZRbK+xOo='
+
+    def masked(opcode, payload):
+        mask = b'\x01\x02\x03\x04'
+        data = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return bytes([0x80 | opcode, 0x80 | len(payload)]) + mask + data
+
+    parser = FrameParser()
+    frames = masked(OP_PING, b'hi') + masked(OP_CLOSE, struct.pack('!H', 1000))
+    assert parser.feed(frames[:5]) == []
+    assert parser.feed(frames[5:]) == [(OP_PING, b'hi'), (OP_CLOSE, b'\x03\xe8')]
+
+    try:
+        FrameParser().feed(b'\x81\xff' + struct.pack('!Q', 1 << 20))
+        assert False, "Expected ValueError"
+    except ValueError:
+        pass
+
+    print("✓ WebSocket frames are decoded")
+
+
+def test_asgi_feeds():
+    """Test SSE and WebSocket subscribers through the ASGI app."""
+    print("Testing ASGI feeds...")
+
+    endpoints = [{"path": "/ticks", "method": "GET",
+                  "stream": {"event": {"ok": True}, "event_name": "tick", "interval_ms": 20}}]
+
+    async def subscribe(app, scope_type, count):
+        """Subscribe, then disconnect after count events; return the messages sent."""
+        if scope_type == 'http':
+            scope = {'type': 'http', 'method': 'GET'}
+            received = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            disconnect = {'type': 'http.disconnect'}
+        else:
+            scope = {'type': 'websocket'}
+            received = [{'type': 'websocket.connect'}]
+            disconnect = {'type': 'websocket.disconnect', 'code': 1000}
+        scope.update(path='/ticks', query_string=b'', headers=[])
+        sent, gone = [], asyncio.Event()
+
+        async def receive():
+            if received:
+                return received.pop(0)
+            await gone.wait()
+            return disconnect
+
+        async def send(message):
+            sent.append(message)
+            if sum(1 for m in sent if m.get('body') or m.get('text')) == count:
+                gone.set()
+
+        await asyncio.wait_for(app(scope, receive, send), 5)
+        return sent
+
+    async def run(app):
+        return await asyncio.gather(subscribe(app, 'http', 3), subscribe(app, 'websocket', 2))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        with open(path, 'w') as f:
+            json.dump({"endpoints": endpoints}, f)
+        app = create_app(path)
+        sse, ws = asyncio.run(run(app))
+
+    assert sse[0]['status'] == 200
+    assert (b'content-type', b'text/event-stream') in sse[0]['headers']
+    bodies = [m['body'] for m in sse[1:]]
+    assert len(bodies) == 3 and all(b'event: tick\ndata: {"ok": true}\n\n' in b for b in bodies)
+    assert ws[0] == {'type': 'websocket.accept'}
+    assert [m['text'] for m in ws[1:]] == ['{"ok": true}'] * 2
+    assert app._drivers == {}, "Feeds stop once nobody is subscribed"
+
+    print("✓ Feeds are served over SSE and WebSocket")
+
+
+if __name__ == '__main__':
+    test_events_and_slow_consumers()
+    test_replay()
+    test_websocket_framing()
+    test_asgi_feeds()
+    print("\n✅ All feed tests passed!")
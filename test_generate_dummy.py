@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for synthetic config and database generation
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_dummy import generate_realistic_config, iter_game_records, write_database, write_realistic_config
+
+
+def test_realistic_config_mix():
+    """Test realistic configs mix methods and database directives."""
+    print("Testing realistic config generation...")
+
+    config = generate_realistic_config(200, seed=7)
+    methods = {endpoint['method'] for endpoint in config['endpoints']}
+    bodies = json.dumps([endpoint['response'] for endpoint in config['endpoints']])
+
+    assert methods == {'GET', 'POST', 'DELETE'}, f"Unexpected methods: {methods}"
+    assert '{{database' in bodies, "Expected database directives"
+    assert generate_realistic_config(200, seed=7) == config, "Seeded output should be reproducible"
+
+    print("✓ Realistic config generation works")
+
+
+def test_streamed_outputs_are_valid_json():
+    """Test streamed config and database files parse as JSON."""
+    print("Testing streamed outputs...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'games.json')
+        config_path = os.path.join(tmp, 'config.json')
+        write_database(db_path, 500, {'genres': 3, 'sales_leaderboard': 10}, seed=1)
+        write_realistic_config(config_path, 20, db_path, seed=1)
+
+        with open(db_path) as f:
+            records = json.load(f)
+        with open(config_path) as f:
+            config = json.load(f)
+
+    assert len(records) == 500
+    assert len({r['title'] for r in records}) == 500, "Titles should be unique"
+    assert len({g for r in records for g in r['genres']}) <= 3
+    assert len({r['sales_leaderboard'] for r in records}) <= 10
+    assert config['database'] == db_path
+    assert len(config['endpoints']) == 20
+
+    print("✓ Streamed outputs are valid")
+
+
+def test_cardinality_is_honoured():
+    """Test fields get as many distinct values as requested."""
+    print("Testing cardinality...")
+
+    records = list(iter_game_records(20000, {'discounts_and_events': 500}, seed=3))
+    assert len({r['discounts_and_events'] for r in records}) == 500
+
+    print("✓ Requested cardinality is reached")
+
+
+if __name__ == '__main__':
+    test_realistic_config_mix()
+    test_streamed_outputs_are_valid_json()
+    test_cardinality_is_honoured()
+    print("\n✅ All generator tests passed!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the {{repeat}} and {{range}} generator directives
+"""
+
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import (GeneratedStream, MockEngine, MockRequest, MockServerConfig, RequestLogger,
+                         TemplateEngine, TemplateError, WishlistManager)
+
+
+EVENT = '{"id": "{{uuid}}", "seq": "{{index}}", "score": "{{random_int}}", "at": "{{timestamp}}"}'
+ENDPOINTS = [
+    {"path": "/events", "method": "GET", "response": {"events": "{{repeat:{{query.n}}:" + EVENT + "}}"}}
+]
+
+
+def make_engine(tmp, **settings):
+    path = os.path.join(tmp, 'config.json')
+    with open(path, 'w') as f:
+        json.dump(dict(settings, endpoints=ENDPOINTS), f)
+    return MockEngine(MockServerConfig(path), RequestLogger(), WishlistManager())
+
+
+def get(engine, target):
+    request = MockRequest('GET', target)
+    response = engine.serve(request, engine.route(request))
+    body = ''.join(response.chunks).encode() if response.chunks is not None else response.body
+    return response, json.loads(body)
+
+
+def test_directives():
+    """Test repeat and range items, nesting and errors."""
+    print("Testing generator directives...")
+
+    render = lambda template, query: TemplateEngine.render(template, query, None)
+    assert render("{{range:0:10:3}}", {}) == [0, 3, 6, 9]
+    assert render("{{range:5:0:-2:n{{index}}}}", {}) == ['n5', 'n3', 'n1']
+    assert render("{{repeat:{{query.n}}:{{index}}}}", {"n": ["3"]}) == [0, 1, 2]
+    assert render("{{repeat:0:x}}", {}) == []
+
+    grid = render('{{repeat:2:{"row": "{{index}}", "cells": "{{range:0:3:1:{{index}}}}"}}}', {})
+    assert grid == [{"row": 0, "cells": [0, 1, 2]}, {"row": 1, "cells": [0, 1, 2]}]
+
+    items = render('{{repeat:3:{"id": "{{uuid}}", "at": "{{timestamp}}", "request": "{{request_uuid}}"}}}', {})
+    assert len({item["id"] for item in items}) == 3, "Every item gets its own UUID"
+    assert len({item["at"] for item in items}) == 1, "Items share the response timestamp"
+    assert len({item["request"] for item in items}) == 1, "Items share the response's request_uuid"
+
+    for bad in ("{{repeat:x:y}}", "{{repeat:-1:y}}", "{{repeat:3}}", "{{range:1}}",
+                "{{range:0:5:0}}", "{{repeat:2:{broken}}"):
+        try:
+            render(bad, {})
+            assert False, f"Expected TemplateError for {bad}"
+        except TemplateError:
+            pass
+
+    print("✓ Items are generated from their templates")
+
+
+def test_reproducible():
+    """Test payloads depend only on the seed and the request."""
+    print("Testing reproducible payloads...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        first = get(engine, '/events?n=50')[1]["events"]
+        again = get(engine, '/events?n=50')[1]["events"]
+        strip = lambda events: [dict(event, at=None) for event in events]
+        assert strip(first) == strip(again)
+        assert [event["seq"] for event in first] == list(range(50))
+        assert len({event["id"] for event in first}) == 50
+
+        reseeded = make_engine(tmp, generator_seed=7)
+        assert strip(get(reseeded, '/events?n=50')[1]["events"]) != strip(first)
+
+    print("✓ Same seed, same payload")
+
+
+def test_streamed_lazily():
+    """Test large payloads are streamed in bounded memory."""
+    print("Testing lazy generation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        request = MockRequest('GET', '/events?n=1000000')
+        rendered = TemplateEngine.render(ENDPOINTS[0]["response"], request.query_params,
+                                         engine.config, lazy=True)
+        assert isinstance(rendered["events"], GeneratedStream) and rendered["events"].length == 1000000
+
+        request = MockRequest('GET', '/events?n=30000')
+        response = engine.serve(request, engine.route(request))
+        assert response.chunks is not None
+        tracemalloc.start()
+        size, items = 0, 0
+        for chunk in response.chunks:
+            size += len(chunk)
+            items += chunk.count('"seq"')
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert items == 30000
+        assert peak < size / 4, f"Peak {peak} bytes for a {size}-byte body"
+
+    print("✓ Large payloads are never built in memory")
+
+
+if __name__ == '__main__':
+    test_directives()
+    test_reproducible()
+    test_streamed_lazily()
+    print("\n✅ All generator tests passed!")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for latency distributions and fitting
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from latency import create_sampler, fit_file, percentile
+from recorder import TrafficRecorder, record_server
+
+
+def _samples(spec, n=20000, name='GET /x', seed=7):
+    sampler = create_sampler(dict(spec, seed=seed), name)
+    return sorted(sampler.sample() for _ in range(n))
+
+
+def test_distributions_match_their_parameters():
+    """Test sampled percentiles land near the configured shape."""
+    print("Testing latency distributions...")
+
+    uniform = _samples({"distribution": "uniform", "min_ms": 10, "max_ms": 50})
+    assert 10 <= uniform[0] and uniform[-1] <= 50
+    assert abs(percentile(uniform, 50) - 30) < 1.5
+
+    normal = _samples({"distribution": "normal", "mean_ms": 100, "stddev_ms": 20})
+    assert abs(percentile(normal, 50) - 100) < 2
+
+    lognormal = _samples({"distribution": "lognormal", "median_ms": 80, "sigma": 0.6})
+    assert abs(percentile(lognormal, 50) - 80) < 4
+
+    pareto = _samples({"distribution": "pareto", "scale_ms": 20, "alpha": 2.5, "max_ms": 500})
+    assert pareto[0] >= 20 and pareto[-1] <= 500
+
+    empirical = _samples({"distribution": "empirical", "p50": 40, "p90": 120, "p99": 400})
+    for pct, expected in [(50, 40), (90, 120), (99, 400)]:
+        assert abs(percentile(empirical, pct) - expected) / expected < 0.1, (pct, percentile(empirical, pct))
+
+    print("✓ Distributions match their parameters")
+
+
+def test_seeds_are_per_endpoint():
+    """Test default seeds give reproducible, independent sequences per endpoint."""
+    print("Testing latency seeds...")
+
+    spec = {"distribution": "lognormal", "median_ms": 50, "sigma": 1}
+    first = create_sampler(spec, 'GET /a', default_seed=42)
+    again = create_sampler(spec, 'GET /a', default_seed=42)
+    other = create_sampler(spec, 'GET /b', default_seed=42)
+    run = [first.sample() for _ in range(2000)]
+    assert run == [again.sample() for _ in range(2000)], "Same endpoint and seed must repeat"
+    assert run != [other.sample() for _ in range(2000)], "Endpoints must not share a sequence"
+
+    print("✓ Seeds are reproducible per endpoint")
+
+
+def test_fit_from_logs_export():
+    """Test fitting a percentile table from an exported /__logs file."""
+    print("Testing latency fitting...")
+
+    logs = [{"method": "GET", "path": "/api/games", "status": 200, "latency_ms": ms}
+            for ms in range(1, 101)]
+    logs.append({"method": "GET", "path": "/rare", "status": 200, "latency_ms": 5})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'logs.json')
+        with open(path, 'w') as f:
+            json.dump({"logs": logs, "count": len(logs)}, f)
+        fitted = fit_file(path, min_samples=20)
+
+    assert list(fitted) == ["GET /api/games"], "Endpoints with few samples are skipped"
+    spec = fitted["GET /api/games"]
+    assert (spec["p50"], spec["p90"], spec["p99"], spec["max_ms"]) == (50, 90, 99, 100)
+    create_sampler(spec).sample()
+
+    print("✓ Fitted spec is usable")
+
+
+def test_fit_from_ndjson_export():
+    """Test fitting from a compressed NDJSON export written by export_logs.py."""
+    print("Testing latency fitting from NDJSON...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'logs.ndjson.gz')
+        with gzip.open(path, 'wt') as f:
+            for ms in range(1, 101):
+                f.write(json.dumps({"seq": ms, "method": "GET", "path": "/a", "latency_ms": ms}) + '\n')
+        fitted = fit_file(path)
+
+    assert fitted["GET /a"]["p90"] == 90
+
+    print("✓ NDJSON exports are read")
+
+
+class SlowUpstream(BaseHTTPRequestHandler):
+    """Answers /slow after 30 ms and anything else at once."""
+
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(0.03)
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_fit_from_recording():
+    """Test the recorder stores upstream latencies that fit like a logs export."""
+    print("Testing latency fitting from recordings...")
+
+    upstream = ThreadingHTTPServer(('127.0.0.1', 0), SlowUpstream)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'recordings.json')
+        recorder = TrafficRecorder(path)
+        proxy = record_server(f"http://127.0.0.1:{upstream.server_address[1]}", recorder, 0)
+        threading.Thread(target=proxy.serve_forever, daemon=True).start()
+        try:
+            for target in ['/slow', '/fast'] * 20:
+                with urllib.request.urlopen(f"http://127.0.0.1:{proxy.server_address[1]}{target}") as response:
+                    assert json.loads(response.read()) == {"path": target}
+        finally:
+            proxy.shutdown()
+            upstream.shutdown()
+        recorder.save()
+        fitted = fit_file(path, min_samples=20)
+
+    assert set(fitted) == {"GET /slow", "GET /fast"}
+    assert fitted["GET /slow"]["p50"] >= 30 > fitted["GET /fast"]["p50"]
+
+    print("✓ Recordings carry upstream latency")
+
+
+if __name__ == '__main__':
+    test_distributions_match_their_parameters()
+    test_seeds_are_per_endpoint()
+    test_fit_from_logs_export()
+    test_fit_from_ndjson_export()
+    test_fit_from_recording()
+    print("\n✅ All latency tests passed!")
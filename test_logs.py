@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the request log buffer behind /__logs and /__logs/stream
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import RequestLogger, SharedRequestLogger
+
+
+def test_resume_and_dropped():
+    """Test readers resume by seq and learn how many entries they missed."""
+    print("Testing log buffer...")
+
+    for new_logger in (RequestLogger, SharedRequestLogger):
+        logger = new_logger(max_logs=3, buffer_size=5)
+        for i in range(8):
+            logger.log('GET', f'/{i}', 200, i)
+
+        assert [entry['seq'] for entry in logger.get_logs()] == [6, 7, 8]
+        entries, dropped = logger.since(0)
+        assert dropped == 3 and [entry['seq'] for entry in entries] == [4, 5, 6, 7, 8]
+        entries, dropped = logger.since(6, limit=1)
+        assert dropped == 0 and [entry['path'] for entry in entries] == ['/6']
+        assert logger.since(8) == ([], 0)
+        assert logger.stats() == {"requests": 8, "statuses": {"200": 8}, "mean_latency_ms": 3.5}
+        if new_logger is SharedRequestLogger:
+            logger.close()
+
+    print("✓ Readers resume from seq")
+
+
+def test_follow_wakes_on_new_entry():
+    """Test a waiting reader returns as soon as an entry is logged."""
+    print("Testing log follow...")
+
+    logger = RequestLogger()
+    threading.Timer(0.05, logger.log, ('GET', '/late', 200, 0)).start()
+    start = time.monotonic()
+    entries, _ = logger.since(0, timeout=2)
+    assert entries and entries[0]['path'] == '/late'
+    assert time.monotonic() - start < 1, "Reader must wake without waiting for the timeout"
+
+    print("✓ Followers wake on new entries")
+
+
+def test_shared_between_workers():
+    """Test entries logged by forked workers are numbered and read in one ring."""
+    print("Testing shared log ring...")
+
+    logger = SharedRequestLogger(buffer_size=1000)
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=lambda n=n: [logger.log('POST', f'/w{n}', 201 + n, 1)
+                                               for _ in range(100)])
+               for n in range(3)]
+    for worker in workers:
+        worker.start()
+    assert logger.since(0, timeout=2)[0], "Followers see other workers' entries"
+    for worker in workers:
+        worker.join()
+
+    entries, dropped = logger.since(0)
+    assert dropped == 0 and [entry['seq'] for entry in entries] == list(range(1, 301))
+    assert {entry['path'] for entry in entries} == {'/w0', '/w1', '/w2'}
+    assert logger.stats()["statuses"] == {"201": 100, "202": 100, "203": 100}
+    logger.close()
+
+    print("✓ Workers share one log")
+
+
+if __name__ == '__main__':
+    test_resume_and_dropped()
+    test_follow_wakes_on_new_entry()
+    test_shared_between_workers()
+    print("\n✅ All log tests passed!")
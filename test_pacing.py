@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for paced (bandwidth / time-to-first-byte limited) responses
+"""
+
+import os
+import socket
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pacing import PacingScheduler
+
+
+def _receive(sock, start):
+    """Read until EOF; return (seconds to first byte, total seconds, data) since start."""
+    first, data = None, b''
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return first, time.monotonic() - start, data
+        if first is None:
+            first = time.monotonic() - start
+        data += chunk
+
+
+def test_bandwidth_and_ttfb():
+    """Test paced transfers honour their rate and first-byte delay concurrently."""
+    print("Testing paced transfers...")
+
+    pacer = PacingScheduler()
+    payload = os.urandom(10000)
+    slow_server, slow_client = socket.socketpair()
+    late_server, late_client = socket.socketpair()
+    start = time.monotonic()
+    # 160 kbps = 20000 bytes/s, so 10000 bytes take about 0.5s
+    pacer.submit(slow_server, payload, bandwidth_kbps=160)
+    pacer.submit(late_server, payload, ttfb_ms=300)
+
+    first, total, data = _receive(late_client, start)
+    assert data == payload
+    assert 0.29 < first < 0.6, f"First byte must wait for ttfb_ms, came after {first:.2f}s"
+
+    first, total, data = _receive(slow_client, start)
+    assert data == payload
+    assert 0.4 < total < 1.0, f"Expected ~0.5s at 160 kbps, took {total:.2f}s"
+
+    deadline = time.monotonic() + 1
+    while pacer.active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pacer.active == 0, "Finished transfers must be released"
+
+    print("✓ Bandwidth and TTFB are honoured")
+
+
+if __name__ == '__main__':
+    test_bandwidth_and_ttfb()
+    print("\n✅ All pacing tests passed!")
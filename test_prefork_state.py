@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Tests for database coherence between prefork workers
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockServerConfig, WishlistManager
+from state_backends import SharedMemoryStateBackend, SQLiteStateBackend
+
+
+def _make_config(tmp):
+    """Write a small config + database and return the config path."""
+    db_path = os.path.join(tmp, 'games.json')
+    with open(db_path, 'w') as f:
+        json.dump([{"title": "Minecraft"}, {"title": "Tetris"}], f)
+    config_path = os.path.join(tmp, 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump({"database": db_path, "endpoints": []}, f)
+    return config_path
+
+
+def test_workers_share_mutations():
+    """Test mutations from one worker are visible to another."""
+    print("Testing journal replay between workers...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _make_config(tmp)
+        backend = SharedMemoryStateBackend(size=1 << 20)
+        worker_a, worker_b = MockServerConfig(config_path), MockServerConfig(config_path)
+        worker_a.attach_journal(backend.journal('games'))
+        worker_b.attach_journal(backend.journal('games'))
+
+        assert worker_a.add_game({"title": "Doom"})[0]
+        assert not worker_b.add_game({"title": "Doom"})[0], "Duplicate must be rejected"
+        assert worker_b.delete_game('title', 'Tetris')[0]
+
+        worker_a.sync()
+        titles = [r['title'] for r in worker_a.get_database()]
+        assert titles == ["Minecraft", "Doom"], f"Unexpected titles: {titles}"
+        backend.close()
+
+    print("✓ Workers share mutations")
+
+
+def test_reload_fans_out():
+    """Test a reload in one worker resets every worker."""
+    print("Testing reload fan-out...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _make_config(tmp)
+        backend = SQLiteStateBackend(os.path.join(tmp, 'state.db'))
+        worker_a, worker_b = MockServerConfig(config_path), MockServerConfig(config_path)
+        worker_a.attach_journal(backend.journal('games'))
+        worker_b.attach_journal(SQLiteStateBackend(backend.path).journal('games'))
+
+        worker_a.add_game({"title": "Doom"})
+        worker_b.sync()
+        assert len(worker_b.get_database()) == 3
+
+        worker_a.load()
+        worker_b.sync()
+        assert len(worker_b.get_database()) == 2, "Reload should discard mutations everywhere"
+        backend.close()
+
+    print("✓ Reload reaches every worker")
+
+
+def test_failed_write_rolls_back():
+    """Test a write transaction that raises leaves the journal untouched."""
+    print("Testing journal rollback...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteStateBackend(os.path.join(tmp, 'state.db'))
+        journal = backend.journal('games')
+        epoch, _ = journal.since(None, 0)
+        try:
+            with journal.write_lock():
+                assert journal.append(epoch, 0, ['add', {"title": "Doom"}])[0]
+                raise RuntimeError("replay failed")
+        except RuntimeError:
+            pass
+
+        assert SQLiteStateBackend(backend.path).journal('games').since(epoch, 0) == (epoch, [])
+        assert journal.append(epoch, 0, ['add', {"title": "Doom"}])[0]
+        backend.close()
+
+    print("✓ Failed writes are rolled back")
+
+
+def test_wishlist_shared():
+    """Test wishlist items are identical in every replica."""
+    print("Testing shared wishlist...")
+
+    backend = SharedMemoryStateBackend(size=1 << 20)
+    replica_a, replica_b = WishlistManager(), WishlistManager()
+    replica_a.attach_journal(backend.journal('wishlist'))
+    replica_b.attach_journal(backend.journal('wishlist'))
+
+    assert replica_a.add("Doom")[0]
+    assert not replica_b.add("Doom")[0], "Duplicate must be rejected"
+    assert replica_b.get_all() == replica_a.get_all()
+    assert replica_b.remove("Doom")[0]
+    assert replica_a.count() == 0
+    backend.close()
+
+    print("✓ Wishlist is shared")
+
+
+def test_checkpoints_compact_journals():
+    """Test journals are compacted into checkpoints that every worker follows."""
+    print("Testing journal checkpoints...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _make_config(tmp)
+        for backend in (SharedMemoryStateBackend(size=1 << 20, checkpoint_bytes=4096),
+                        SQLiteStateBackend(os.path.join(tmp, 'state.db'), checkpoint_bytes=4096)):
+            journal = backend.journal('games')
+            other = journal if isinstance(backend, SharedMemoryStateBackend) else \
+                SQLiteStateBackend(backend.path).journal('games')
+            writer, lagging = MockServerConfig(config_path), MockServerConfig(config_path)
+            writer.attach_journal(journal)
+            lagging.attach_journal(other)
+            epoch = writer._journal_epoch
+
+            assert writer.add_game({"title": "Kept"})[0] and writer.snapshot('seeded')
+            for i in range(200):
+                assert writer.add_game({"title": f"Game {i}", "blurb": "x" * 50})[0]
+                if i % 3 == 0:
+                    assert writer.delete_game('title', f"Game {i}")[0]
+            assert writer._journal_epoch > epoch, "The journal should have been checkpointed"
+            assert len(other.since(writer._journal_epoch, 0)[1]) < 100, "The log stays short"
+
+            # A worker that missed the compacted entries restores the checkpoint
+            lagging.sync()
+            assert lagging.get_database() == writer.get_database()
+            late = MockServerConfig(config_path)
+            late.attach_journal(other)
+            assert late.database_count() == writer.database_count() == 136
+
+            # Snapshots survive checkpoints, and the up-to-date writer kept its state
+            assert late.restore('seeded')
+            writer.sync()
+            assert writer.database_count() == 3
+            assert [r['title'] for r in writer.get_database()] == ["Minecraft", "Tetris", "Kept"]
+            assert writer.restore('initial') and lagging.sync() is None
+            assert lagging.database_count() == 2
+            backend.close()
+
+    print("✓ Checkpoints compact journals")
+
+
+def test_workers_agree_on_etags():
+    """Test every worker gives the same state the same ETag."""
+    print("Testing ETags across workers...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _make_config(tmp)
+        with open(config_path) as f:
+            config = json.load(f)
+        endpoint = {"path": "/games", "method": "GET", "response": {"games": "{{database}}"}}
+        config["endpoints"] = [endpoint]
+        with open(config_path, 'w') as f:
+            json.dump(config, f)
+
+        backend = SharedMemoryStateBackend(size=1 << 20)
+        worker_a, worker_b = MockServerConfig(config_path), MockServerConfig(config_path)
+        worker_a.attach_journal(backend.journal('games'))
+        worker_b.attach_journal(backend.journal('games'))
+        etag = lambda worker: worker.etag(worker.find_endpoint('/games', 'GET'), {})
+
+        first = etag(worker_a)
+        assert first is not None and etag(worker_b) == first
+        worker_a.add_game({"title": "Doom"})
+        worker_b.sync()
+        assert etag(worker_a) == etag(worker_b) != first
+
+        # A reload in one worker moves both to the same new ETag
+        worker_b.load()
+        worker_a.sync()
+        assert etag(worker_a) == etag(worker_b) not in (first, None)
+        backend.close()
+
+    print("✓ Workers agree on ETags")
+
+
+if __name__ == '__main__':
+    test_workers_share_mutations()
+    test_reload_fans_out()
+    test_failed_write_rolls_back()
+    test_wishlist_shared()
+    test_checkpoints_compact_journals()
+    test_workers_agree_on_etags()
+    print("\n✅ All prefork state tests passed!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the sampling profiler and stage timings
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from profiling import SamplingProfiler, StageTimer
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_collapsed_stacks():
+    """Test busy threads appear in collapsed output and idle ones do not."""
+    print("Testing sampling profiler...")
+
+    stop = threading.Event()
+    busy = threading.Thread(target=_busy_loop, args=(stop,))
+    idle = threading.Thread(target=stop.wait)
+    busy.start()
+    idle.start()
+    profiler = SamplingProfiler(interval_ms=1).start()
+    time.sleep(0.2)
+    profiler.stop()
+    stop.set()
+    busy.join()
+    idle.join()
+
+    lines = profiler.collapsed().splitlines()
+    assert profiler.samples > 20
+    assert any('test_profiling.py:_busy_loop' in line for line in lines)
+    assert not any(line.split(' ')[0].endswith('threading.py:wait') for line in lines), \
+        "Idle threads are left out by default"
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0 and ';' in stack
+    assert profiler.summary()["top_functions"]
+
+    print("✓ Profiler produces collapsed stacks")
+
+
+def test_stage_histograms():
+    """Test stage timings land in the right buckets and keep stage order."""
+    print("Testing stage timings...")
+
+    timer = StageTimer()
+    for _ in range(90):
+        timer.record('render', 0.0004)
+    for _ in range(10):
+        timer.record('render', 0.03)
+    timer.record('parse', 20)
+
+    stages = timer.snapshot()
+    assert list(stages) == ['parse', 'render']
+    render = stages['render']
+    assert render["count"] == 100
+    assert render["p50_ms"] == 0.5 and render["p99_ms"] == 50
+    assert render["buckets"] == {"le_0.5ms": 90, "le_50ms": 10}
+    assert stages['parse']["buckets"] == {"over": 1}
+
+    print("✓ Stage timings are bucketed")
+
+
+if __name__ == '__main__':
+    test_profiler_collapsed_stacks()
+    test_stage_histograms()
+    print("\n✅ All profiling tests passed!")
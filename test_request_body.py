@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for bounded request body reading and body plans
+"""
+
+import http.client
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import (MockEngine, MockHTTPServer, MockRequest, MockRequestHandler, MockServerConfig,
+                         RequestLogger, WishlistManager)
+from request_body import BodyTooLarge, read_body
+
+
+def test_read_body():
+    """Test Content-Length and chunked bodies, limits and discarding."""
+    print("Testing request body reading...")
+
+    rfile = io.BytesIO(b'{"a": 1}NEXT')
+    assert read_body(rfile, '8') == b'{"a": 1}'
+    assert rfile.read() == b'NEXT', "Only the body is consumed"
+
+    chunked = b'4\r\n{"a"\r\n4;ext=1\r\n: 1}\r\n0\r\nX-Trailer: yes\r\n\r\nNEXT'
+    rfile = io.BytesIO(chunked)
+    assert read_body(rfile, chunked=True) == b'{"a": 1}'
+    assert rfile.read() == b'NEXT'
+
+    # Ignored bodies are drained without being kept
+    rfile = io.BytesIO(b'x' * 200000 + b'NEXT')
+    assert read_body(rfile, '200000', keep=False) == b''
+    assert rfile.read() == b'NEXT'
+
+    # Over the limit: Content-Length is refused before reading, chunked once it arrives
+    rfile = io.BytesIO(b'x' * 100)
+    try:
+        read_body(rfile, '100', limit=10)
+        assert False, "Expected BodyTooLarge"
+    except BodyTooLarge:
+        assert rfile.tell() == 0
+    try:
+        read_body(io.BytesIO((b'a\r\n' + b'x' * 10 + b'\r\n') * 2 + b'0\r\n\r\n'), chunked=True, limit=15)
+        assert False, "Expected BodyTooLarge"
+    except BodyTooLarge:
+        pass
+
+    for bad in (b'zz\r\n', b'5\r\nab', b'2\r\nabXX0\r\n\r\n'):
+        try:
+            read_body(io.BytesIO(bad), chunked=True)
+            assert False, f"Expected ValueError for {bad!r}"
+        except ValueError:
+            pass
+
+    print("✓ Request bodies are read within bounds")
+
+
+def test_body_plan():
+    """Test only routes and templates that use the body keep it."""
+    print("Testing body plans...")
+
+    config_data = {
+        "max_body_bytes": 1000,
+        "endpoints": [
+            {"path": "/echo", "method": "POST", "response": {"name": "{{query.name}}"}},
+            {"path": "/static", "method": "POST", "response": {"ok": True}, "max_body_bytes": 50},
+            {"path": "/forced", "method": "POST", "response": {"ok": True}, "parse_body": True}
+        ]
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        with open(path, 'w') as f:
+            json.dump(config_data, f)
+        engine = MockEngine(MockServerConfig(path), RequestLogger(), WishlistManager())
+
+        def plan(method, path):
+            return engine.body_plan(MockRequest(method, path))
+
+        assert plan('POST', '/echo') == (True, 1000)
+        assert plan('POST', '/static') == (False, 50)
+        assert plan('POST', '/forced') == (True, 1000)
+        assert plan('POST', '/api/games') == (True, 1000)
+        assert plan('POST', '/missing') == (False, 1000)
+
+        request = MockRequest('POST', '/echo', body=b'{"name": "Ada"}')
+        endpoint = engine.route(request)
+        response = engine.serve(request, endpoint)
+        assert json.loads(response.body) == {"name": "Ada"}
+
+    print("✓ Bodies are only kept where they are used")
+
+
+def test_large_ignored_bodies():
+    """Test ignored bodies over max_body_bytes are drained and answered."""
+    print("Testing large ignored bodies...")
+
+    config_data = {
+        "max_body_bytes": 1000,
+        "endpoints": [
+            {"path": "/static", "method": "POST", "response": {"ok": True}},
+            {"path": "/echo", "method": "POST", "response": {"name": "{{query.name}}"}}
+        ]
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        with open(path, 'w') as f:
+            json.dump(config_data, f)
+
+        class Handler(MockRequestHandler):
+            engine = MockEngine(MockServerConfig(path), RequestLogger(), WishlistManager())
+
+            def log_message(self, format, *args):
+                pass
+
+        server = MockHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+            for _ in range(2):
+                conn.request('POST', '/static', body=b'x' * (5 * 1024 * 1024))
+                response = conn.getresponse()
+                assert response.status == 200 and json.loads(response.read()) == {"ok": True}
+            assert response.getheader('Connection') != 'close', "The connection stays usable"
+
+            conn.request('POST', '/echo', body=b'{"name": "' + b'x' * 2000 + b'"}')
+            response = conn.getresponse()
+            assert response.status == 413 and response.getheader('Connection') == 'close'
+            conn.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print("✓ Ignored bodies never get 413")
+
+
+if __name__ == '__main__':
+    test_read_body()
+    test_body_plan()
+    test_large_ignored_bodies()
+    print("\n✅ All request body tests passed!")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Tests for state snapshots, restores and per-header state views
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockEngine, MockRequest, MockServerConfig, RequestLogger, WishlistManager
+from state_backends import SharedMemoryStateBackend
+
+
+def _make_config(tmp, count=100):
+    """Write a config + database of count games and return the config path."""
+    db_path = os.path.join(tmp, 'games.json')
+    with open(db_path, 'w') as f:
+        json.dump([{"title": f"Game {i}", "price": i % 10} for i in range(count)], f)
+    config_path = os.path.join(tmp, 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump({"database": db_path, "indexes": ["price"], "endpoints": []}, f)
+    return config_path
+
+
+def test_snapshot_and_restore():
+    """Test restores bring back records and indexes without touching snapshots."""
+    print("Testing snapshot and restore...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = MockServerConfig(_make_config(tmp))
+        cheap = [['price', 'eq', 0]]
+        assert len(config.query_database([cheap])) == 10
+
+        assert config.add_game({"title": "New", "price": 0})[0]
+        assert config.snapshot('seeded')
+        assert config.delete_game('title', 'Game 0')[0]
+        assert config.update_game('Game 10', {"price": 5}, replace=False)[0]
+        assert len(config.query_database([cheap])) == 9
+
+        version = config.version
+        assert config.restore('seeded')
+        assert config.version > version, "Cached results must not survive a restore"
+        assert config.database_count() == 101
+        assert config.find_in_database('title', 'Game 10')["price"] == 0
+        assert len(config.query_database([cheap])) == 11
+
+        # Writing after a restore leaves the snapshot as it was
+        assert config.delete_game('title', 'New')[0]
+        assert config.restore('seeded')
+        assert config.find_in_database('title', 'New') is not None
+
+        assert config.restore('initial')
+        assert config.database_count() == 100 and config.find_in_database('title', 'New') is None
+        assert not config.restore('missing')
+        assert config.drop_snapshot('seeded') and config.snapshot_names() == ['initial']
+
+    print("✓ Snapshots restore records and indexes")
+
+
+def test_writes_copy_one_chunk():
+    """Test the first write after a snapshot or fork copies only what it touches."""
+    print("Testing copy-on-write chunks...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = MockServerConfig(_make_config(tmp, count=10000))
+        config.query_database([[['price', 'eq', 0]]])
+        assert config.snapshot('before')
+        records, index = config.database, config.index
+        assert config.update_game('Game 5000', {"price": 3}, replace=False)[0]
+
+        changed = [i for i, chunk in enumerate(config.database.chunks) if chunk is not records.chunks[i]]
+        assert changed == [5000 // config.database.CHUNK], f"Copied chunks: {changed}"
+        shards = [i for i, shard in enumerate(config.index.shards) if shard is not index.shards[i]]
+        assert shards == [], "An update keeping its key copies no primary key shard"
+        assert config.delete_game('title', 'Game 1')[0]
+        shards = [i for i, shard in enumerate(config.index.shards) if shard is not index.shards[i]]
+        assert len(shards) == 1 and len(config.index.shards) > 1
+
+        assert config.restore('before')
+        assert config.find_in_database('title', 'Game 5000')["price"] == 0
+        assert config.find_in_database('title', 'Game 1') is not None
+
+        # A fork gets indexes of its own: building one there leaves this config's alone
+        fork = config.fork()
+        assert fork.field_indexes['price'] is not config.field_indexes['price']
+        fork.indexed_fields = {'price', 'title'}
+        fork.query_database([[['title', 'prefix', 'Game 1']]])
+        assert 'title' in fork.field_indexes and 'title' not in config.field_indexes
+        assert fork.add_game({"title": "Forked", "price": 0})[0]
+        assert len(fork.query_database([[['price', 'eq', 0]]])) == 1001
+        assert len(config.query_database([[['price', 'eq', 0]]])) == 1000
+
+    print("✓ Writes copy one chunk")
+
+
+def test_wishlist_snapshots():
+    """Test wishlist snapshots share items until a session changes."""
+    print("Testing wishlist snapshots...")
+
+    wishlists = WishlistManager()
+    wishlists.add('Doom', session='a')
+    wishlists.add('Tetris', session='b')
+    assert wishlists.snapshot('before')
+    items_b = wishlists.wishlists['b']
+
+    wishlists.add('Quake', session='a')
+    wishlists.remove('Tetris', session='b')
+    assert wishlists.snapshots['before']['b'] is items_b and 'Tetris' in items_b
+    assert wishlists.count('a') == 2 and wishlists.count('b') == 0
+
+    assert wishlists.restore('before')
+    assert [item['title'] for item in wishlists.get_all('a')] == ['Doom']
+    assert wishlists.count('b') == 1
+    assert wishlists.restore('initial') and wishlists.count('a') == 0
+
+    print("✓ Wishlists are restored per session")
+
+
+def test_snapshots_replicate():
+    """Test snapshots taken in one worker can be restored in another."""
+    print("Testing snapshots between workers...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _make_config(tmp, count=3)
+        backend = SharedMemoryStateBackend(size=1 << 20)
+        worker_a, worker_b = MockServerConfig(config_path), MockServerConfig(config_path)
+        worker_a.attach_journal(backend.journal('games'))
+        worker_b.attach_journal(backend.journal('games'))
+
+        worker_a.add_game({"title": "Doom"})
+        assert worker_a.snapshot('doom')
+        assert worker_b.delete_game('title', 'Doom')[0]
+        assert worker_a.restore('doom')
+
+        worker_b.sync()
+        assert worker_b.find_in_database('title', 'Doom') is not None
+        assert worker_b.snapshot_names() == ['doom', 'initial']
+        backend.close()
+
+    print("✓ Workers share snapshots")
+
+
+def test_state_endpoints_and_views():
+    """Test the /__state endpoints and X-State-View isolation."""
+    print("Testing state endpoints...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = MockEngine(MockServerConfig(_make_config(tmp)), RequestLogger(), WishlistManager())
+
+        def call(method, target, view=None):
+            headers = [('X-State-View', view)] if view else []
+            request = MockRequest(method, target, headers)
+            response = engine.for_request(request).route(request)
+            return response.status, json.loads(response.body)
+
+        assert call('POST', '/__state/snapshot?name=clean') == (201, {"snapshot": "clean"})
+        status, body = call('POST', '/__state/snapshot')
+        assert status == 201 and body["snapshot"].startswith('snapshot-')
+
+        call('DELETE', '/api/games?title=Game%201')
+        call('POST', '/api/games/wishlist?title=Doom')
+        assert call('POST', '/__state/restore/clean') == (200, {"restored": "clean", "records": 100})
+        assert engine.wishlist_manager.count() == 0
+        assert call('POST', '/__state/restore/nope')[0] == 404
+
+        # A view forks the current state and changes only its own copy
+        call('DELETE', '/api/games?title=Game%202', view='gw0')
+        call('POST', '/api/games/wishlist?title=Doom', view='gw0')
+        status, body = call('GET', '/__state', view='gw0')
+        assert body["view"] == 'gw0' and body["records"] == 99 and body["views"] == ['gw0']
+        assert engine.config.database_count() == 100 and engine.wishlist_manager.count() == 0
+        assert call('GET', '/__state', view='gw1')[1]["records"] == 100
+
+        call('POST', '/__state/restore/clean', view='gw0')
+        assert call('GET', '/__state', view='gw0')[1]["records"] == 100
+        assert call('DELETE', '/__state/views/gw0')[0] == 200
+        assert sorted(engine.state_views) == ['gw1']
+
+    print("✓ State endpoints and views work")
+
+
+if __name__ == '__main__':
+    test_snapshot_and_restore()
+    test_writes_copy_one_chunk()
+    test_wishlist_snapshots()
+    test_snapshots_replicate()
+    test_state_endpoints_and_views()
+    print("\n✅ All state snapshot tests passed!")
@@ -68,6 +68,28 @@ def test_query_param_template():
     print("✓ Query param template works")
 
 
+def test_per_request_values():
+    """Test {{timestamp}} and {{request_uuid}} are computed once per response, {{uuid}} per use."""
+    print("Testing per-request template values...")
+    
+    config = MockServerConfig('config/config.json')
+    template = {"request": "{{request_uuid}}", "at": "{{timestamp}}",
+                "items": [{"id": "{{uuid}}", "trace": "{{request_uuid}}", "at": "sent {{timestamp}}"},
+                          {"id": "{{uuid}}", "trace": "{{request_uuid}}"}],
+                "pair": "{{uuid}} {{uuid}}"}
+    first = TemplateEngine.render(template, {}, config)
+    second = TemplateEngine.render(template, {}, config)
+    
+    assert first["request"] == first["items"][0]["trace"] == first["items"][1]["trace"], \
+        "One request_uuid per response"
+    assert first["items"][0]["at"] == "sent " + first["at"], "One timestamp per response"
+    assert first["request"] != second["request"], "Each response gets a new request_uuid"
+    assert first["items"][0]["id"] != first["items"][1]["id"], "Every {{uuid}} is new"
+    assert len(set(first["pair"].split())) == 2
+    
+    print("✓ Per-request values work")
+
+
 def test_database_template():
     """Test {{database}} template."""
     print("Testing {{database}} template...")
@@ -86,5 +108,6 @@ if __name__ == '__main__':
     test_uuid_template()
     test_random_int_template()
     test_query_param_template()
+    test_per_request_values()
     test_database_template()
     print("\n✅ All template tests passed!")
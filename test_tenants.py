@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for serving several config namespaces from one process
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import RequestLogger, build_engine
+from state_backends import create_backend
+from config_cache import DatabaseCache
+from tenants import Namespace, TenantRouter, load_tenants
+
+
+def write_json(tmp, name, data):
+    path = os.path.join(tmp, name)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    return path
+
+
+def test_routing():
+    """Test namespaces are picked by port, Host and path prefix."""
+    print("Testing namespace routing...")
+
+    shop = Namespace('shop', None, prefix='/shop')
+    router = TenantRouter([Namespace('default', None), shop, Namespace('search', None, host='Search.localhost'),
+                           Namespace('shop_v2', None, prefix='/shop/v2'),
+                           Namespace('legacy', None, port=8101)])
+
+    def resolve(target, host='localhost:8000', port=8000):
+        namespace, target = router.resolve(target, host, port)
+        return namespace.name, target
+
+    assert resolve('/shop/api/games?limit=1') == ('shop', '/api/games?limit=1')
+    assert resolve('/shop') == ('shop', '/')
+    assert resolve('/shop/v2/api') == ('shop_v2', '/api'), "Longest prefix wins"
+    assert resolve('/shopping') == ('default', '/shopping'), "Prefixes match whole segments"
+    assert resolve('/api', host='search.localhost:8000') == ('search', '/api')
+    assert resolve('/api', port=8101) == ('legacy', '/api')
+    assert router.ports() == [8101]
+
+    assert TenantRouter([shop]).resolve('/other', '', 8000) == (None, '/other')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_json(tmp, 'tenants.json', {"port": 9000, "tenants": [
+            {"name": "a", "config": "a.json", "prefix": "/a"}]})
+        assert load_tenants(path) == (9000, [{"name": "a", "config": "a.json", "prefix": "/a"}])
+        for bad in ([], [{"name": "a"}], [{"name": "a", "config": "a.json", "prefix": "a/"}],
+                    [{"name": "a", "config": "a.json"}, {"name": "a", "config": "b.json"}]):
+            try:
+                load_tenants(write_json(tmp, 'bad.json', {"tenants": bad}))
+                assert False, f"Expected ValueError for {bad}"
+            except ValueError:
+                pass
+
+    print("✓ Requests reach the most specific namespace")
+
+
+def test_shared_databases():
+    """Test identical database files are shared but state stays per namespace."""
+    print("Testing shared databases...")
+
+    records = [{"title": f"Game {i}", "genres": ["RPG" if i % 2 else "Puzzle"]} for i in range(50)]
+    with tempfile.TemporaryDirectory() as tmp:
+        # Same content under two names; a third file differs
+        write_json(tmp, 'one.json', records)
+        write_json(tmp, 'two.json', records)
+        write_json(tmp, 'other.json', records[:10])
+        configs = []
+        for name, database in [('a', 'one.json'), ('b', 'two.json'), ('c', 'other.json')]:
+            configs.append(write_json(tmp, f'{name}.json', {
+                "database": os.path.join(tmp, database), "indexes": ["genres"],
+                "endpoints": [{"path": "/name", "method": "GET", "response": {"name": name}}]}))
+
+        cache = DatabaseCache()
+        backend = create_backend('memory')
+        a, b, c = (build_engine(path, backend, RequestLogger, database_cache=cache).config
+                   for path in configs)
+        assert cache.stats()["files"] == 2 and cache.stats()["records"] == 60
+        assert a.database_source is b.database_source
+        assert a.database[0] is b.database[0], "Records are shared"
+        assert a.index.shards[0] is b.index.shards[0]
+        assert a.field_indexes['genres'].postings.shards[0] is b.field_indexes['genres'].postings.shards[0]
+
+        # Changes copy the indexes first and stay in their namespace
+        assert a.add_game({"title": "New", "genres": ["RPG"]})[0]
+        assert a.delete_game('title', 'Game 1')[0]
+        assert a.update_game('Game 2', {"genres": ["RPG"]}, replace=False)[0]
+        assert a.database_count() == 50 and b.database_count() == 50
+        assert 'New' not in b.index and 'Game 1' in b.index
+        assert b.find_in_database('title', 'Game 2') == {"title": "Game 2", "genres": ["Puzzle"]}
+        rpg = [['genres', 'eq', 'RPG']]
+        assert len(a.query_database([rpg])) == 26 and len(b.query_database([rpg])) == 25
+
+        # Each namespace reloads on its own
+        with open(configs[1], 'w') as f:
+            json.dump({"database": os.path.join(tmp, 'two.json'), "endpoints": []}, f)
+        b.load()
+        assert b.find_endpoint('/name', 'GET') is None and a.find_endpoint('/name', 'GET')
+        assert b.database_source is a.database_source, "Unchanged files are not parsed again"
+        assert a.database_count() == 50 and 'New' in a.index
+
+    print("✓ Databases are shared until a namespace changes them")
+
+
+if __name__ == '__main__':
+    test_routing()
+    test_shared_databases()
+    print("\n✅ All tenant tests passed!")
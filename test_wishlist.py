@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for wishlist storage
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import WishlistManager
+
+
+def test_add_remove_keeps_order():
+    """Test add/remove by title and insertion order."""
+    print("Testing wishlist add/remove...")
+
+    wishlist = WishlistManager()
+    for title in ["Minecraft", "Doom", "Tetris"]:
+        assert wishlist.add(title)[0]
+
+    assert wishlist.add("Doom")[:2] == (False, "Game already in wishlist")
+    assert wishlist.remove("Doom") == (True, "Removed from wishlist", 2)
+    assert [item['title'] for item in wishlist.get_all()] == ["Minecraft", "Tetris"]
+    assert wishlist.remove("Doom")[0] is False
+
+    print("✓ Wishlist add/remove works")
+
+
+def test_pagination_and_sessions():
+    """Test paging and per-session partitions."""
+    print("Testing wishlist pagination and sessions...")
+
+    wishlist = WishlistManager()
+    for i in range(10):
+        wishlist.add(f"Game {i}", session='alice')
+    wishlist.add("Game 0", session='bob')
+
+    page, total = wishlist.get_page('alice', offset=4, limit=3)
+    assert [item['title'] for item in page] == ["Game 4", "Game 5", "Game 6"]
+    assert total == 10
+    assert wishlist.count('bob') == 1
+    assert wishlist.count() == 0, "Default session should be separate"
+
+    print("✓ Wishlist pagination and sessions work")
+
+
+if __name__ == '__main__':
+    test_add_remove_keeps_order()
+    test_pagination_and_sessions()
+    print("\n✅ All wishlist tests passed!")